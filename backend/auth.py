@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,12 +8,30 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config import get_settings
 from database import get_supabase
+from services.cache import TTLCache
 from uuid import UUID
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 security = HTTPBearer()
 
+# pbkdf2 releases the GIL, so hashing runs in parallel off the event loop.
+# max_workers caps how many hashes burn CPU at once; the rest queue here.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+# Authenticated users keyed by id, so repeated calls skip the users lookup
+user_cache = TTLCache(
+    "users",
+    maxsize=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+)
+
+# Claims carried in the token when JWT_EMBED_USER_CLAIMS is enabled
+USER_CLAIM_KEYS = ("workspace_id", "role", "is_active")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -20,6 +40,16 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -31,33 +61,74 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    supabase = Depends(get_supabase)
-):
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def user_claims(user: dict) -> dict:
+    """Token claims for a user, including signed user fields when enabled"""
+    claims = {"sub": str(user["id"])}
+    if settings.JWT_EMBED_USER_CLAIMS:
+        claims.update({key: user.get(key) for key in USER_CLAIM_KEYS})
+    return claims
+
+def invalidate_user(user_id) -> None:
+    """Drop a cached user after their role, workspace or active flag changes"""
+    user_cache.invalidate(str(user_id))
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
+    """Decode the bearer token and ensure it names a user"""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
-        raise credentials_exception
-    
-    # Get user from database
-    response = supabase.table("users").select("*").eq("id", user_id).execute()
+        raise _credentials_exception()
     
-    if not response.data:
-        raise credentials_exception
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+async def _load_user(user_id: str, supabase) -> dict:
+    """Get user from cache, falling back to the database"""
+    user = user_cache.get(user_id)
+    if user is None:
+        response = await supabase.table("users").select("*").eq("id", user_id).execute()
+        if not response.data:
+            raise _credentials_exception()
+        user = response.data[0]
+        # A user without a workspace is mid-onboarding and about to get one;
+        # caching that would outlive create_workspace in other processes
+        if user.get("workspace_id"):
+            user_cache.set(user_id, user)
+    return dict(user)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase = Depends(get_supabase)
+):
+    """Get current authenticated user"""
+    payload = _decode_token(credentials)
+    return await _load_user(payload["sub"], supabase)
+
+async def get_token_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase = Depends(get_supabase)
+):
+    """Get current user from signed claims, loading the full row only if absent
     
-    return response.data[0]
+    Claims are trusted until the token expires, so only read-only endpoints
+    that need workspace_id/role should depend on this. Tokens issued before
+    the user created a workspace carry workspace_id null; those always load
+    the row, so the workspace is visible without logging in again.
+    """
+    payload = _decode_token(credentials)
+    if all(key in payload for key in USER_CLAIM_KEYS) and payload["workspace_id"]:
+        user = {key: payload[key] for key in USER_CLAIM_KEYS}
+        user["id"] = payload["sub"]
+        return user
+    return await _load_user(payload["sub"], supabase)
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     """Get current active user"""
@@ -65,6 +136,12 @@ async def get_current_active_user(current_user: dict = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_active_token_user(current_user: dict = Depends(get_token_user)):
+    """Get current active user from token claims (read-only endpoints)"""
+    if not current_user.get("is_active"):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
 async def require_owner(current_user: dict = Depends(get_current_active_user)):
     """Require owner role"""
     print(f"Checking owner role for user: {current_user.get('email')}, Role: {current_user.get('role')}")
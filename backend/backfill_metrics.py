@@ -0,0 +1,42 @@
+"""Build daily_workspace_metrics for workspaces that predate the rollup
+
+Run after applying database/migrations/003_daily_workspace_metrics.sql:
+
+    python backfill_metrics.py [--batch 10] [--pause 0.5]
+
+Each batch is one backfill_daily_metrics call (one transaction) during which
+writes to bookings, messages and form_submissions wait, so keep batches
+small on a busy database. The job can be stopped and re-run at any time:
+it only picks up workspaces still queued in daily_metrics_backfill, and the
+dashboard reads the raw tables for those until they are done.
+"""
+import argparse
+import asyncio
+import time
+from database import init_supabase, close_supabase
+
+async def backfill(batch: int, pause: float) -> int:
+    supabase = await init_supabase()
+    total = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            result = await supabase.rpc("backfill_daily_metrics", {"p_limit": batch}).execute()
+            processed = result.data or 0
+            if not processed:
+                break
+            total += processed
+            print(f"Backfilled {total} workspaces ({time.perf_counter() - started:.1f}s)")
+            # Let writers queued behind the batch's table locks through
+            await asyncio.sleep(pause)
+    finally:
+        await close_supabase()
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=10, help="workspaces per transaction")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between batches")
+    args = parser.parse_args()
+    total = asyncio.run(backfill(args.batch, args.pause))
+    print(f"Done: {total} workspaces backfilled")
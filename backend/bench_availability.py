@@ -0,0 +1,78 @@
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# availability imports settings; the benchmark never talks to Supabase or Groq
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from services.availability import booking_intervals, compute_availability
+
+DAYS = 31
+SLOT_MINUTES = 5
+BOOKINGS_PER_DAY = 100
+
+def busy_calendar():
+    """Open 08:00-20:00 every day with 5-minute slots and a crowded booking book"""
+    slots = [
+        {"day_of_week": day, "start_time": "08:00:00", "end_time": "20:00:00"}
+        for day in range(7)
+    ]
+    random.seed(7)
+    first_day = date(2026, 3, 1)
+    bookings = []
+    for offset in range(DAYS):
+        day_start = datetime.combine(first_day + timedelta(days=offset), datetime.min.time(), tzinfo=timezone.utc)
+        for _ in range(BOOKINGS_PER_DAY):
+            minute = random.randrange(8 * 60, 20 * 60, SLOT_MINUTES)
+            bookings.append({
+                "scheduled_at": (day_start + timedelta(minutes=minute)).isoformat(),
+                "status": random.choice(["pending", "confirmed", "cancelled"]),
+                "service_types": {"duration_minutes": SLOT_MINUTES}
+            })
+    return first_day, slots, bookings
+
+def previous_engine(first_day, slots, bookings):
+    """The earlier per-day approach: list membership on exact start times"""
+    free = []
+    for offset in range(DAYS):
+        target_date = datetime.combine(first_day + timedelta(days=offset), datetime.min.time())
+        day_of_week = (target_date.weekday() + 1) % 7
+        day_prefix = target_date.date().isoformat()
+        booked_times = [
+            datetime.fromisoformat(b["scheduled_at"]).time()
+            for b in bookings if b["scheduled_at"].startswith(day_prefix)
+        ]
+        for slot in slots:
+            if slot["day_of_week"] != day_of_week:
+                continue
+            current = datetime.combine(target_date, datetime.strptime(slot["start_time"], "%H:%M:%S").time())
+            end = datetime.combine(target_date, datetime.strptime(slot["end_time"], "%H:%M:%S").time())
+            duration = timedelta(minutes=SLOT_MINUTES)
+            while current + duration <= end:
+                if current.time() not in booked_times:
+                    free.append(current.isoformat())
+                current += duration
+    return free
+
+def interval_engine(first_day, slots, bookings):
+    busy = booking_intervals(bookings, SLOT_MINUTES)
+    return compute_availability(
+        first_day, first_day + timedelta(days=DAYS - 1), slots, busy, SLOT_MINUTES, timezone.utc
+    )
+
+def timed(label, fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<10} {best * 1000:8.1f} ms for {DAYS} days")
+
+if __name__ == "__main__":
+    first_day, slots, bookings = busy_calendar()
+    print(f"{len(bookings)} bookings, {12 * 60 // SLOT_MINUTES} candidate slots per day")
+    timed("previous", previous_engine, first_day, slots, bookings)
+    timed("interval", interval_engine, first_day, slots, bookings)
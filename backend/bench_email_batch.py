@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+
+# Route Mailjet traffic to the in-process fake; nothing leaves the machine
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("MAILJET_API_KEY", "benchmark")
+os.environ.setdefault("MAILJET_SECRET_KEY", "benchmark")
+
+import httpx
+import services.communication as communication
+from fake_mailjet import app as fake_mailjet, LATENCY_SECONDS, stats
+from services.communication import communication_service
+
+RECIPIENTS = 500
+
+def use_fake_mailjet():
+    communication_service.mailjet_http = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_mailjet),
+        base_url="http://fake-mailjet",
+        auth=("benchmark", "benchmark")
+    )
+
+async def run(label: str, batch_size: int) -> None:
+    communication.MAILJET_MAX_BATCH = batch_size
+    emails = [
+        {
+            "to_email": f"{'fail' if i % 100 == 0 else 'customer'}{i}@example.com",
+            "subject": "Appointment reminder",
+            "content": "See you tomorrow!"
+        }
+        for i in range(RECIPIENTS)
+    ]
+    stats.update(requests=0, messages=0)
+    started = time.perf_counter()
+    results = await communication_service.send_email_batch(emails)
+    elapsed = time.perf_counter() - started
+    delivered = sum(result["success"] for result in results)
+    print(
+        f"{label:<14} {RECIPIENTS / elapsed:8.1f} emails/s   "
+        f"{stats['requests']:4d} requests   {delivered} delivered, {RECIPIENTS - delivered} rejected"
+    )
+
+async def main():
+    use_fake_mailjet()
+    print(f"{RECIPIENTS} recipients, {LATENCY_SECONDS * 1000:.0f} ms simulated provider latency")
+    await run("one per call", 1)
+    await run("batched (50)", 50)
+    await communication_service.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""Event loop stall during logins: inline vs offloaded password hashing
+
+Offloading doesn't make hashing faster. Each login costs the same CPU
+either way, so throughput is bound by cores (on 1 CPU the two runs are
+within noise, offloaded slightly slower for the thread hand-off). What
+changes is the worst loop stall: inline, every other request waits
+behind queued hashes for seconds; offloaded, the loop stays responsive.
+"""
+import asyncio
+import os
+import time
+
+# auth imports settings; the benchmark never talks to Supabase or Groq
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from auth import get_password_hash, verify_password, verify_password_async, settings
+
+LOGINS = 200
+CONCURRENCY = 50
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Measure the worst event loop stall while logins are running"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def run(label: str, verify) -> None:
+    hashed = get_password_hash("correct horse battery staple")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def login():
+        async with semaphore:
+            assert await verify("correct horse battery staple", hashed)
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(LOGINS)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_stall = await monitor
+
+    print(f"{label:<10} {LOGINS / elapsed:8.1f} logins/s   worst loop stall {worst_stall * 1000:8.1f} ms")
+
+async def inline_verify(plain_password: str, hashed_password: str) -> bool:
+    """Previous behaviour: hashing directly on the event loop thread"""
+    return verify_password(plain_password, hashed_password)
+
+async def main():
+    print(f"{LOGINS} logins, {CONCURRENCY} concurrent, PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}, {os.cpu_count()} CPUs")
+    await run("inline", inline_verify)
+    await run("offloaded", verify_password_async)
+
+if __name__ == "__main__":
+    asyncio.run(main())
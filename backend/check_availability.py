@@ -0,0 +1,76 @@
+"""DST regression check for the availability engine
+
+Computes slots for America/New_York on the 2026 DST change days and asserts
+that every offered slot exists, is unique and sits inside its window.
+
+    python check_availability.py
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# availability imports settings; the check never talks to Supabase or Groq
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "check")
+os.environ.setdefault("GROQ_API_KEY", "check")
+
+from services.availability import compute_availability
+
+NEW_YORK = ZoneInfo("America/New_York")
+SPRING_FORWARD = date(2026, 3, 8)  # 02:00 EST jumps to 03:00 EDT
+FALL_BACK = date(2026, 11, 1)  # 02:00 EDT falls back to 01:00 EST
+
+def slots(day, start_time, end_time, busy=()):
+    window = {"day_of_week": (day.weekday() + 1) % 7, "start_time": start_time, "end_time": end_time}
+    return compute_availability(day, day, [window], list(busy), 30, NEW_YORK)[day.isoformat()]
+
+def utc(value):
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+
+CHECKS = [
+    (
+        "spring forward skips the missing hour",
+        lambda: slots(SPRING_FORWARD, "01:00:00", "04:00:00"),
+        ["2026-03-08T01:00:00-05:00", "2026-03-08T01:30:00-05:00",
+         "2026-03-08T03:00:00-04:00", "2026-03-08T03:30:00-04:00"]
+    ),
+    (
+        "spring forward window inside the gap offers nothing",
+        lambda: slots(SPRING_FORWARD, "02:00:00", "02:30:00"),
+        []
+    ),
+    (
+        "spring forward booking blocks only its own slot",
+        lambda: slots(SPRING_FORWARD, "01:00:00", "04:00:00", [(
+            utc("2026-03-08T03:00:00-04:00"), utc("2026-03-08T03:30:00-04:00")
+        )]),
+        ["2026-03-08T01:00:00-05:00", "2026-03-08T01:30:00-05:00", "2026-03-08T03:30:00-04:00"]
+    ),
+    (
+        "fall back offers the repeated hour once per offset",
+        lambda: slots(FALL_BACK, "01:00:00", "03:00:00"),
+        ["2026-11-01T01:00:00-04:00", "2026-11-01T01:30:00-04:00",
+         "2026-11-01T01:00:00-05:00", "2026-11-01T01:30:00-05:00",
+         "2026-11-01T02:00:00-05:00", "2026-11-01T02:30:00-05:00"]
+    ),
+    (
+        "ordinary day is unchanged",
+        lambda: slots(date(2026, 3, 9), "09:00:00", "10:00:00"),
+        ["2026-03-09T09:00:00-04:00", "2026-03-09T09:30:00-04:00"]
+    ),
+]
+
+def check() -> bool:
+    ok = True
+    for description, compute, expected in CHECKS:
+        actual = compute()
+        instants = [utc(value) for value in actual]
+        spaced = all(later - earlier >= timedelta(minutes=30) for earlier, later in zip(instants, instants[1:]))
+        passed = actual == expected and spaced
+        ok = ok and passed
+        print(f"{'PASS' if passed else 'FAIL'}  {description}" + ("" if passed else f": got {actual}"))
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,296 @@
+"""EXPLAIN regression check for the router queries against a scratch Postgres
+
+Builds database/schema.sql plus every migration in a throwaway database,
+seeds it with realistic volumes and asserts that each hot query is planned
+on its intended index (and never as a sequential scan of a large table).
+
+    pip install -r requirements-dev.txt
+    createdb careops_explain
+    INDEX_CHECK_DATABASE_URL=postgresql://localhost/careops_explain python check_indexes.py
+
+The public schema of that database is dropped first. Never point it at real data.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+
+DATABASE_DIR = Path(__file__).resolve().parent.parent / "database"
+
+WORKSPACES = 200
+SERVICES_PER_WORKSPACE = 10
+CONTACTS_PER_WORKSPACE = 500
+MESSAGES_PER_CONVERSATION = 10
+BOOKINGS_PER_WORKSPACE = 2500
+ALERTS_PER_WORKSPACE = 250
+
+SEED = f"""
+INSERT INTO workspaces (name, contact_email, is_active, timezone)
+SELECT 'Workspace ' || n, 'owner' || n || '@example.com', TRUE, 'UTC'
+FROM generate_series(1, {WORKSPACES}) n;
+
+INSERT INTO service_types (workspace_id, name, duration_minutes)
+SELECT w.id, 'Service ' || n, 30
+FROM workspaces w, generate_series(1, {SERVICES_PER_WORKSPACE}) n;
+
+INSERT INTO availability_slots (service_type_id, day_of_week, start_time, end_time)
+SELECT st.id, d, '09:00', '17:00'
+FROM service_types st, generate_series(0, 6) d;
+
+INSERT INTO contacts (workspace_id, name, email)
+SELECT w.id, 'Contact ' || n, 'contact' || n || '@example.com'
+FROM workspaces w, generate_series(1, {CONTACTS_PER_WORKSPACE}) n;
+
+INSERT INTO conversations (workspace_id, contact_id, status, last_message_at)
+SELECT c.workspace_id, c.id,
+       CASE WHEN random() < 0.8 THEN 'active' ELSE 'archived' END,
+       CASE WHEN random() < 0.95 THEN NOW() - random() * INTERVAL '90 days' END
+FROM contacts c;
+
+INSERT INTO messages (conversation_id, sender_type, channel, content, is_read, created_at)
+SELECT cv.id,
+       CASE WHEN n % 2 = 0 THEN 'customer' ELSE 'staff' END,
+       'email', 'Message ' || n,
+       random() < 0.97,
+       NOW() - random() * INTERVAL '90 days'
+FROM conversations cv, generate_series(1, {MESSAGES_PER_CONVERSATION}) n;
+
+INSERT INTO bookings (workspace_id, contact_id, service_type_id, scheduled_at, status)
+SELECT w.id,
+       (SELECT id FROM contacts WHERE workspace_id = w.id LIMIT 1),
+       (SELECT id FROM service_types WHERE workspace_id = w.id ORDER BY id OFFSET n % {SERVICES_PER_WORKSPACE} LIMIT 1),
+       date_trunc('hour', NOW()) + ((n % 8760) - 4380) * INTERVAL '1 hour',
+       (ARRAY['pending', 'confirmed', 'completed', 'no_show', 'cancelled'])[1 + n % 5]
+FROM workspaces w, generate_series(1, {BOOKINGS_PER_WORKSPACE}) n;
+
+INSERT INTO alerts (workspace_id, type, title, message, severity, is_read, created_at)
+SELECT w.id, 'system', 'Alert ' || n, 'Something happened',
+       (ARRAY['info', 'warning', 'critical'])[1 + n % 3],
+       random() < 0.9,
+       NOW() - random() * INTERVAL '180 days'
+FROM workspaces w, generate_series(1, {ALERTS_PER_WORKSPACE}) n;
+
+INSERT INTO form_templates (workspace_id, service_type_id, name, fields)
+SELECT st.workspace_id, st.id, 'Intake for ' || st.name, '[]'
+FROM service_types st;
+
+INSERT INTO form_submissions (form_template_id, booking_id, contact_id, status, created_at)
+SELECT ft.id, b.id, b.contact_id,
+       CASE WHEN b.scheduled_at > NOW() THEN 'pending'
+            WHEN random() < 0.8 THEN 'completed' ELSE 'overdue' END,
+       b.scheduled_at - INTERVAL '2 days'
+FROM bookings b
+JOIN form_templates ft ON ft.service_type_id = b.service_type_id;
+
+ANALYZE;
+"""
+
+# (description, query, index that must appear in the plan, tables that must not be seq-scanned)
+CHECKS = [
+    (
+        "bookings list for a date range",
+        """SELECT * FROM bookings
+           WHERE workspace_id = %(workspace_id)s
+             AND scheduled_at >= NOW() AND scheduled_at <= NOW() + INTERVAL '7 days'
+           ORDER BY scheduled_at""",
+        "idx_bookings_workspace_scheduled",
+        ["bookings"]
+    ),
+    (
+        "bookings list next page (keyset)",
+        """SELECT id, scheduled_at, status FROM bookings
+           WHERE workspace_id = %(workspace_id)s
+             AND (scheduled_at > NOW()
+                  OR (scheduled_at = NOW() AND id > %(booking_id)s))
+           ORDER BY scheduled_at, id LIMIT 101""",
+        "idx_bookings_workspace_scheduled",
+        ["bookings"]
+    ),
+    (
+        "dashboard bookings by status for a day",
+        """SELECT status, COUNT(*) FROM bookings
+           WHERE workspace_id = %(workspace_id)s
+             AND scheduled_at >= CURRENT_DATE AND scheduled_at < CURRENT_DATE + 1
+           GROUP BY status""",
+        "idx_bookings_workspace_scheduled",
+        ["bookings"]
+    ),
+    (
+        "availability: bookings of a service in a window",
+        """SELECT scheduled_at, status FROM bookings
+           WHERE service_type_id = %(service_type_id)s
+             AND NOT (status IN ('cancelled'))
+             AND scheduled_at >= NOW() - INTERVAL '1 day'
+             AND scheduled_at < NOW() + INTERVAL '31 days'""",
+        "idx_bookings_service_scheduled",
+        ["bookings"]
+    ),
+    (
+        "availability slots of a service",
+        """SELECT day_of_week, start_time, end_time FROM availability_slots
+           WHERE service_type_id = %(service_type_id)s""",
+        "idx_availability_slots_service_day",
+        ["availability_slots"]
+    ),
+    (
+        "conversation thread",
+        """SELECT * FROM messages WHERE conversation_id = %(conversation_id)s
+           ORDER BY created_at""",
+        "idx_messages_conversation_created",
+        ["messages"]
+    ),
+    (
+        "mark customer messages read",
+        """UPDATE messages SET is_read = TRUE
+           WHERE conversation_id = %(conversation_id)s
+             AND sender_type = 'customer' AND is_read = FALSE""",
+        "idx_messages_unread_customer",
+        ["messages"]
+    ),
+    (
+        "inbox first page",
+        """SELECT * FROM conversations
+           WHERE workspace_id = %(workspace_id)s AND status = 'active'
+           ORDER BY last_message_at DESC, id DESC LIMIT 51""",
+        "idx_conversations_inbox",
+        ["conversations"]
+    ),
+    (
+        "inbox next page (keyset)",
+        """SELECT * FROM conversations
+           WHERE workspace_id = %(workspace_id)s AND status = 'active'
+             AND (last_message_at < NOW() - INTERVAL '30 days'
+                  OR (last_message_at = NOW() - INTERVAL '30 days' AND id < %(conversation_id)s))
+           ORDER BY last_message_at DESC, id DESC LIMIT 51""",
+        "idx_conversations_inbox",
+        ["conversations"]
+    ),
+    (
+        "contacts export page",
+        """SELECT * FROM contacts
+           WHERE workspace_id = %(workspace_id)s AND id > %(conversation_id)s
+           ORDER BY id LIMIT 1000""",
+        "idx_contacts_workspace_id",
+        ["contacts"]
+    ),
+    (
+        "messages export: conversation batch",
+        """SELECT id FROM conversations
+           WHERE workspace_id = %(workspace_id)s AND id > %(conversation_id)s
+           ORDER BY id LIMIT 200""",
+        "idx_conversations_workspace_id",
+        ["conversations"]
+    ),
+    (
+        "contact lookup by email",
+        """SELECT id FROM contacts
+           WHERE workspace_id = %(workspace_id)s AND email = 'contact42@example.com'""",
+        "idx_contacts_workspace_email",
+        ["contacts"]
+    ),
+    (
+        "dashboard form counts by status",
+        """SELECT status, COUNT(*) FROM form_submissions
+           WHERE workspace_id = %(workspace_id)s
+           GROUP BY status""",
+        "idx_form_submissions_workspace_status",
+        ["form_submissions"]
+    ),
+    (
+        "dashboard oldest pending forms",
+        """SELECT * FROM form_submissions
+           WHERE workspace_id = %(workspace_id)s AND status = 'pending'
+           ORDER BY created_at LIMIT 5""",
+        "idx_form_submissions_workspace_status",
+        ["form_submissions"]
+    ),
+    (
+        "dashboard bookings from the daily rollup",
+        """SELECT * FROM daily_workspace_metrics
+           WHERE workspace_id = %(workspace_id)s
+             AND day >= CURRENT_DATE AND day < CURRENT_DATE + 8""",
+        "daily_workspace_metrics_pkey",
+        ["daily_workspace_metrics"]
+    ),
+    (
+        "dashboard unread alerts",
+        """SELECT * FROM alerts
+           WHERE workspace_id = %(workspace_id)s AND is_read = FALSE
+           ORDER BY created_at DESC LIMIT 10""",
+        "idx_alerts_unread_recent",
+        ["alerts"]
+    ),
+]
+
+def plan_nodes(node):
+    """Every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+def statements(sql: str):
+    """Split a migration into statements, keeping $$ function bodies whole
+
+    Sent one by one, because a multi-statement string runs as one implicit
+    transaction and CREATE INDEX CONCURRENTLY refuses to run inside one.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    result, current = [], ""
+    for i, part in enumerate("\n".join(lines).split("$$")):
+        if i % 2:
+            current += "$$" + part + "$$"
+            continue
+        pieces = part.split(";")
+        current += pieces[0]
+        for piece in pieces[1:]:
+            result.append(current.strip())
+            current = piece
+    result.append(current.strip())
+    return [statement for statement in result if statement]
+
+def build(conn) -> None:
+    conn.execute("DROP SCHEMA public CASCADE")
+    conn.execute("CREATE SCHEMA public")
+    conn.execute((DATABASE_DIR / "schema.sql").read_text())
+    # Migrations must be no-ops on a fresh schema and safe to re-run
+    for migration in sorted((DATABASE_DIR / "migrations").glob("*.sql")):
+        for statement in statements(migration.read_text()):
+            conn.execute(statement)
+    started = time.perf_counter()
+    conn.execute(SEED)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+def check(conn) -> bool:
+    params = conn.execute("""
+        SELECT w.id AS workspace_id,
+               (SELECT id FROM service_types WHERE workspace_id = w.id LIMIT 1) AS service_type_id,
+               (SELECT id FROM conversations WHERE workspace_id = w.id LIMIT 1) AS conversation_id,
+               (SELECT id FROM bookings WHERE workspace_id = w.id LIMIT 1) AS booking_id
+        FROM workspaces w LIMIT 1
+    """).fetchone()
+    params = dict(zip(("workspace_id", "service_type_id", "conversation_id", "booking_id"), params))
+
+    ok = True
+    cursor = psycopg.ClientCursor(conn)
+    for description, query, index, tables in CHECKS:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        nodes = list(plan_nodes(cursor.fetchone()[0][0]["Plan"]))
+        indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+        seq_scans = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+        passed = index in indexes and not seq_scans.intersection(tables)
+        ok = ok and passed
+        detail = f"uses {', '.join(sorted(indexes)) or 'no index'}"
+        if seq_scans:
+            detail += f"; seq scan on {', '.join(sorted(seq_scans))}"
+        print(f"{'PASS' if passed else 'FAIL'}  {description}: {detail}")
+    return ok
+
+if __name__ == "__main__":
+    database_url = os.getenv("INDEX_CHECK_DATABASE_URL")
+    if not database_url:
+        sys.exit("Set INDEX_CHECK_DATABASE_URL to a scratch database")
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        build(conn)
+        sys.exit(0 if check(conn) else 1)
@@ -5,23 +5,87 @@ class Settings(BaseSettings):
     # Supabase
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    SUPABASE_TIMEOUT_SECONDS: int = 10
     
     # Groq AI
     GROQ_API_KEY: str
+    GROQ_TIMEOUT_SECONDS: float = 30.0
+    GROQ_TRANSCRIPTION_TIMEOUT_SECONDS: float = 120.0
+    GROQ_MAX_RETRIES: int = 2
+    GROQ_MAX_CONNECTIONS: int = 20
+    VOICE_MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024  # Groq's transcription file limit
+    VOICE_MAX_DURATION_SECONDS: float = 300.0
+    VOICE_CACHE_MAX_ENTRIES: int = 1000
+    VOICE_CACHE_TTL_SECONDS: float = 86400.0
+    VOICE_CACHE_DIR: str = ""  # set to also keep transcripts/extractions on disk
+    VOICE_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Sign workspace_id/role/is_active into tokens so read-only endpoints skip the user lookup
+    JWT_EMBED_USER_CLAIMS: bool = False
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
+    
+    # Dashboard
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 5.0
+    DASHBOARD_CACHE_TTL_SECONDS: float = 30.0
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 1024
+    AI_ANALYSIS_CACHE_TTL_SECONDS: float = 21600.0
+    AI_ANALYSIS_CACHE_MAX_ENTRIES: int = 2048
+    AI_ANALYSIS_BURST: int = 3  # LLM calls a workspace may make back to back
+    AI_ANALYSIS_REFILL_PER_MINUTE: float = 1.0  # must be > 0
+    
+    # Public booking availability
+    AVAILABILITY_CACHE_TTL_SECONDS: float = 300.0
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 20000
+    AVAILABILITY_WARM_DAYS: int = 31
     
     # Email (Mailjet)
     MAILJET_API_KEY: str = ""
     MAILJET_SECRET_KEY: str = ""
+    MAILJET_API_URL: str = "https://api.mailjet.com"
+    MAILJET_TIMEOUT_SECONDS: float = 15.0
     
     # SMS (Vonage)
     VONAGE_API_KEY: str = ""
     VONAGE_API_SECRET: str = ""
     
+    # Outbound message queue
+    OUTBOUND_QUEUE_ENABLED: bool = True  # run the dispatcher in this process
+    OUTBOUND_POLL_SECONDS: float = 5.0
+    OUTBOUND_BATCH_SIZE: int = 20
+    OUTBOUND_LEASE_SECONDS: int = 120
+    OUTBOUND_MAX_ATTEMPTS: int = 5
+    OUTBOUND_RETRY_BASE_SECONDS: float = 30.0
+    OUTBOUND_RETRY_MAX_SECONDS: float = 3600.0
+    OUTBOUND_EMAIL_CONCURRENCY: int = 5
+    OUTBOUND_SMS_CONCURRENCY: int = 2
+    
+    # Automation rules
+    AUTOMATION_ENABLED: bool = True  # run the automation workers in this process
+    AUTOMATION_WORKERS: int = 4
+    AUTOMATION_QUEUE_SIZE: int = 10000
+    AUTOMATION_RULES_CACHE_TTL_SECONDS: float = 60.0
+    AUTOMATION_RULES_CACHE_MAX_ENTRIES: int = 5000
+    
+    # Scheduler (booking reminders, overdue forms)
+    SCHEDULER_ENABLED: bool = True  # take part in the sweep from this process
+    SCHEDULER_INTERVAL_SECONDS: float = 60.0
+    SCHEDULER_WORKSPACE_BATCH: int = 50
+    SCHEDULER_LEASE_SECONDS: int = 300
+    REMINDER_LEAD_MINUTES: int = 1440
+    FORM_OVERDUE_HOURS: int = 72
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24  # public-form retries replay within this window
+    IDEMPOTENCY_PURGE_BATCH: int = 1000
+    
+    # Data exports
+    EXPORT_PAGE_SIZE: int = 1000  # rows per database round trip and per resume checkpoint
+    EXPORT_CONVERSATION_BATCH: int = 200  # conversations whose messages are paged together
+    
     # CORS
     CORS_ORIGINS: list = [
         "http://localhost:3000", 
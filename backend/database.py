@@ -1,10 +1,39 @@
-from supabase import create_client, Client
+import asyncio
+from typing import Optional
+from supabase import acreate_client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
 from config import get_settings
 
 settings = get_settings()
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# One async client per worker process. Its underlying httpx.AsyncClient keeps a
+# connection pool, so awaiting queries never blocks the event loop.
+supabase: Optional[AsyncClient] = None
+_client_lock = asyncio.Lock()
 
-def get_supabase() -> Client:
+async def init_supabase() -> AsyncClient:
+    """Create the shared async Supabase client"""
+    global supabase
+    async with _client_lock:
+        if supabase is None:
+            supabase = await acreate_client(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_KEY,
+                options=AsyncClientOptions(
+                    postgrest_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS
+                )
+            )
+    return supabase
+
+async def close_supabase():
+    """Close pooled connections held by the shared client"""
+    global supabase
+    if supabase is not None:
+        await supabase.postgrest.aclose()
+        supabase = None
+
+async def get_supabase() -> AsyncClient:
     """Dependency to get Supabase client"""
+    if supabase is None:
+        return await init_supabase()
     return supabase
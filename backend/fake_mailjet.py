@@ -0,0 +1,54 @@
+import asyncio
+import itertools
+import os
+from uuid import uuid4
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Offline stand-in for Mailjet's v3.1 Send API, for local runs and throughput tests.
+# Point MAILJET_API_URL at it and recipients starting with "fail" are rejected.
+LATENCY_SECONDS = float(os.getenv("FAKE_MAILJET_LATENCY_SECONDS", "0.05"))
+MAX_MESSAGES = 50
+
+app = FastAPI(title="Fake Mailjet")
+message_ids = itertools.count(1)
+stats = {"requests": 0, "messages": 0}
+
+@app.post("/v3.1/send")
+async def send(request: Request):
+    payload = await request.json()
+    messages = payload.get("Messages") or []
+    stats["requests"] += 1
+    stats["messages"] += len(messages)
+    await asyncio.sleep(LATENCY_SECONDS)
+
+    if not messages or len(messages) > MAX_MESSAGES:
+        return JSONResponse(status_code=400, content={
+            "ErrorMessage": f"Messages must contain 1 to {MAX_MESSAGES} items",
+            "StatusCode": 400
+        })
+
+    results = []
+    for message in messages:
+        to_email = message["To"][0]["Email"]
+        if "@" not in to_email or to_email.startswith("fail"):
+            results.append({
+                "Status": "error",
+                "Errors": [{"ErrorCode": "mj-0013", "StatusCode": 400, "ErrorMessage": f"\"{to_email}\" is an invalid email address."}]
+            })
+        else:
+            results.append({
+                "Status": "success",
+                "To": [{"Email": to_email, "MessageUUID": str(uuid4()), "MessageID": next(message_ids)}]
+            })
+
+    failed = any(result["Status"] != "success" for result in results)
+    return JSONResponse(status_code=400 if failed else 200, content={"Messages": results})
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FAKE_MAILJET_PORT", "8025")))
@@ -1,14 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from config import get_settings
-from routers import auth, onboarding, dashboard, bookings, inbox
+from body_limits import BodySizeLimitMiddleware
+from database import init_supabase, close_supabase
+from services.cache import get_cache_metrics
+from services.outbound_queue import outbound_queue
+from services.automation import automation_engine
+from services.scheduler import scheduler
+from services.communication import communication_service
+from services.groq_client import close_groq_client
+from routers import auth, onboarding, dashboard, bookings, inbox, exports
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared DB client and background workers on startup, release them on shutdown"""
+    supabase = await init_supabase()
+    if settings.OUTBOUND_QUEUE_ENABLED:
+        await outbound_queue.start(supabase)
+    if settings.AUTOMATION_ENABLED:
+        await automation_engine.start(supabase)
+    if settings.SCHEDULER_ENABLED:
+        await scheduler.start(supabase)
+    yield
+    await scheduler.stop()
+    await automation_engine.stop()
+    await outbound_queue.stop()
+    await communication_service.aclose()
+    await close_groq_client()
+    await close_supabase()
+
 app = FastAPI(
     title="CareOps API",
     description="Unified Operations Platform for Service-Based Businesses",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.middleware("http")
@@ -29,12 +57,19 @@ elif isinstance(settings.CORS_ORIGINS, str):
 # Add local defaults
 origins = list(set(origins + ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"]))
 
+# Cut off oversized voice uploads while they stream in (form fields get 64KB of slack)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/api/onboarding/voice/": settings.VOICE_MAX_UPLOAD_BYTES + 64 * 1024}
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition"],
 )
 
 # Include routers
@@ -43,6 +78,7 @@ app.include_router(onboarding.router)
 app.include_router(dashboard.router)
 app.include_router(bookings.router)
 app.include_router(inbox.router)
+app.include_router(exports.router)
 
 @app.get("/")
 async def root():
@@ -61,6 +97,11 @@ async def health_check():
         "timestamp": "2026-02-14T11:42:25+05:30"
     }
 
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Hit rate and staleness for the in-process caches"""
+    return get_cache_metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
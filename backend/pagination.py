@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
+from fastapi import HTTPException, status
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor"
+    )
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise _invalid_cursor()
+    return values
+
+def cursor_uuid(value: Any) -> str:
+    """Validate a cursor value that is interpolated into a PostgREST filter"""
+    try:
+        return str(UUID(str(value)))
+    except ValueError:
+        raise _invalid_cursor()
+
+def cursor_timestamp(value: Any) -> Optional[str]:
+    """Validate a (nullable) timestamp cursor value"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).isoformat()
+    except ValueError:
+        raise _invalid_cursor()
@@ -4,8 +4,8 @@ from models.schemas import (
     WorkspaceCreate, WorkspaceResponse
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_active_user
+    get_password_hash_async, verify_password_async, create_access_token,
+    get_current_active_user, user_claims
 )
 from database import get_supabase
 from datetime import timedelta
@@ -19,7 +19,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
     """Register a new user (owner creates workspace, staff joins existing)"""
     try:
         # Check if user already exists
-        existing = supabase.table("users").select("*").eq("email", user_data.email).execute()
+        existing = await supabase.table("users").select("*").eq("email", user_data.email).execute()
         if existing.data:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +27,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
             )
         
         # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         
         # Handle owner registration (create workspace if needed)
         workspace_id = user_data.workspace_id
@@ -47,7 +47,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
                 "is_active": False
             }
             
-            ws_result = supabase.table("workspaces").insert(workspace_dict).execute()
+            ws_result = await supabase.table("workspaces").insert(workspace_dict).execute()
             if not ws_result.data:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -58,7 +58,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
             # AUTO-PROVISION INTEGRATIONS
             try:
                 if settings.MAILJET_API_KEY:
-                    supabase.table("integrations").insert({
+                    await supabase.table("integrations").insert({
                         "workspace_id": workspace_id,
                         "type": "email",
                         "provider": "mailjet",
@@ -67,7 +67,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
                     }).execute()
                 
                 if settings.VONAGE_API_KEY:
-                    supabase.table("integrations").insert({
+                    await supabase.table("integrations").insert({
                         "workspace_id": workspace_id,
                         "type": "sms",
                         "provider": "vonage",
@@ -88,7 +88,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
             "is_active": True
         }
         
-        result = supabase.table("users").insert(user_dict).execute()
+        result = await supabase.table("users").insert(user_dict).execute()
         
         if not result.data:
             raise HTTPException(
@@ -100,7 +100,7 @@ async def register(user_data: UserCreate, supabase = Depends(get_supabase)):
         
         # Create access token
         access_token = create_access_token(
-            data={"sub": user["id"]},
+            data=user_claims(user),
             expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         )
         
@@ -134,7 +134,7 @@ async def login(credentials: UserLogin, supabase = Depends(get_supabase)):
     """Login user"""
     
     # Get user by email
-    result = supabase.table("users").select("*").eq("email", credentials.email).execute()
+    result = await supabase.table("users").select("*").eq("email", credentials.email).execute()
     
     if not result.data:
         raise HTTPException(
@@ -145,7 +145,7 @@ async def login(credentials: UserLogin, supabase = Depends(get_supabase)):
     user = result.data[0]
     
     # Verify password
-    if not verify_password(credentials.password, user["password_hash"]):
+    if not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -160,7 +160,7 @@ async def login(credentials: UserLogin, supabase = Depends(get_supabase)):
     
     # Create access token
     access_token = create_access_token(
-        data={"sub": user["id"]},
+        data=user_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     
@@ -1,20 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from models.schemas import (
     BookingCreate, BookingResponse,
     ContactCreate, ContactResponse,
     PublicBookingRequest
 )
-from auth import get_current_active_user
+from auth import get_current_active_user, get_active_token_user
 from database import get_supabase
-from datetime import datetime, timedelta
-from typing import List, Optional
+from postgrest.exceptions import APIError
+from pagination import encode_cursor, decode_cursor, cursor_timestamp, cursor_uuid
+from services.cache import invalidate_dashboard
+from services.availability import get_availability, invalidate_availability, needs_warming, warm_availability
+from services.automation import automation_engine, BOOKING_CREATED, BOOKING_STATUS_CHANGED
+from datetime import date, datetime, timedelta
+from typing import Optional
 from uuid import UUID
 
 router = APIRouter(prefix="/api/bookings", tags=["Bookings"])
 
+# Longest window get_available_slots computes in one call
+MAX_AVAILABILITY_DAYS = 62
+
+# Longest range get_booking_calendar counts in one call
+MAX_CALENDAR_DAYS = 366
+
+# Booking columns list_bookings may project, and the trimmed embeds it can add
+BOOKING_LIST_FIELDS = (
+    "id", "workspace_id", "contact_id", "service_type_id", "scheduled_at",
+    "status", "notes", "reminder_sent_at", "created_at", "updated_at"
+)
+BOOKING_LIST_EMBEDS = {
+    "contacts": "contacts(id, name, email, phone)",
+    "service_types": "service_types(id, name, duration_minutes, location)"
+}
+DEFAULT_BOOKING_LIST_FIELDS = (
+    "id", "contact_id", "service_type_id", "scheduled_at", "status", "notes",
+    "contacts", "service_types"
+)
+
+def booking_list_columns(fields: Optional[str]) -> str:
+    """PostgREST select for a `fields` parameter; the cursor key is always included"""
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(DEFAULT_BOOKING_LIST_FIELDS)
+    unknown = [f for f in requested if f not in BOOKING_LIST_FIELDS and f not in BOOKING_LIST_EMBEDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. "
+                   f"Choose from: {', '.join(BOOKING_LIST_FIELDS + tuple(BOOKING_LIST_EMBEDS))}"
+        )
+    columns = ["id", "scheduled_at"] + [f for f in requested if f not in ("id", "scheduled_at")]
+    return ",".join(BOOKING_LIST_EMBEDS.get(column, column) for column in dict.fromkeys(columns))
+
+# Errors raised by the create_public_booking database function
+PUBLIC_BOOKING_ERRORS = {
+    "workspace_unavailable": (status.HTTP_400_BAD_REQUEST, "Workspace not available for bookings"),
+    "service_unavailable": (status.HTTP_404_NOT_FOUND, "Service type not found"),
+    "slot_unavailable": (status.HTTP_409_CONFLICT, "This time slot is no longer available")
+}
+
 @router.post("/public", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
 async def create_public_booking(
     request: PublicBookingRequest,
+    background_tasks: BackgroundTasks,
     supabase = Depends(get_supabase)
 ):
     """Public endpoint for customers to create bookings (no auth required)"""
@@ -23,55 +69,23 @@ async def create_public_booking(
     contact_data = request.contact_data
     workspace_id = request.workspace_id
     
-    # Verify workspace is active
-    workspace = supabase.table("workspaces").select("*").eq("id", str(workspace_id)).execute()
-    
-    if not workspace.data or not workspace.data[0]["is_active"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Workspace not available for bookings"
-        )
-    
-    # Create or get contact
-    existing_contact = None
-    if contact_data.email:
-        existing_contact = supabase.table("contacts").select("*").eq(
-            "workspace_id", str(workspace_id)
-        ).eq("email", contact_data.email).execute()
-    
-    if existing_contact and existing_contact.data:
-        contact = existing_contact.data[0]
-    else:
-        # Create new contact
-        contact_dict = {
-            "workspace_id": str(workspace_id),
-            "name": contact_data.name,
-            "email": contact_data.email,
-            "phone": contact_data.phone,
-            "metadata": contact_data.metadata
-        }
-        contact_result = supabase.table("contacts").insert(contact_dict).execute()
-        contact = contact_result.data[0]
-        
-        # Create conversation for new contact
-        conversation_dict = {
-            "workspace_id": str(workspace_id),
-            "contact_id": contact["id"],
-            "status": "active"
-        }
-        supabase.table("conversations").insert(conversation_dict).execute()
-    
-    # Create booking
-    booking_dict = {
-        "workspace_id": str(workspace_id),
-        "contact_id": contact["id"],
-        "service_type_id": str(booking_data.service_type_id),
-        "scheduled_at": booking_data.scheduled_at.isoformat(),
-        "status": "pending",
-        "notes": booking_data.notes
-    }
-    
-    booking_result = supabase.table("bookings").insert(booking_dict).execute()
+    # Workspace check, contact upsert, conversation and booking in one transaction
+    try:
+        booking_result = await supabase.rpc("create_public_booking", {
+            "p_workspace_id": str(workspace_id),
+            "p_service_type_id": str(booking_data.service_type_id),
+            "p_scheduled_at": booking_data.scheduled_at.isoformat(),
+            "p_notes": booking_data.notes,
+            "p_contact_name": contact_data.name,
+            "p_contact_email": contact_data.email,
+            "p_contact_phone": contact_data.phone,
+            "p_contact_metadata": contact_data.metadata
+        }).execute()
+    except APIError as e:
+        if e.message in PUBLIC_BOOKING_ERRORS:
+            status_code, detail = PUBLIC_BOOKING_ERRORS[e.message]
+            raise HTTPException(status_code=status_code, detail=detail)
+        raise
     
     if not booking_result.data:
         raise HTTPException(
@@ -79,24 +93,38 @@ async def create_public_booking(
             detail="Failed to create booking"
         )
     
-    booking = booking_result.data[0]
+    booking = booking_result.data
+    invalidate_dashboard(workspace_id)
+    invalidate_availability(workspace_id, booking["service_type_id"])
+    background_tasks.add_task(warm_availability, supabase, workspace_id, booking["service_type_id"])
     
-    # TODO: Trigger automation - send confirmation, create forms
+    # Confirmation messages, forms etc. come from the workspace's automation rules
+    automation_engine.publish(workspace_id, BOOKING_CREATED, {"booking": booking})
     
     return booking
 
-@router.get("/", response_model=List[BookingResponse])
+@router.get("/")
 async def list_bookings(
-    current_user: dict = Depends(get_current_active_user),
+    response: Response,
+    current_user: dict = Depends(get_active_token_user),
     supabase = Depends(get_supabase),
     status_filter: Optional[str] = None,
     from_date: Optional[str] = None,
-    to_date: Optional[str] = None
+    to_date: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
-    """List all bookings for workspace"""
+    """List bookings for workspace, earliest first
+    
+    Pages are keyed on (scheduled_at, id). When more rows exist the cursor
+    for the next page is returned in the X-Next-Cursor header. `fields` is a
+    comma-separated subset of BOOKING_LIST_FIELDS; contacts and service_types
+    embed only the columns the bookings page renders.
+    """
     
     query = supabase.table("bookings").select(
-        "*, contacts(*), service_types(*)"
+        booking_list_columns(fields)
     ).eq("workspace_id", current_user["workspace_id"])
     
     if status_filter:
@@ -108,19 +136,63 @@ async def list_bookings(
     if to_date:
         query = query.lte("scheduled_at", to_date)
     
-    result = query.order("scheduled_at", desc=False).execute()
+    if cursor:
+        last_scheduled_at, last_id = decode_cursor(cursor, 2)
+        last_scheduled_at, last_id = cursor_timestamp(last_scheduled_at), cursor_uuid(last_id)
+        if last_scheduled_at is None:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = query.or_(
+            f'scheduled_at.gt."{last_scheduled_at}",'
+            f'and(scheduled_at.eq."{last_scheduled_at}",id.gt.{last_id})'
+        )
+    
+    result = await query.order("scheduled_at", desc=False).order(
+        "id", desc=False
+    ).limit(limit + 1).execute()
+    
+    bookings = result.data[:limit]
+    if len(result.data) > limit:
+        last = bookings[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last["scheduled_at"], last["id"])
     
-    return result.data
+    return bookings
+
+@router.get("/calendar")
+async def get_booking_calendar(
+    from_date: date,
+    to_date: date,
+    current_user: dict = Depends(get_active_token_user),
+    supabase = Depends(get_supabase)
+):
+    """Per-day booking counts by status for calendar views (both dates inclusive)
+    
+    Days without bookings are omitted. Counts come from the daily metrics
+    rollup, so a month or a year costs a few dozen small rows.
+    """
+    
+    if to_date < from_date or (to_date - from_date).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must cover 1 to {MAX_CALENDAR_DAYS} days"
+        )
+    
+    result = await supabase.rpc("booking_calendar", {
+        "p_workspace_id": current_user["workspace_id"],
+        "p_from": from_date.isoformat(),
+        "p_to": (to_date + timedelta(days=1)).isoformat()
+    }).execute()
+    
+    return {"days": result.data}
 
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking(
     booking_id: str,
-    current_user: dict = Depends(get_current_active_user),
+    current_user: dict = Depends(get_active_token_user),
     supabase = Depends(get_supabase)
 ):
     """Get specific booking details"""
     
-    result = supabase.table("bookings").select(
+    result = await supabase.table("bookings").select(
         "*, contacts(*), service_types(*)"
     ).eq("id", booking_id).eq("workspace_id", current_user["workspace_id"]).execute()
     
@@ -133,6 +205,7 @@ async def get_booking(
 async def update_booking_status(
     booking_id: str,
     new_status: str,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_active_user),
     supabase = Depends(get_supabase)
 ):
@@ -145,73 +218,73 @@ async def update_booking_status(
             detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
         )
     
-    result = supabase.table("bookings").update(
+    result = await supabase.table("bookings").update(
         {"status": new_status}
     ).eq("id", booking_id).eq("workspace_id", current_user["workspace_id"]).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Booking not found")
     
-    # TODO: Trigger automation based on status change
+    booking = result.data[0]
+    invalidate_dashboard(current_user["workspace_id"])
+    invalidate_availability(current_user["workspace_id"], booking["service_type_id"])
+    background_tasks.add_task(warm_availability, supabase, current_user["workspace_id"], booking["service_type_id"])
     
-    return result.data[0]
+    automation_engine.publish(current_user["workspace_id"], BOOKING_STATUS_CHANGED, {
+        "booking": booking,
+        "status": new_status
+    })
+    
+    return booking
 
 @router.get("/service-types/available-slots")
 async def get_available_slots(
-    service_type_id: str,
-    date: str,
-    workspace_id: str,
+    service_type_id: UUID,
+    workspace_id: UUID,
+    background_tasks: BackgroundTasks,
+    date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    month: Optional[str] = None,
     supabase = Depends(get_supabase)
 ):
-    """Get available time slots for a service type on a specific date (public endpoint)"""
+    """Get available time slots for a service type (public endpoint)
+    
+    Pass a single date, a date..end_date range, or a whole month (YYYY-MM).
+    Slots are computed in the workspace timezone and checked for overlap
+    against every booking that still holds its time (cancelled ones don't).
+    The first view of a service warms the coming days in the background.
+    """
+    
+    try:
+        if month:
+            first_day = datetime.strptime(month, "%Y-%m").date()
+            last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        elif date:
+            first_day = datetime.fromisoformat(date).date()
+            last_day = datetime.fromisoformat(end_date).date() if end_date else first_day
+        else:
+            raise ValueError
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide date (YYYY-MM-DD), optionally end_date, or month (YYYY-MM)"
+        )
     
-    # Get service type
-    service = supabase.table("service_types").select("*").eq("id", service_type_id).execute()
+    if last_day < first_day or (last_day - first_day).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must cover 1 to {MAX_AVAILABILITY_DAYS} days"
+        )
+    
+    slots_by_date = await get_availability(supabase, workspace_id, service_type_id, first_day, last_day)
     
-    if not service.data:
+    if slots_by_date is None:
         raise HTTPException(status_code=404, detail="Service type not found")
     
-    # Get availability slots for this service
-    target_date = datetime.fromisoformat(date)
-    day_of_week = target_date.weekday()  # 0=Monday, 6=Sunday
-    # Convert to our format (0=Sunday)
-    day_of_week = (day_of_week + 1) % 7
-    
-    slots = supabase.table("availability_slots").select("*").eq(
-        "service_type_id", service_type_id
-    ).eq("day_of_week", day_of_week).execute()
-    
-    if not slots.data:
-        return {"available_slots": []}
-    
-    # Get existing bookings for this date
-    existing_bookings = supabase.table("bookings").select("*").eq(
-        "service_type_id", service_type_id
-    ).gte(
-        "scheduled_at", f"{date}T00:00:00"
-    ).lt(
-        "scheduled_at", f"{date}T23:59:59"
-    ).execute()
-    
-    booked_times = [
-        datetime.fromisoformat(b["scheduled_at"].replace('Z', '+00:00')).time()
-        for b in existing_bookings.data
-    ]
-    
-    # Generate available slots
-    available_slots = []
-    for slot in slots.data:
-        start_time = datetime.strptime(slot["start_time"], "%H:%M:%S").time()
-        end_time = datetime.strptime(slot["end_time"], "%H:%M:%S").time()
-        
-        # Generate time slots based on service duration
-        current_time = datetime.combine(target_date, start_time)
-        end_datetime = datetime.combine(target_date, end_time)
-        duration = timedelta(minutes=service.data[0]["duration_minutes"])
-        
-        while current_time + duration <= end_datetime:
-            if current_time.time() not in booked_times:
-                available_slots.append(current_time.isoformat())
-            current_time += duration
-    
-    return {"available_slots": available_slots}
+    if needs_warming(workspace_id, service_type_id):
+        background_tasks.add_task(warm_availability, supabase, workspace_id, service_type_id)
+    
+    return {
+        "available_slots": [slot for day_slots in slots_by_date.values() for slot in day_slots],
+        "slots_by_date": slots_by_date
+    }
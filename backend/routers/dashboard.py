@@ -1,124 +1,145 @@
-from fastapi import APIRouter, Depends, HTTPException
-from auth import get_current_active_user
+from fastapi import APIRouter, Depends, HTTPException, status
+from auth import get_current_active_user, get_active_token_user
 from database import get_supabase
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
-from groq import Groq
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple
+import asyncio
+import hashlib
+import json
+import math
 from config import get_settings
+from services.cache import TTLCache, dashboard_cache, invalidate_dashboard
+from services.groq_client import get_groq_client
+from services.rate_limit import TokenBucketLimiter
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
+settings = get_settings()
 
-@router.get("/overview")
-async def get_dashboard_overview(
-    target_date: str = None,
-    current_user: dict = Depends(get_current_active_user),
-    supabase = Depends(get_supabase)
-) -> Dict[str, Any]:
-    """Get complete dashboard overview for business owner"""
-    
-    workspace_id = current_user["workspace_id"]
-    
-    if target_date:
-        try:
-            today = datetime.fromisoformat(target_date).date()
-        except ValueError:
-            today = datetime.now().date()
-    else:
-        today = datetime.now().date()
-    
-    # ============================================
-    # 1. BOOKING OVERVIEW
-    # ============================================
-    
-    # Today's bookings
-    today_bookings = supabase.table("bookings").select("*, contacts(*), service_types(*)").eq(
-        "workspace_id", workspace_id
-    ).gte(
-        "scheduled_at", f"{today}T00:00:00"
-    ).lt(
-        "scheduled_at", f"{today}T23:59:59"
-    ).execute()
-    
-    # Upcoming bookings (next 7 days)
-    next_week = today + timedelta(days=7)
-    upcoming_bookings = supabase.table("bookings").select("*, contacts(*), service_types(*)").eq(
-        "workspace_id", workspace_id
-    ).gte(
-        "scheduled_at", f"{today}T00:00:00"
-    ).lt(
-        "scheduled_at", f"{next_week}T23:59:59"
-    ).execute()
-    
-    # Booking stats
-    completed_bookings = [b for b in today_bookings.data if b["status"] == "completed"]
-    no_show_bookings = [b for b in today_bookings.data if b["status"] == "no_show"]
-    
-    booking_overview = {
-        "today_count": len(today_bookings.data),
-        "upcoming_count": len(upcoming_bookings.data),
-        "completed_today": len(completed_bookings),
-        "no_show_today": len(no_show_bookings),
-        "today_bookings": today_bookings.data[:5]  # First 5 for preview
+# Generated insights keyed by (workspace_id, date, digest of the prompt metrics)
+analysis_cache = TTLCache(
+    "dashboard_analysis",
+    maxsize=settings.AI_ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AI_ANALYSIS_CACHE_TTL_SECONDS
+)
+
+# LLM calls per workspace; cache hits don't consume tokens
+analysis_limiter = TokenBucketLimiter(
+    capacity=settings.AI_ANALYSIS_BURST,
+    refill_per_second=settings.AI_ANALYSIS_REFILL_PER_MINUTE / 60
+)
+
+# ============================================
+# OVERVIEW SECTIONS
+# ============================================
+# Each section is independent, so the overview issues them concurrently and
+# its latency tracks the slowest section rather than the sum of all queries.
+
+EMPTY_SECTIONS: Dict[str, Dict[str, Any]] = {
+    "bookings": {
+        "today_count": 0,
+        "upcoming_count": 0,
+        "completed_today": 0,
+        "no_show_today": 0,
+        "today_bookings": []
+    },
+    "leads": {
+        "total_conversations": 0,
+        "new_inquiries_24h": 0,
+        "unread_messages": 0,
+        "active_conversations": 0
+    },
+    "forms": {
+        "pending_count": 0,
+        "overdue_count": 0,
+        "completed_count": 0,
+        "pending_forms": []
+    },
+    "inventory": {
+        "low_stock_count": 0,
+        "critical_count": 0,
+        "low_stock_items": []
+    },
+    "alerts": {
+        "total_unread": 0,
+        "critical_count": 0,
+        "recent_alerts": []
+    },
+    "quick_stats": {
+        "active_services": 0,
+        "total_bookings_this_month": 0
     }
+}
+
+async def _bookings_section(supabase, workspace_id: str, today) -> Dict[str, Any]:
+    """1. Booking overview"""
+    
+    # Status counts come from the daily rollup (a handful of rows for any
+    # date, past or future); only the preview rows are fetched
+    stats, today_preview = await asyncio.gather(
+        supabase.rpc("dashboard_booking_stats", {
+            "p_workspace_id": workspace_id,
+            "p_day": today.isoformat()
+        }).execute(),
+        supabase.table("bookings").select("*, contacts(*), service_types(*)").eq(
+            "workspace_id", workspace_id
+        ).gte(
+            "scheduled_at", f"{today}T00:00:00"
+        ).lt(
+            "scheduled_at", f"{today + timedelta(days=1)}T00:00:00"
+        ).order("scheduled_at").limit(5).execute()
+    )
     
-    # ============================================
-    # 2. LEADS & CONVERSATIONS
-    # ============================================
-    
-    # Get all conversations
-    conversations = supabase.table("conversations").select(
-        "*, contacts(*)"
-    ).eq("workspace_id", workspace_id).execute()
-    
-    # New inquiries (last 24 hours) - using UTC to match database
-    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-    new_conversations = [
-        c for c in conversations.data 
-        if datetime.fromisoformat(c["created_at"].replace('Z', '+00:00')) > yesterday
-    ]
-    
-    # Get unread messages count
-    conversation_ids = [c["id"] for c in conversations.data]
-    if conversation_ids:
-        unread_messages = supabase.table("messages").select("*").in_(
-            "conversation_id", conversation_ids
-        ).eq("is_read", False).eq("sender_type", "customer").execute()
-    else:
-        unread_messages = type('obj', (object,), {'data': []})()
+    by_status = stats.data["today_by_status"]
     
-    leads_overview = {
-        "total_conversations": len(conversations.data),
-        "new_inquiries_24h": len(new_conversations),
-        "unread_messages": len(unread_messages.data),
-        "active_conversations": len([c for c in conversations.data if c["status"] == "active"])
+    return {
+        "today_count": sum(by_status.values()),
+        "upcoming_count": stats.data["upcoming_count"],
+        "completed_today": by_status.get("completed", 0),
+        "no_show_today": by_status.get("no_show", 0),
+        "today_bookings": today_preview.data  # First 5 for preview
     }
+
+async def _leads_section(supabase, workspace_id: str) -> Dict[str, Any]:
+    """2. Leads & conversations"""
     
-    # ============================================
-    # 3. FORMS STATUS
-    # ============================================
-    
-    # Get all form submissions
-    form_submissions = supabase.table("form_submissions").select(
-        "*, form_templates(*), contacts(*)"
-    ).eq("form_templates.workspace_id", workspace_id).execute()
-    
-    pending_forms = [f for f in form_submissions.data if f["status"] == "pending"]
-    overdue_forms = [f for f in form_submissions.data if f["status"] == "overdue"]
-    completed_forms = [f for f in form_submissions.data if f["status"] == "completed"]
+    stats = await supabase.rpc("dashboard_lead_stats", {
+        "p_workspace_id": workspace_id
+    }).execute()
     
-    forms_overview = {
-        "pending_count": len(pending_forms),
-        "overdue_count": len(overdue_forms),
-        "completed_count": len(completed_forms),
-        "pending_forms": pending_forms[:5]  # First 5 for preview
+    return {
+        "total_conversations": stats.data["total_conversations"],
+        "new_inquiries_24h": stats.data["new_inquiries_24h"],
+        "unread_messages": stats.data["unread_messages"],
+        "active_conversations": stats.data["active_conversations"]
     }
+
+async def _forms_section(supabase, workspace_id: str) -> Dict[str, Any]:
+    """3. Forms status"""
+    
+    stats, pending_preview = await asyncio.gather(
+        supabase.rpc("dashboard_form_stats", {
+            "p_workspace_id": workspace_id
+        }).execute(),
+        # workspace_id lives on form_submissions, so the filter hits its index
+        supabase.table("form_submissions").select(
+            "*, form_templates(id, name), contacts(id, name, email, phone)"
+        ).eq("workspace_id", workspace_id).eq(
+            "status", "pending"
+        ).order("created_at").limit(5).execute()
+    )
     
-    # ============================================
-    # 4. INVENTORY ALERTS
-    # ============================================
+    return {
+        "pending_count": stats.data.get("pending", 0),
+        "overdue_count": stats.data.get("overdue", 0),
+        "completed_count": stats.data.get("completed", 0),
+        "pending_forms": pending_preview.data  # First 5 for preview
+    }
+
+async def _inventory_section(supabase, workspace_id: str) -> Dict[str, Any]:
+    """4. Inventory alerts"""
     
     # Get low stock items
-    inventory_items = supabase.table("inventory_items").select("*").eq(
+    inventory_items = await supabase.table("inventory_items").select("*").eq(
         "workspace_id", workspace_id
     ).execute()
     
@@ -132,60 +153,129 @@ async def get_dashboard_overview(
         if item["quantity"] <= (item["low_stock_threshold"] * 0.5)
     ]
     
-    inventory_overview = {
+    return {
         "low_stock_count": len(low_stock_items),
         "critical_count": len(critical_items),
         "low_stock_items": low_stock_items
     }
-    
-    # ============================================
-    # 5. KEY ALERTS
-    # ============================================
+
+async def _alerts_section(supabase, workspace_id: str) -> Dict[str, Any]:
+    """5. Key alerts"""
     
     # Get unread alerts
-    alerts = supabase.table("alerts").select("*").eq(
+    alerts = await supabase.table("alerts").select("*").eq(
         "workspace_id", workspace_id
     ).eq("is_read", False).order("created_at", desc=True).limit(10).execute()
     
     critical_alerts = [a for a in alerts.data if a["severity"] == "critical"]
     
-    alerts_overview = {
+    return {
         "total_unread": len(alerts.data),
         "critical_count": len(critical_alerts),
         "recent_alerts": alerts.data
     }
+
+async def _quick_stats_section(supabase, workspace_id: str, today) -> Dict[str, Any]:
+    """Quick stats shown in the dashboard header"""
+    
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+    
+    # Head-only count of services; the month's bookings come from the daily rollup
+    active_services, bookings_this_month = await asyncio.gather(
+        supabase.table("service_types").select("id", count="exact", head=True).eq(
+            "workspace_id", workspace_id
+        ).eq("is_active", True).execute(),
+        supabase.rpc("dashboard_bookings_created", {
+            "p_workspace_id": workspace_id,
+            "p_from": month_start.isoformat(),
+            "p_to": next_month_start.isoformat()
+        }).execute()
+    )
+    
+    return {
+        "active_services": active_services.count or 0,
+        "total_bookings_this_month": bookings_this_month.data or 0
+    }
+
+async def _run_section(name: str, coro, timeout: float) -> Tuple[Dict[str, Any], bool]:
+    """Await a section with a timeout, falling back to its empty shape on failure"""
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout), True
+    except asyncio.TimeoutError:
+        print(f"Dashboard section '{name}' timed out after {timeout}s")
+    except Exception as e:
+        print(f"Dashboard section '{name}' failed: {str(e)}")
+    return dict(EMPTY_SECTIONS[name]), False
+
+@router.get("/overview")
+async def get_dashboard_overview(
+    target_date: str = None,
+    current_user: dict = Depends(get_active_token_user),
+    supabase = Depends(get_supabase)
+) -> Dict[str, Any]:
+    """Get complete dashboard overview for business owner"""
+    
+    workspace_id = current_user["workspace_id"]
+    
+    if target_date:
+        try:
+            today = datetime.fromisoformat(target_date).date()
+        except ValueError:
+            today = datetime.now().date()
+    else:
+        today = datetime.now().date()
+    
+    cache_key = (str(workspace_id), today.isoformat())
+    cached = dashboard_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    timeout = get_settings().DASHBOARD_SECTION_TIMEOUT_SECONDS
+    sections = {
+        "bookings": _bookings_section(supabase, workspace_id, today),
+        "leads": _leads_section(supabase, workspace_id),
+        "forms": _forms_section(supabase, workspace_id),
+        "inventory": _inventory_section(supabase, workspace_id),
+        "alerts": _alerts_section(supabase, workspace_id),
+        "quick_stats": _quick_stats_section(supabase, workspace_id, today)
+    }
+    
+    results = await asyncio.gather(*[
+        _run_section(name, coro, timeout) for name, coro in sections.items()
+    ])
+    overview = {name: data for name, (data, _) in zip(sections, results)}
+    failed_sections = [name for name, (_, ok) in zip(sections, results) if not ok]
     
     # ============================================
     # COMBINED DASHBOARD
     # ============================================
     
-    return {
+    snapshot = {
         "workspace_id": workspace_id,
         "timestamp": datetime.now().isoformat(),
-        "bookings": booking_overview,
-        "leads": leads_overview,
-        "forms": forms_overview,
-        "inventory": inventory_overview,
-        "alerts": alerts_overview,
+        "bookings": overview["bookings"],
+        "leads": overview["leads"],
+        "forms": overview["forms"],
+        "inventory": overview["inventory"],
+        "alerts": overview["alerts"],
         "quick_stats": {
-            "total_contacts": len(conversations.data),
-            "active_services": len(
-                supabase.table("service_types").select("*").eq(
-                    "workspace_id", workspace_id
-                ).eq("is_active", True).execute().data
-            ),
-            "total_bookings_this_month": len([
-                b for b in supabase.table("bookings").select("*").eq(
-                    "workspace_id", workspace_id
-                ).execute().data
-                if datetime.fromisoformat(b["created_at"].replace('Z', '+00:00')).month == today.month
-            ])
-        }
+            "total_contacts": overview["leads"]["total_conversations"],
+            **overview["quick_stats"]
+        },
+        "partial": bool(failed_sections),
+        "failed_sections": failed_sections
     }
+    
+    # Partial snapshots are not cached so a transient failure isn't pinned
+    if not failed_sections:
+        dashboard_cache.set(cache_key, snapshot)
+    
+    return snapshot
 
 @router.get("/alerts")
 async def get_alerts(
-    current_user: dict = Depends(get_current_active_user),
+    current_user: dict = Depends(get_active_token_user),
     supabase = Depends(get_supabase),
     unread_only: bool = False
 ):
@@ -198,7 +288,7 @@ async def get_alerts(
     if unread_only:
         query = query.eq("is_read", False)
     
-    result = query.order("created_at", desc=True).execute()
+    result = await query.order("created_at", desc=True).execute()
     
     return result.data
 
@@ -210,13 +300,15 @@ async def mark_alert_read(
 ):
     """Mark alert as read"""
     
-    result = supabase.table("alerts").update(
+    result = await supabase.table("alerts").update(
         {"is_read": True}
     ).eq("id", alert_id).eq("workspace_id", current_user["workspace_id"]).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Alert not found")
     
+    invalidate_dashboard(current_user["workspace_id"])
+    
 @router.post("/analysis")
 async def get_ai_analysis(
     target_date: str = None,
@@ -225,16 +317,18 @@ async def get_ai_analysis(
 ):
     """Generate AI insights for a specific date (defaults to today)"""
     
-    # 1. Gather dashboard data for the requested date
+    try:
+        analysis_day = datetime.fromisoformat(target_date).date() if target_date else datetime.now().date()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="target_date must be YYYY-MM-DD")
+    
+    # 1. Gather dashboard data for the requested date (served from the overview cache when fresh)
     overview = await get_dashboard_overview(target_date, current_user, supabase)
-    settings = get_settings()
     
     display_date = target_date if target_date else "today"
     
     if not settings.GROQ_API_KEY:
         return {"analysis": "AI Analysis is not configured. Please add GROQ_API_KEY to your environment."}
-
-    client = Groq(api_key=settings.GROQ_API_KEY)
     
     # 2. Extract key metrics for the prompt
     metrics = {
@@ -244,9 +338,24 @@ async def get_ai_analysis(
         "low_stock_items": [i["name"] for i in overview["inventory"]["low_stock_items"]],
         "critical_alerts": [a["title"] for a in overview["alerts"]["recent_alerts"] if a["severity"] == "critical"]
     }
+    
+    # Insights only change when the metrics behind the prompt do
+    digest = hashlib.sha256(json.dumps(metrics, sort_keys=True).encode()).hexdigest()
+    cache_key = (str(current_user["workspace_id"]), analysis_day.isoformat(), digest)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return {"analysis": cached, "cached": True}
+    
+    allowed, retry_after = analysis_limiter.acquire(str(current_user["workspace_id"]))
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="AI analysis was refreshed too often, please try again shortly",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
 
     # 3. Create prompt
-    is_future = target_date and datetime.fromisoformat(target_date).date() > datetime.now().date()
+    is_future = analysis_day > datetime.now().date()
     perspective = f"preparing for {target_date}" if is_future else f"managing the business today ({display_date})"
 
     prompt = f"""
@@ -266,7 +375,7 @@ async def get_ai_analysis(
     """
 
     try:
-        completion = client.chat.completions.create(
+        completion = await get_groq_client().chat.completions.create(
             model="llama-3.3-70b-versatile",
             messages=[
                 {"role": "system", "content": "You are a helpful business operations assistant."},
@@ -275,7 +384,11 @@ async def get_ai_analysis(
             temperature=0.5,
             max_tokens=500
         )
-        return {"analysis": completion.choices[0].message.content}
+        analysis = completion.choices[0].message.content
+        # Metrics from a partial overview are incomplete, so don't pin insights built on them
+        if not overview["partial"]:
+            analysis_cache.set(cache_key, analysis)
+        return {"analysis": analysis, "cached": False}
     except Exception as e:
         print(f"AI Analysis Error: {str(e)}")
         raise HTTPException(status_code=500, detail="AI Analysis failed")
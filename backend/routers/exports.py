@@ -0,0 +1,220 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from auth import require_owner
+from database import get_supabase
+from config import get_settings
+from pagination import encode_cursor, decode_cursor, cursor_timestamp, cursor_uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import csv
+import io
+import json
+import zlib
+
+router = APIRouter(prefix="/api/exports", tags=["Exports"])
+settings = get_settings()
+
+@dataclass(frozen=True)
+class ExportSpec:
+    """Columns of an exported table and the ascending keyset its pages follow"""
+    columns: Tuple[str, ...]
+    key: Tuple[str, ...]
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "bookings": ExportSpec(
+        columns=("id", "contact_id", "service_type_id", "scheduled_at", "status", "notes",
+                 "reminder_sent_at", "created_at", "updated_at"),
+        key=("scheduled_at", "id")
+    ),
+    "contacts": ExportSpec(
+        columns=("id", "name", "email", "phone", "metadata", "created_at", "updated_at"),
+        key=("id",)
+    ),
+    "messages": ExportSpec(
+        columns=("id", "conversation_id", "sender_type", "sender_id", "channel", "content",
+                 "metadata", "is_read", "created_at"),
+        key=("conversation_id", "created_at", "id")
+    )
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# ============================================
+# PAGING
+# ============================================
+# Every page is one bounded query, so memory stays flat whatever the table size.
+
+def _cursor_values(spec: ExportSpec, cursor: str) -> List[str]:
+    """Validate a resume cursor against the export's key columns"""
+    values = decode_cursor(cursor, len(spec.key))
+    return [
+        cursor_timestamp(value) if column.endswith("_at") else cursor_uuid(value)
+        for column, value in zip(spec.key, values)
+    ]
+
+def _after_filter(key: Tuple[str, ...], after: List[str]) -> str:
+    """PostgREST or-filter for rows sorting after `after` on `key`"""
+    branches = []
+    for i, column in enumerate(key):
+        equal = [f'{key[j]}.eq."{after[j]}"' for j in range(i)]
+        greater = f'{column}.gt."{after[i]}"'
+        branches.append(f"and({','.join(equal + [greater])})" if equal else greater)
+    return ",".join(branches)
+
+async def _keyset_pages(
+    make_query: Callable[[], Any],
+    key: Tuple[str, ...],
+    after: Optional[List[str]]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Pages of make_query() in key order, starting after the key values `after`"""
+    page_size = settings.EXPORT_PAGE_SIZE
+    while True:
+        query = make_query()
+        if after:
+            query = query.or_(_after_filter(key, after))
+        for column in key:
+            query = query.order(column)
+        result = await query.limit(page_size).execute()
+        if result.data:
+            yield result.data
+        if len(result.data) < page_size:
+            return
+        after = [result.data[-1][column] for column in key]
+
+async def _workspace_pages(supabase, table: str, spec: ExportSpec, workspace_id: str, after):
+    """Rows of a table that carries workspace_id"""
+    async for page in _keyset_pages(
+        lambda: supabase.table(table).select(",".join(spec.columns)).eq("workspace_id", workspace_id),
+        spec.key,
+        after
+    ):
+        yield page
+
+async def _message_pages(supabase, spec: ExportSpec, workspace_id: str, after):
+    """Messages of the workspace, conversation by conversation
+    
+    Messages have no workspace_id, so they are scoped like the inbox does:
+    through the workspace's conversations, read in id order in batches.
+    """
+    batch = settings.EXPORT_CONVERSATION_BATCH
+    resume_from = after[0] if after else None
+    last_conversation_id = None
+    while True:
+        conversations = supabase.table("conversations").select("id").eq("workspace_id", workspace_id)
+        if last_conversation_id:
+            conversations = conversations.gt("id", last_conversation_id)
+        elif resume_from:
+            conversations = conversations.gte("id", resume_from)
+        result = await conversations.order("id").limit(batch).execute()
+        conversation_ids = [row["id"] for row in result.data]
+        if not conversation_ids:
+            return
+        
+        # The cursor only ever excludes rows of earlier conversations, so it
+        # can be applied to every batch unchanged
+        async for page in _keyset_pages(
+            lambda: supabase.table("messages").select(",".join(spec.columns)).in_(
+                "conversation_id", conversation_ids
+            ),
+            spec.key,
+            after
+        ):
+            yield page
+        
+        if len(conversation_ids) < batch:
+            return
+        last_conversation_id = conversation_ids[-1]
+
+# ============================================
+# ENCODING
+# ============================================
+
+def _ndjson_page(spec: ExportSpec, rows: List[Dict[str, Any]], cursor: str) -> str:
+    """One JSON object per row, then a {"_cursor": ...} checkpoint line"""
+    lines = [json.dumps(row, default=str, separators=(",", ":")) for row in rows]
+    lines.append(json.dumps({"_cursor": cursor}))
+    return "\n".join(lines) + "\n"
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+def _csv_page(spec: ExportSpec, rows: List[Dict[str, Any]], cursor: str) -> str:
+    """CSV rows; the page's last row carries the checkpoint in the _cursor column"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(rows):
+        checkpoint = cursor if i == len(rows) - 1 else ""
+        writer.writerow([_csv_value(row.get(column)) for column in spec.columns] + [checkpoint])
+    return buffer.getvalue()
+
+def _csv_header(spec: ExportSpec) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(list(spec.columns) + ["_cursor"])
+    return buffer.getvalue()
+
+@router.get("/{resource}")
+async def export_resource(
+    resource: str,
+    format: str = "ndjson",
+    cursor: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+    current_user: dict = Depends(require_owner),
+    supabase = Depends(get_supabase)
+):
+    """Stream every bookings, contacts or messages row of the workspace
+    
+    Rows are read in keyset pages and written as NDJSON or CSV while the
+    download runs. After each page a checkpoint cursor is emitted (a
+    {"_cursor": ...} line, or the _cursor column in CSV); pass the last one
+    received as `cursor` to resume an interrupted export. The body is
+    gzip-encoded when the client accepts it.
+    """
+    
+    spec = EXPORTS.get(resource)
+    if spec is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export. Choose from: {', '.join(EXPORTS)}"
+        )
+    if format not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Must be one of: {', '.join(MEDIA_TYPES)}"
+        )
+    
+    after = _cursor_values(spec, cursor) if cursor else None
+    workspace_id = current_user["workspace_id"]
+    if resource == "messages":
+        pages = _message_pages(supabase, spec, workspace_id, after)
+    else:
+        pages = _workspace_pages(supabase, resource, spec, workspace_id, after)
+    encode_page = _csv_page if format == "csv" else _ndjson_page
+    use_gzip = "gzip" in (accept_encoding or "").lower()
+    
+    async def body():
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if use_gzip else None
+        
+        def emit(text: str) -> bytes:
+            data = text.encode()
+            if compressor is None:
+                return data
+            # Sync-flush so each page reaches the client as soon as it is read
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        
+        if format == "csv" and not cursor:
+            yield emit(_csv_header(spec))
+        async for rows in pages:
+            checkpoint = encode_cursor(*[rows[-1][column] for column in spec.key])
+            yield emit(encode_page(spec, rows, checkpoint))
+        if compressor is not None:
+            yield compressor.flush()
+    
+    filename = f"{resource}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format], headers=headers)
@@ -1,103 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from models.schemas import MessageCreate, MessageResponse, ContactResponse, ContactFormRequest
-from auth import get_current_active_user
+from auth import get_current_active_user, get_active_token_user
 from database import get_supabase
-from typing import List
+from postgrest.exceptions import APIError
+from pagination import encode_cursor, decode_cursor, cursor_timestamp, cursor_uuid
+from typing import List, Optional
 from datetime import datetime
-from services.communication import communication_service
+from services.outbound_queue import outbound_queue
+from services.cache import invalidate_dashboard
+from services.automation import automation_engine, MESSAGE_RECEIVED
 
 router = APIRouter(prefix="/api/inbox", tags=["Inbox"])
 
 @router.post("/public/contact")
 async def submit_public_contact_form(
     form_request: ContactFormRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     supabase = Depends(get_supabase)
 ):
-    """Public endpoint for contact form submission"""
-    
-    # 1. Ensure workspace exists
-    workspace = supabase.table("workspaces").select("*").eq("id", str(form_request.workspace_id)).execute()
-    if not workspace.data:
-        raise HTTPException(status_code=404, detail="Workspace not found")
-        
-    # 2. Find or create contact
-    contact_res = supabase.table("contacts").select("*").eq(
-        "workspace_id", str(form_request.workspace_id)
-    ).eq("email", form_request.email).execute()
-    
-    if contact_res.data:
-        contact_id = contact_res.data[0]["id"]
-    else:
-        new_contact = supabase.table("contacts").insert({
-            "workspace_id": str(form_request.workspace_id),
-            "name": form_request.name,
-            "email": form_request.email,
-            "phone": form_request.phone,
-            "metadata": {"source": "public_contact_form"}
-        }).execute()
-        contact_id = new_contact.data[0]["id"]
-        
-    # 3. Find or create active conversation
-    conversation = supabase.table("conversations").select("*").eq(
-        "workspace_id", str(form_request.workspace_id)
-    ).eq("contact_id", contact_id).eq("status", "active").execute()
-    
-    if conversation.data:
-        conversation_id = conversation.data[0]["id"]
-    else:
-        new_conv = supabase.table("conversations").insert({
-            "workspace_id": str(form_request.workspace_id),
-            "contact_id": contact_id,
-            "status": "active"
+    """Public endpoint for contact form submission
+    
+    Contact, conversation, message and alert are written by one database
+    function. Retries carrying the same Idempotency-Key header don't create
+    duplicate messages; keys are kept for IDEMPOTENCY_KEY_TTL_HOURS. A message
+    from a contact whose conversation was archived reopens it.
+    """
+    
+    try:
+        result = await supabase.rpc("submit_contact_form", {
+            "p_workspace_id": str(form_request.workspace_id),
+            "p_name": form_request.name,
+            "p_email": form_request.email,
+            "p_phone": form_request.phone,
+            "p_message": form_request.message,
+            "p_idempotency_key": idempotency_key
         }).execute()
-        conversation_id = new_conv.data[0]["id"]
-        
-    # 4. Create message
-    supabase.table("messages").insert({
-        "conversation_id": conversation_id,
-        "sender_type": "customer",
-        "channel": "email",
-        "content": form_request.message,
-        "metadata": {}
-    }).execute()
-    
-    # 5. Update conversation last_message_at
-    supabase.table("conversations").update(
-        {"last_message_at": datetime.now().isoformat()}
-    ).eq("id", conversation_id).execute()
-    
-    # 6. Create alert
-    supabase.table("alerts").insert({
-        "workspace_id": str(form_request.workspace_id),
-        "type": "contact_message",
-        "title": "New Contact Message",
-        "message": f"{form_request.name} sent a message: {form_request.message[:50]}...",
-        "severity": "info",
-        "is_read": False
-    }).execute()
-    
-    return {"message": "Form submitted successfully"}
+    except APIError as e:
+        if e.message == "workspace_unavailable":
+            raise HTTPException(status_code=400, detail="Workspace not available for messages")
+        raise
+    
+    if not result.data["duplicate"]:
+        invalidate_dashboard(form_request.workspace_id)
+        automation_engine.publish(form_request.workspace_id, MESSAGE_RECEIVED, {
+            "conversation_id": result.data["conversation_id"],
+            "message_id": result.data["message_id"],
+            "channel": "email",
+            "content": form_request.message,
+            "contact": {
+                "name": form_request.name,
+                "email": form_request.email,
+                "phone": form_request.phone
+            }
+        })
+    
+    return {"message": "Form submitted successfully", "duplicate": result.data["duplicate"]}
 
 @router.get("/conversations")
 async def list_conversations(
-    current_user: dict = Depends(get_current_active_user),
+    response: Response,
+    current_user: dict = Depends(get_active_token_user),
     supabase = Depends(get_supabase),
-    status_filter: str = "active"
+    status_filter: str = "active",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
 ):
-    """List all conversations for workspace"""
+    """List conversations for workspace, most recent first
+    
+    Pages are keyed on (last_message_at, id). When more rows exist the cursor
+    for the next page is returned in the X-Next-Cursor header.
+    """
     
-    result = supabase.table("conversations").select(
+    query = supabase.table("conversations").select(
         "*, contacts(*)"
-    ).eq("workspace_id", current_user["workspace_id"]).eq("status", status_filter).order("last_message_at", desc=True).execute()
+    ).eq("workspace_id", current_user["workspace_id"]).eq("status", status_filter)
+    
+    if cursor:
+        last_message_at, last_id = decode_cursor(cursor, 2)
+        last_message_at, last_id = cursor_timestamp(last_message_at), cursor_uuid(last_id)
+        if last_message_at is None:
+            # Conversations without messages sort first (Postgres DESC default)
+            query = query.or_(
+                f"and(last_message_at.is.null,id.lt.{last_id}),"
+                f"last_message_at.not.is.null"
+            )
+        else:
+            query = query.or_(
+                f'last_message_at.lt."{last_message_at}",'
+                f'and(last_message_at.eq."{last_message_at}",id.lt.{last_id})'
+            )
+    
+    result = await query.order("last_message_at", desc=True).order(
+        "id", desc=True
+    ).limit(limit + 1).execute()
     
-    for conversation in result.data:
-        unread = supabase.table("messages").select("id").eq(
-            "conversation_id", conversation["id"]
-        ).eq("is_read", False).eq("sender_type", "customer").execute()
-        
-        conversation["unread_count"] = len(unread.data)
+    conversations = result.data[:limit]
+    if len(result.data) > limit:
+        last = conversations[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last["last_message_at"], last["id"])
     
-    return result.data
+    # unread_count is a column kept current by the messages triggers
+    return conversations
 
 @router.get("/conversations/{conversation_id}/messages")
 async def get_conversation_messages(
@@ -108,7 +111,7 @@ async def get_conversation_messages(
     """Get all messages in a conversation"""
     
     # Verify conversation belongs to workspace
-    conversation = supabase.table("conversations").select("*").eq(
+    conversation = await supabase.table("conversations").select("*").eq(
         "id", conversation_id
     ).eq("workspace_id", current_user["workspace_id"]).execute()
     
@@ -116,17 +119,19 @@ async def get_conversation_messages(
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     # Get messages
-    messages = supabase.table("messages").select("*").eq(
+    messages = await supabase.table("messages").select("*").eq(
         "conversation_id", conversation_id
     ).order("created_at", desc=False).execute()
     
     # Mark customer messages as read
-    supabase.table("messages").update(
+    await supabase.table("messages").update(
         {"is_read": True}
     ).eq("conversation_id", conversation_id).eq(
         "sender_type", "customer"
     ).eq("is_read", False).execute()
     
+    invalidate_dashboard(current_user["workspace_id"])
+    
     return {
         "conversation": conversation.data[0],
         "messages": messages.data
@@ -143,14 +148,22 @@ async def send_message(
     """Send a message in a conversation (staff reply)"""
     
     # 1. Verify conversation and get contact info
-    conversation = supabase.table("conversations").select("*, contacts(*)").eq(
+    conversation = await supabase.table("conversations").select("*, contacts(*)").eq(
         "id", conversation_id
     ).eq("workspace_id", current_user["workspace_id"]).execute()
     
     if not conversation.data:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # 2. Create message in DB
+    # 2. Resolve the external recipient, if this channel delivers outside the app
+    contact = conversation.data[0].get("contacts") or {}
+    recipient = None
+    if channel == "email":
+        recipient = contact.get("email")
+    elif channel == "sms":
+        recipient = contact.get("phone")
+    
+    # 3. Create message in DB
     message_dict = {
         "conversation_id": conversation_id,
         "sender_type": "staff",
@@ -158,10 +171,10 @@ async def send_message(
         "channel": channel,
         "content": content,
         "is_read": True,
-        "metadata": {}
+        "metadata": {"delivery": {"status": "queued"}} if recipient else {}
     }
     
-    result = supabase.table("messages").insert(message_dict).execute()
+    result = await supabase.table("messages").insert(message_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -169,53 +182,43 @@ async def send_message(
             detail="Failed to send message"
         )
     
-    # 3. Update conversation last_message_at
-    supabase.table("conversations").update(
+    # 4. Update conversation last_message_at
+    await supabase.table("conversations").update(
         {"last_message_at": datetime.now().isoformat()}
     ).eq("id", conversation_id).execute()
     
-    # 4. Trigger actual email/SMS via service
-    conv_data = conversation.data[0]
-    contact = conv_data.get("contacts")
-    
-    if contact and channel in ["email", "sms"]:
-        if channel == "email" and contact.get("email"):
-            await communication_service.send_email(
-                to_email=contact["email"],
-                subject=f"Update from {current_user.get('full_name', 'CareOps')}",
-                content=content
-            )
-        elif channel == "sms" and contact.get("phone"):
-            await communication_service.send_sms(
-                to_phone=contact["phone"],
-                content=content
-            )
+    invalidate_dashboard(current_user["workspace_id"])
+    
+    # 5. Queue the actual email/SMS; delivery status is written back to metadata
+    if recipient:
+        await outbound_queue.enqueue(
+            supabase,
+            workspace_id=current_user["workspace_id"],
+            message_id=result.data[0]["id"],
+            channel=channel,
+            recipient=recipient,
+            subject=f"Update from {current_user.get('full_name', 'CareOps')}",
+            content=content
+        )
     
     return result.data[0]
 
 @router.get("/unread-count")
 async def get_unread_count(
-    current_user: dict = Depends(get_current_active_user),
+    current_user: dict = Depends(get_active_token_user),
     supabase = Depends(get_supabase)
 ):
     """Get total unread message count"""
     
-    # Get all conversations for workspace
-    conversations = supabase.table("conversations").select("id").eq(
-        "workspace_id", current_user["workspace_id"]
+    # Maintained by the messages triggers, so this is a single-row read
+    workspace = await supabase.table("workspaces").select("unread_count").eq(
+        "id", current_user["workspace_id"]
     ).execute()
     
-    conversation_ids = [c["id"] for c in conversations.data]
-    
-    if not conversation_ids:
+    if not workspace.data:
         return {"unread_count": 0}
     
-    # Count unread messages
-    unread = supabase.table("messages").select("id").in_(
-        "conversation_id", conversation_ids
-    ).eq("is_read", False).eq("sender_type", "customer").execute()
-    
-    return {"unread_count": len(unread.data)}
+    return {"unread_count": workspace.data[0]["unread_count"]}
 
 @router.patch("/conversations/{conversation_id}/archive")
 async def archive_conversation(
@@ -225,7 +228,7 @@ async def archive_conversation(
 ):
     """Archive a conversation"""
     
-    result = supabase.table("conversations").update(
+    result = await supabase.table("conversations").update(
         {"status": "archived"}
     ).eq("id", conversation_id).eq(
         "workspace_id", current_user["workspace_id"]
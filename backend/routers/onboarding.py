@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from models.schemas import (
     WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse,
     IntegrationCreate, IntegrationResponse,
@@ -8,14 +9,18 @@ from models.schemas import (
     InventoryItemCreate,
     VoiceOnboardingResponse
 )
-from auth import get_current_active_user, require_owner
+from auth import get_current_active_user, require_owner, invalidate_user
 from database import get_supabase
-from services.voice_onboarding import voice_service
+from config import get_settings
+from services.voice_onboarding import voice_service, audio_duration
+from services.availability import invalidate_availability, warm_availability
+from services.automation import automation_engine, INVENTORY_LOW
 from typing import Optional
 import base64
-import io
+import json
 
 router = APIRouter(prefix="/api/onboarding", tags=["Onboarding"])
+settings = get_settings()
 
 # ============================================
 # STEP 1: CREATE WORKSPACE
@@ -37,7 +42,7 @@ async def create_workspace(
         "is_active": False  # Not active until onboarding complete
     }
     
-    result = supabase.table("workspaces").insert(workspace_dict).execute()
+    result = await supabase.table("workspaces").insert(workspace_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -48,9 +53,10 @@ async def create_workspace(
     workspace = result.data[0]
     
     # Update user's workspace_id
-    supabase.table("users").update(
+    await supabase.table("users").update(
         {"workspace_id": workspace["id"]}
     ).eq("id", current_user["id"]).execute()
+    invalidate_user(current_user["id"])
     
     return workspace
 
@@ -67,7 +73,7 @@ async def get_workspace(
             detail="No workspace found for this user"
         )
     
-    result = supabase.table("workspaces").select("*").eq(
+    result = await supabase.table("workspaces").select("*").eq(
         "id", current_user["workspace_id"]
     ).execute()
     
@@ -86,7 +92,7 @@ async def get_workspace_public(
 ):
     """Get public workspace details by ID"""
     
-    result = supabase.table("workspaces").select("id, name, address, timezone").eq(
+    result = await supabase.table("workspaces").select("id, name, address, timezone").eq(
         "id", workspace_id
     ).execute()
     
@@ -124,7 +130,7 @@ async def create_integration(
         "is_active": True
     }
     
-    result = supabase.table("integrations").insert(integration_dict).execute()
+    result = await supabase.table("integrations").insert(integration_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -141,7 +147,7 @@ async def list_integrations(
 ):
     """List all integrations for workspace"""
     
-    result = supabase.table("integrations").select("*").eq(
+    result = await supabase.table("integrations").select("*").eq(
         "workspace_id", current_user["workspace_id"]
     ).execute()
     
@@ -167,7 +173,7 @@ async def create_contact_form(
         "is_active": True
     }
     
-    result = supabase.table("form_templates").insert(form_dict).execute()
+    result = await supabase.table("form_templates").insert(form_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -198,7 +204,7 @@ async def create_service_type(
         "is_active": True
     }
     
-    result = supabase.table("service_types").insert(service_dict).execute()
+    result = await supabase.table("service_types").insert(service_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -211,6 +217,7 @@ async def create_service_type(
 @router.post("/availability-slots", status_code=status.HTTP_201_CREATED)
 async def create_availability_slot(
     slot_data: AvailabilitySlotCreate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(require_owner),
     supabase = Depends(get_supabase)
 ):
@@ -223,7 +230,7 @@ async def create_availability_slot(
         "end_time": slot_data.end_time
     }
     
-    result = supabase.table("availability_slots").insert(slot_dict).execute()
+    result = await supabase.table("availability_slots").insert(slot_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -231,6 +238,9 @@ async def create_availability_slot(
             detail="Failed to create availability slot"
         )
     
+    invalidate_availability(current_user["workspace_id"], slot_data.service_type_id)
+    background_tasks.add_task(warm_availability, supabase, current_user["workspace_id"], slot_data.service_type_id)
+    
     return result.data[0]
 
 # ============================================
@@ -260,7 +270,7 @@ async def create_post_booking_form(
         "is_active": True
     }
     
-    result = supabase.table("form_templates").insert(form_dict).execute()
+    result = await supabase.table("form_templates").insert(form_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -291,7 +301,7 @@ async def create_inventory_item(
         "unit": item_data.unit
     }
     
-    result = supabase.table("inventory_items").insert(item_dict).execute()
+    result = await supabase.table("inventory_items").insert(item_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -299,7 +309,11 @@ async def create_inventory_item(
             detail="Failed to create inventory item"
         )
     
-    return result.data[0]
+    item = result.data[0]
+    if item["quantity"] <= item["low_stock_threshold"]:
+        automation_engine.publish(current_user["workspace_id"], INVENTORY_LOW, {"item": item})
+    
+    return item
 
 # ============================================
 # STEP 7: ADD STAFF
@@ -315,9 +329,9 @@ async def add_staff(
     
     # In a real app, this would send an invite or create a user
     # For prototype, we'll just create the user directly
-    from auth import get_password_hash
+    from auth import get_password_hash_async
     
-    hashed_password = get_password_hash(staff_data.get("password", "staff123"))
+    hashed_password = await get_password_hash_async(staff_data.get("password", "staff123"))
     
     user_dict = {
         "workspace_id": current_user["workspace_id"],
@@ -328,7 +342,7 @@ async def add_staff(
         "permissions": staff_data.get("permissions", {})
     }
     
-    result = supabase.table("users").insert(user_dict).execute()
+    result = await supabase.table("users").insert(user_dict).execute()
     
     if not result.data:
         raise HTTPException(
@@ -353,7 +367,7 @@ async def activate_workspace(
     
     # Validate requirements
     # 1. Check for at least one integration (email or SMS)
-    integrations = supabase.table("integrations").select("*").eq(
+    integrations = await supabase.table("integrations").select("*").eq(
         "workspace_id", workspace_id
     ).execute()
     
@@ -364,7 +378,7 @@ async def activate_workspace(
         )
     
     # 2. Check for at least one service type
-    services = supabase.table("service_types").select("*").eq(
+    services = await supabase.table("service_types").select("*").eq(
         "workspace_id", workspace_id
     ).execute()
     
@@ -376,7 +390,7 @@ async def activate_workspace(
     
     # 3. Check for availability slots
     service_ids = [s["id"] for s in services.data]
-    slots = supabase.table("availability_slots").select("*").in_(
+    slots = await supabase.table("availability_slots").select("*").in_(
         "service_type_id", service_ids
     ).execute()
     
@@ -387,7 +401,7 @@ async def activate_workspace(
         )
     
     # Activate workspace
-    result = supabase.table("workspaces").update(
+    result = await supabase.table("workspaces").update(
         {"is_active": True}
     ).eq("id", workspace_id).execute()
     
@@ -397,24 +411,42 @@ async def activate_workspace(
 # VOICE ONBOARDING
 # ============================================
 
+def _voice_upload(audio: UploadFile, duration_seconds: Optional[float]):
+    """Validate a recording and hand over its spooled file without copying it
+    
+    The multipart parser has already spooled the upload (in memory up to 1MB,
+    then on disk) and BodySizeLimitMiddleware stopped it at the byte limit.
+    Duration is read from WAV headers, otherwise taken from the client.
+    """
+    if audio.size is not None and audio.size > settings.VOICE_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Recording exceeds {settings.VOICE_MAX_UPLOAD_BYTES} bytes"
+        )
+    
+    duration = audio_duration(audio.file) or duration_seconds
+    if duration is not None and duration > settings.VOICE_MAX_DURATION_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Recording is longer than {settings.VOICE_MAX_DURATION_SECONDS} seconds"
+        )
+    
+    return (audio.filename or "recording.webm", audio.file)
+
 @router.post("/voice/transcribe", response_model=VoiceOnboardingResponse)
 async def voice_onboarding_transcribe(
     audio: UploadFile = File(...),
     step: str = Form("general"),
+    duration_seconds: Optional[float] = Form(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Process voice input for onboarding"""
     
+    audio_file = _voice_upload(audio, duration_seconds)
+    
     try:
-        # Read audio file
-        audio_content = await audio.read()
-        
-        # Create file-like object for Groq
-        file_obj = io.BytesIO(audio_content)
-        file_obj.name = audio.filename or "recording.webm"
-        
         # Process voice input
-        result = await voice_service.process_voice_input(file_obj, step)
+        result = await voice_service.process_voice_input(audio_file, step)
         
         return {
             "extracted_data": result["extracted_data"],
@@ -428,6 +460,48 @@ async def voice_onboarding_transcribe(
             detail=f"Voice processing failed: {str(e)}"
         )
 
+@router.post("/voice/transcribe/stream")
+async def voice_onboarding_transcribe_stream(
+    audio: UploadFile = File(...),
+    step: str = Form("general"),
+    duration_seconds: Optional[float] = Form(None),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Process voice input for onboarding, streaming progress as NDJSON
+    
+    Emits a transcript event, extraction tokens as they arrive and a final
+    result event shaped like the /voice/transcribe response. Failures after
+    the stream has started arrive as an error event.
+    """
+    
+    audio_file = _voice_upload(audio, duration_seconds)
+    
+    # Transcribe before streaming: the upload is closed once this handler returns
+    try:
+        transcript = await voice_service.transcribe_audio(audio_file)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Voice processing failed: {str(e)}"
+        )
+    
+    async def events():
+        yield json.dumps({"type": "transcript", "text": transcript}) + "\n"
+        try:
+            async for event in voice_service.stream_onboarding_data(transcript, step):
+                if event["type"] == "result":
+                    event = {
+                        "type": "result",
+                        "extracted_data": event["extracted_data"],
+                        "confidence": event["confidence"],
+                        "next_step": f"Review and confirm {step} details"
+                    }
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": f"Voice processing failed: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.get("/status")
 async def get_onboarding_status(
     current_user: dict = Depends(get_current_active_user),
@@ -454,20 +528,20 @@ async def get_onboarding_status(
         }
     
     # Check each step
-    workspace = supabase.table("workspaces").select("*").eq("id", workspace_id).execute()
-    integrations = supabase.table("integrations").select("*").eq("workspace_id", workspace_id).execute()
+    workspace = await supabase.table("workspaces").select("*").eq("id", workspace_id).execute()
+    integrations = await supabase.table("integrations").select("*").eq("workspace_id", workspace_id).execute()
     
     # Contact form (Step 3) - form template with no service_type_id
-    contact_forms = supabase.table("form_templates").select("*").eq("workspace_id", workspace_id).is_("service_type_id", "null").execute()
+    contact_forms = await supabase.table("form_templates").select("*").eq("workspace_id", workspace_id).is_("service_type_id", "null").execute()
     
-    services = supabase.table("service_types").select("*").eq("workspace_id", workspace_id).execute()
+    services = await supabase.table("service_types").select("*").eq("workspace_id", workspace_id).execute()
     
     # Post-booking forms (Step 5) - form template WITH service_type_id
-    post_booking_forms = supabase.table("form_templates").select("*").eq("workspace_id", workspace_id).not_.is_("service_type_id", "null").execute()
+    post_booking_forms = await supabase.table("form_templates").select("*").eq("workspace_id", workspace_id).not_.is_("service_type_id", "null").execute()
     
-    inventory = supabase.table("inventory_items").select("*").eq("workspace_id", workspace_id).execute()
+    inventory = await supabase.table("inventory_items").select("*").eq("workspace_id", workspace_id).execute()
     
-    staff = supabase.table("users").select("*").eq("workspace_id", workspace_id).eq("role", "staff").execute()
+    staff = await supabase.table("users").select("*").eq("workspace_id", workspace_id).eq("role", "staff").execute()
     
     steps = {
         "workspace_created": bool(workspace.data),
@@ -0,0 +1,296 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from config import get_settings
+from services.cache import TTLCache, invalidate_dashboard
+from services.outbound_queue import outbound_queue
+
+settings = get_settings()
+
+# Domain events published by the routers
+BOOKING_CREATED = "booking.created"
+BOOKING_STATUS_CHANGED = "booking.status_changed"
+MESSAGE_RECEIVED = "message.received"
+INVENTORY_LOW = "inventory.low"
+
+# Compiled rules per workspace, already grouped by event_type. Rules are only
+# edited in the database, so a change takes effect once its entry expires.
+rules_cache = TTLCache(
+    "automation_rules",
+    maxsize=settings.AUTOMATION_RULES_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTOMATION_RULES_CACHE_TTL_SECONDS
+)
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda actual, expected: actual == expected,
+    "ne": lambda actual, expected: actual != expected,
+    "in": lambda actual, expected: actual in expected,
+    "not_in": lambda actual, expected: actual not in expected,
+    "gt": lambda actual, expected: actual is not None and actual > expected,
+    "gte": lambda actual, expected: actual is not None and actual >= expected,
+    "lt": lambda actual, expected: actual is not None and actual < expected,
+    "lte": lambda actual, expected: actual is not None and actual <= expected,
+    "exists": lambda actual, expected: (actual is not None) == bool(expected)
+}
+
+TEMPLATE_FIELD = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+
+@dataclass
+class CompiledRule:
+    id: str
+    name: str
+    event_type: str
+    matches: Predicate
+    actions: List[Dict[str, Any]]
+
+@dataclass
+class AutomationEvent:
+    workspace_id: str
+    event_type: str
+    payload: Dict[str, Any]
+
+def lookup(payload: Dict[str, Any], path: str) -> Any:
+    """Resolve a dotted path such as "booking.status" in an event payload"""
+    value: Any = payload
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def compile_conditions(conditions: Optional[Dict[str, Any]]) -> Predicate:
+    """Turn a rule's conditions JSON into a single predicate
+
+    Each key is a dotted payload path. A plain value means equality, an
+    object maps operators to operands, e.g. {"booking.status": {"in": [...]}}.
+    Every condition must hold.
+    """
+    checks = []
+    for path, expected in (conditions or {}).items():
+        tests = expected.items() if isinstance(expected, dict) else [("eq", expected)]
+        for op, operand in tests:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown condition operator: {op}")
+            checks.append((path, OPERATORS[op], operand))
+
+    def matches(payload: Dict[str, Any]) -> bool:
+        try:
+            return all(test(lookup(payload, path), operand) for path, test, operand in checks)
+        except TypeError:
+            # Comparing incompatible types never matches
+            return False
+
+    return matches
+
+def compile_rules(rows: List[Dict[str, Any]]) -> Dict[str, List[CompiledRule]]:
+    """Index a workspace's active rules by event_type, skipping invalid ones"""
+    index: Dict[str, List[CompiledRule]] = {}
+    for row in rows:
+        try:
+            actions = row["actions"] if isinstance(row["actions"], list) else [row["actions"]]
+            rule = CompiledRule(
+                id=row["id"],
+                name=row["name"],
+                event_type=row["event_type"],
+                matches=compile_conditions(row.get("conditions")),
+                actions=actions
+            )
+        except (ValueError, AttributeError) as e:
+            print(f"Skipping automation rule {row.get('id')}: {str(e)}")
+            continue
+        index.setdefault(rule.event_type, []).append(rule)
+    return index
+
+def render(template: Optional[str], payload: Dict[str, Any]) -> str:
+    """Fill {{dotted.path}} placeholders from the event payload"""
+    def field(match):
+        value = lookup(payload, match.group(1))
+        return "" if value is None else str(value)
+    return TEMPLATE_FIELD.sub(field, template or "")
+
+class AutomationEngine:
+    """Matches domain events against automation_rules and runs their actions
+
+    Routers publish events without waiting. Worker tasks look up the
+    workspace's compiled rules for the event's type only, so the cost per
+    event doesn't depend on how many rules exist for other events. The queue
+    lives in memory: events are dropped when it is full or the process stops.
+    """
+
+    def __init__(self):
+        self.supabase = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._actions = {
+            "send_email": self._send_email,
+            "send_sms": self._send_sms,
+            "create_alert": self._create_alert,
+            "send_forms": self._send_forms
+        }
+
+    def publish(self, workspace_id, event_type: str, payload: Dict[str, Any]) -> None:
+        """Queue an event for the workers; never blocks the request"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(AutomationEvent(str(workspace_id), event_type, payload))
+        except asyncio.QueueFull:
+            print(f"ERROR: Automation queue full, dropped {event_type} for workspace {workspace_id}")
+
+    async def start(self, supabase) -> None:
+        """Start the workers for this process"""
+        if self._queue is None:
+            self.supabase = supabase
+            self._queue = asyncio.Queue(maxsize=settings.AUTOMATION_QUEUE_SIZE)
+            self._workers = [
+                asyncio.create_task(self._run())
+                for _ in range(settings.AUTOMATION_WORKERS)
+            ]
+
+    async def stop(self) -> None:
+        """Stop the workers, dropping events that haven't been processed"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def _run(self) -> None:
+        while True:
+            event = await self._queue.get()
+            try:
+                await self.handle(event)
+            except Exception as e:
+                print(f"ERROR: Automation failed for {event.event_type}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _rules(self, workspace_id: str) -> Dict[str, List[CompiledRule]]:
+        index = rules_cache.get(workspace_id)
+        if index is None:
+            result = await self.supabase.table("automation_rules").select(
+                "id, name, event_type, conditions, actions"
+            ).eq("workspace_id", workspace_id).eq("is_active", True).execute()
+            index = compile_rules(result.data)
+            rules_cache.set(workspace_id, index)
+        return index
+
+    async def handle(self, event: AutomationEvent) -> None:
+        """Run the actions of every rule matching this event"""
+        index = await self._rules(event.workspace_id)
+        for rule in index.get(event.event_type, []):
+            if not rule.matches(event.payload):
+                continue
+            for action in rule.actions:
+                handler = self._actions.get(action.get("type"))
+                if handler is None:
+                    print(f"Automation rule {rule.id} has unknown action {action.get('type')}")
+                    continue
+                try:
+                    await handler(event, action)
+                except Exception as e:
+                    print(f"ERROR: Automation rule {rule.id} action {action.get('type')} failed: {str(e)}")
+
+    async def _contact(self, event: AutomationEvent) -> Optional[Dict[str, Any]]:
+        contact = event.payload.get("contact")
+        if contact:
+            return contact
+        contact_id = lookup(event.payload, "booking.contact_id") or event.payload.get("contact_id")
+        if not contact_id:
+            return None
+        result = await self.supabase.table("contacts").select("*").eq(
+            "id", contact_id
+        ).eq("workspace_id", event.workspace_id).execute()
+        if result.data:
+            # Later actions of the same event reuse it and templates can refer to it
+            event.payload["contact"] = result.data[0]
+            return result.data[0]
+        return None
+
+    async def _notify(self, event: AutomationEvent, action: Dict[str, Any], channel: str, recipient_field: str) -> None:
+        """Record a system message in the contact's conversation and queue delivery"""
+        contact = await self._contact(event)
+        recipient = (contact or {}).get(recipient_field)
+        if not recipient:
+            return
+
+        content = render(action.get("body") or action.get("content"), event.payload)
+        conversation_id = event.payload.get("conversation_id")
+        if not conversation_id and contact.get("id"):
+            conversation = await self.supabase.table("conversations").select("id").eq(
+                "contact_id", contact["id"]
+            ).execute()
+            conversation_id = conversation.data[0]["id"] if conversation.data else None
+
+        message_id = None
+        if conversation_id:
+            message = await self.supabase.table("messages").insert({
+                "conversation_id": conversation_id,
+                "sender_type": "system",
+                "channel": channel,
+                "content": content,
+                "is_read": True,
+                "metadata": {"delivery": {"status": "queued"}, "automation": True}
+            }).execute()
+            message_id = message.data[0]["id"]
+
+        await outbound_queue.enqueue(
+            self.supabase,
+            workspace_id=event.workspace_id,
+            message_id=message_id,
+            channel=channel,
+            recipient=recipient,
+            subject=render(action.get("subject"), event.payload) or None,
+            content=content
+        )
+
+    async def _send_email(self, event: AutomationEvent, action: Dict[str, Any]) -> None:
+        await self._notify(event, action, "email", "email")
+
+    async def _send_sms(self, event: AutomationEvent, action: Dict[str, Any]) -> None:
+        await self._notify(event, action, "sms", "phone")
+
+    async def _create_alert(self, event: AutomationEvent, action: Dict[str, Any]) -> None:
+        await self.supabase.table("alerts").insert({
+            "workspace_id": event.workspace_id,
+            "type": action.get("alert_type") or event.event_type,
+            "severity": action.get("severity", "info"),
+            "title": render(action.get("title"), event.payload) or "Automation",
+            "message": render(action.get("message"), event.payload),
+            "link_to": render(action.get("link_to"), event.payload) or None,
+            "is_read": False
+        }).execute()
+        invalidate_dashboard(event.workspace_id)
+
+    async def _send_forms(self, event: AutomationEvent, action: Dict[str, Any]) -> None:
+        """Create pending submissions of the booking's post-booking forms"""
+        booking = event.payload.get("booking")
+        if not booking:
+            return
+
+        query = self.supabase.table("form_templates").select("id").eq(
+            "workspace_id", event.workspace_id
+        ).eq("is_active", True)
+        if action.get("form_template_ids"):
+            query = query.in_("id", action["form_template_ids"])
+        else:
+            query = query.eq("service_type_id", booking["service_type_id"])
+        templates = await query.execute()
+
+        if templates.data:
+            await self.supabase.table("form_submissions").insert([
+                {
+                    "form_template_id": template["id"],
+                    "booking_id": booking["id"],
+                    "contact_id": booking["contact_id"],
+                    "status": "pending"
+                }
+                for template in templates.data
+            ]).execute()
+            invalidate_dashboard(event.workspace_id)
+
+# Singleton instance
+automation_engine = AutomationEngine()
@@ -0,0 +1,243 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import get_settings
+from services.cache import TTLCache
+
+settings = get_settings()
+
+Interval = Tuple[datetime, datetime]
+
+# Free slots per (workspace_id, service_type_id, local date)
+availability_cache = TTLCache(
+    "availability",
+    maxsize=settings.AVAILABILITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS
+)
+
+# Bookings in these states no longer occupy their time slot
+NON_BLOCKING_STATUSES = ("cancelled",)
+
+def workspace_zone(name: Optional[str]):
+    """Resolve a workspace timezone name, falling back to UTC"""
+    try:
+        return ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a PostgREST timestamptz, treating naive values as UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_time(value: str) -> time:
+    """Parse an availability slot time (HH:MM or HH:MM:SS)"""
+    return time.fromisoformat(value)
+
+def day_of_week(day: date) -> int:
+    """Day index used by availability_slots (0=Sunday)"""
+    return (day.weekday() + 1) % 7
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort intervals and merge the ones that overlap or touch"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def booking_intervals(bookings: Iterable[dict], default_minutes: int) -> List[Interval]:
+    """Busy intervals for bookings that still hold their slot"""
+    intervals = []
+    for booking in bookings:
+        if booking.get("status") in NON_BLOCKING_STATUSES:
+            continue
+        start = parse_timestamp(booking["scheduled_at"])
+        service = booking.get("service_types") or {}
+        minutes = service.get("duration_minutes") or default_minutes
+        intervals.append((start, start + timedelta(minutes=minutes)))
+    return merge_intervals(intervals)
+
+def candidate_starts(day: date, windows: Iterable[Tuple[time, time]], duration: timedelta, tz) -> List[datetime]:
+    """Slot start times (in UTC) for one local day, stepping by the service duration
+
+    Slots are stepped in UTC so they stay `duration` apart across a DST change,
+    and a slot whose local start or end falls outside its window's wall-clock
+    times (skipped by a spring-forward gap) is dropped.
+    """
+    starts = set()
+    for window_start, window_end in windows:
+        opens = datetime.combine(day, window_start, tzinfo=tz).astimezone(timezone.utc)
+        closes = datetime.combine(day, window_end, tzinfo=tz).astimezone(timezone.utc)
+        local_open, local_close = opens.astimezone(tz), closes.astimezone(tz)
+        # Windows untouched by a DST change skip the per-slot wall-clock check
+        shifts = (
+            local_open.time() != window_start
+            or local_close.time() != window_end
+            or local_open.utcoffset() != local_close.utcoffset()
+        )
+        current = opens
+        while current + duration <= closes:
+            if not shifts or (
+                current.astimezone(tz).time() >= window_start
+                and (current + duration).astimezone(tz).time() <= window_end
+            ):
+                starts.add(current)
+            current += duration
+    return sorted(starts)
+
+def free_starts(candidates: List[datetime], busy: List[Interval], duration: timedelta) -> List[datetime]:
+    """Sweep sorted candidates against merged busy intervals in O(n + m)"""
+    free = []
+    i = 0
+    for start in candidates:
+        end = start + duration
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        if i == len(busy) or busy[i][0] >= end:
+            free.append(start)
+    return free
+
+def compute_availability(
+    first_day: date,
+    last_day: date,
+    slots: Iterable[dict],
+    busy: List[Interval],
+    duration_minutes: int,
+    tz
+) -> Dict[str, List[str]]:
+    """Free slot start times per local date for an inclusive date range"""
+    duration = timedelta(minutes=duration_minutes)
+
+    weekly: Dict[int, List[Tuple[time, time]]] = {}
+    for slot in slots:
+        weekly.setdefault(slot["day_of_week"], []).append(
+            (parse_time(slot["start_time"]), parse_time(slot["end_time"]))
+        )
+
+    # Days are visited in order, so every candidate list continues the sweep
+    candidates = []
+    day = first_day
+    while day <= last_day:
+        candidates.extend(candidate_starts(day, weekly.get(day_of_week(day), []), duration, tz))
+        day += timedelta(days=1)
+
+    by_date: Dict[str, List[str]] = {}
+    day = first_day
+    while day <= last_day:
+        by_date[day.isoformat()] = []
+        day += timedelta(days=1)
+
+    for start in free_starts(candidates, busy, duration):
+        local_start = start.astimezone(tz)
+        by_date[local_start.date().isoformat()].append(local_start.isoformat())
+
+    return by_date
+
+def local_window(first_day: date, last_day: date, tz) -> Interval:
+    """UTC bounds covering the local days of a date range"""
+    start = datetime.combine(first_day, time.min, tzinfo=tz)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+async def _compute_range(supabase, workspace_id: str, service_type_id: str, first_day: date, last_day: date):
+    """Load a service's calendar and compute free slots for a date range"""
+    
+    # Get service type with its workspace timezone
+    service = await supabase.table("service_types").select(
+        "id, duration_minutes, workspaces(timezone)"
+    ).eq("id", service_type_id).eq("workspace_id", workspace_id).execute()
+    
+    if not service.data:
+        return None
+    
+    service = service.data[0]
+    tz = workspace_zone((service.get("workspaces") or {}).get("timezone"))
+    window_start, window_end = local_window(first_day, last_day, tz)
+    
+    # Availability slots and bookings that may overlap the window. The
+    # lookback catches bookings starting the previous day that run past midnight.
+    slots, existing_bookings = await asyncio.gather(
+        supabase.table("availability_slots").select(
+            "day_of_week, start_time, end_time"
+        ).eq("service_type_id", service_type_id).execute(),
+        supabase.table("bookings").select(
+            "scheduled_at, status, service_types(duration_minutes)"
+        ).eq(
+            "service_type_id", service_type_id
+        ).not_.in_(
+            "status", list(NON_BLOCKING_STATUSES)
+        ).gte(
+            "scheduled_at", (window_start - timedelta(days=1)).isoformat()
+        ).lt(
+            "scheduled_at", window_end.isoformat()
+        ).execute()
+    )
+    
+    busy = booking_intervals(existing_bookings.data, service["duration_minutes"])
+    return compute_availability(
+        first_day, last_day, slots.data, busy, service["duration_minutes"], tz
+    )
+
+def _cache_ids(workspace_id, service_type_id) -> Tuple[str, str]:
+    """Canonical UUID strings, so query-string ids and database ids share keys"""
+    return str(UUID(str(workspace_id))), str(UUID(str(service_type_id)))
+
+async def get_availability(
+    supabase,
+    workspace_id: str,
+    service_type_id: str,
+    first_day: date,
+    last_day: date
+) -> Optional[Dict[str, List[str]]]:
+    """Free slots per date, served from cache and computing only missing days
+    
+    Returns None when the service type doesn't belong to the workspace.
+    """
+    workspace_id, service_type_id = _cache_ids(workspace_id, service_type_id)
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    slots_by_date: Dict[str, List[str]] = {}
+    missing = []
+    for day in days:
+        cached = availability_cache.get((workspace_id, service_type_id, day.isoformat()))
+        if cached is None:
+            missing.append(day)
+        else:
+            slots_by_date[day.isoformat()] = cached
+    
+    if missing:
+        computed = await _compute_range(supabase, workspace_id, service_type_id, missing[0], missing[-1])
+        if computed is None:
+            return None
+        for day_iso, day_slots in computed.items():
+            availability_cache.set((workspace_id, service_type_id, day_iso), day_slots)
+        slots_by_date.update(computed)
+    
+    return {day.isoformat(): slots_by_date[day.isoformat()] for day in days}
+
+def invalidate_availability(workspace_id, service_type_id) -> None:
+    """Drop cached days for a service after its bookings or slots change"""
+    availability_cache.invalidate_prefix(*_cache_ids(workspace_id, service_type_id))
+
+def _warm_window() -> Tuple[date, date]:
+    first_day = datetime.now(timezone.utc).date() - timedelta(days=1)
+    return first_day, first_day + timedelta(days=settings.AVAILABILITY_WARM_DAYS)
+
+def needs_warming(workspace_id, service_type_id) -> bool:
+    """True when the last day of the warm window isn't cached yet"""
+    _, last_day = _warm_window()
+    key = (*_cache_ids(workspace_id, service_type_id), last_day.isoformat())
+    return availability_cache.get(key) is None
+
+async def warm_availability(supabase, workspace_id, service_type_id) -> None:
+    """Precompute the next AVAILABILITY_WARM_DAYS so public pages hit the cache"""
+    first_day, last_day = _warm_window()
+    try:
+        await get_availability(supabase, workspace_id, service_type_id, first_day, last_day)
+    except Exception as e:
+        print(f"Availability warm-up failed for service {service_type_id}: {str(e)}")
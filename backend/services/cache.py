@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+from config import get_settings
+
+settings = get_settings()
+
+# Every cache created in the process, exposed through the metrics endpoint
+_registry: Dict[str, Any] = {}
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a fixed TTL
+
+    The public surface (get/set/invalidate) is deliberately small so a shared
+    store such as Redis can stand in for it when running several workers.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl_seconds: float = 60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        _registry[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            age = now - stored_at
+            if age > self.ttl_seconds:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._served_age_total += age
+            self._served_age_max = max(self._served_age_max, age)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_prefix(self, *prefix: Hashable) -> int:
+        """Drop every tuple key starting with the given parts (e.g. a workspace id)"""
+        size = len(prefix)
+        return self.invalidate_where(
+            lambda key: isinstance(key, tuple) and key[:size] == prefix
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and staleness figures for this cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "avg_served_age_seconds": round(self._served_age_total / self.hits, 3) if self.hits else 0.0,
+                "max_served_age_seconds": round(self._served_age_max, 3)
+            }
+
+class DiskStore:
+    """JSON values on local disk with a TTL and a total size cap
+
+    Survives restarts and is shared by the workers of one host. Entries
+    older than the TTL are treated as missing; when the store grows past
+    max_bytes the least recently written files are removed. Methods block,
+    so async callers go through TieredCache.
+    """
+
+    def __init__(self, name: str, directory: str, max_bytes: int, ttl_seconds: float):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        _registry[name] = self
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                raise FileNotFoundError
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        data = json.dumps(value).encode("utf-8")
+        # Write then rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - previous
+            over = self._size > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the oldest files until the store is 10% under its cap"""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        with self._lock:
+            target = self.max_bytes * 0.9
+            for entry in entries:
+                if self._size <= target:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                self._size -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+class TieredCache:
+    """An in-memory TTLCache in front of an optional DiskStore
+
+    Disk hits are promoted to memory. Keys are strings so they can name files.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[DiskStore] = None):
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value)
+            except OSError as e:
+                print(f"Cache {self.disk.name} write failed: {str(e)}")
+
+def get_cache_metrics() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered cache"""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+# Dashboard overview snapshots keyed by (workspace_id, target_date)
+dashboard_cache = TTLCache(
+    "dashboard_overview",
+    maxsize=settings.DASHBOARD_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS
+)
+
+def invalidate_dashboard(workspace_id) -> None:
+    """Drop every cached dashboard snapshot for a workspace after a write"""
+    dashboard_cache.invalidate_prefix(str(workspace_id))
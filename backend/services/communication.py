@@ -1,17 +1,20 @@
+import asyncio
+import httpx
 import vonage
-from mailjet_rest import Client
 from config import get_settings
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 settings = get_settings()
 
+# Mailjet's v3.1 Send API accepts at most 50 messages per request
+MAILJET_MAX_BATCH = 50
+
 class CommunicationService:
     """Service for handling external communications (Email, SMS)"""
     
     def __init__(self):
-        self.mailjet = None
-        if settings.MAILJET_API_KEY and settings.MAILJET_SECRET_KEY:
-            self.mailjet = Client(auth=(settings.MAILJET_API_KEY, settings.MAILJET_SECRET_KEY), version='v3.1')
+        self.mailjet_configured = bool(settings.MAILJET_API_KEY and settings.MAILJET_SECRET_KEY)
+        self._mailjet_http: Optional[httpx.AsyncClient] = None
             
         self.vonage_client = None
         if settings.VONAGE_API_KEY and settings.VONAGE_API_SECRET:
@@ -19,44 +22,95 @@ class CommunicationService:
             self.vonage_auth = Auth(api_key=settings.VONAGE_API_KEY, api_secret=settings.VONAGE_API_SECRET)
             self.vonage_client = Vonage(self.vonage_auth)
 
-    async def send_email(self, to_email: str, subject: str, content: str, from_name: str = "CareOps"):
-        """Send an email using Mailjet"""
-        if not self.mailjet:
-            print("ERROR: Mailjet not configured")
-            return False
-            
-        data = {
-            'Messages': [
+    @property
+    def mailjet_http(self) -> httpx.AsyncClient:
+        """Pooled HTTP session reused for every Mailjet request"""
+        if self._mailjet_http is None:
+            self._mailjet_http = httpx.AsyncClient(
+                base_url=settings.MAILJET_API_URL,
+                auth=(settings.MAILJET_API_KEY, settings.MAILJET_SECRET_KEY),
+                timeout=settings.MAILJET_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=settings.OUTBOUND_EMAIL_CONCURRENCY)
+            )
+        return self._mailjet_http
+
+    @mailjet_http.setter
+    def mailjet_http(self, client: httpx.AsyncClient):
+        self._mailjet_http = client
+
+    async def aclose(self):
+        """Release pooled connections"""
+        if self._mailjet_http is not None:
+            await self._mailjet_http.aclose()
+            self._mailjet_http = None
+
+    def _build_email(self, to_email: str, subject: str, content: str, from_name: str = "CareOps") -> Dict[str, Any]:
+        # In a real environment, we'd use a verified sender email from settings
+        from_email = getattr(settings, "MAILJET_SENDER_EMAIL", "notifications@careops.io")
+        return {
+            "From": {
+                "Email": from_email,
+                "Name": from_name
+            },
+            "To": [
                 {
-                    "From": {
-                        "Email": settings.MAILJET_API_KEY.lower().split('_')[0] + "@careops.io", # Fallback logic
-                        "Name": from_name
-                    },
-                    "To": [
-                        {
-                            "Email": to_email,
-                            "Name": to_email.split('@')[0]
-                        }
-                    ],
-                    "Subject": subject,
-                    "TextPart": content,
-                    "HTMLPart": f"<h3>{subject}</h3><p>{content}</p>"
+                    "Email": to_email,
+                    "Name": to_email.split('@')[0]
                 }
-            ]
+            ],
+            "Subject": subject,
+            "TextPart": content,
+            "HTMLPart": f"<h3>{subject}</h3><p>{content}</p>"
         }
-        
-        # In a real environment, we'd use a verified sender email from settings
-        # For the hackathon, we attempt to use the provided keys
+
+    async def _send_email_chunk(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send up to MAILJET_MAX_BATCH emails in one request"""
+        data = {"Messages": [self._build_email(**email) for email in emails]}
         try:
-            # Overwrite with a real verified email if one exists in settings or ENV
-            from_email = getattr(settings, "MAILJET_SENDER_EMAIL", "notifications@careops.io")
-            data['Messages'][0]['From']['Email'] = from_email
-            
-            result = self.mailjet.send.create(data=data)
-            return result.status_code == 200
+            response = await self.mailjet_http.post("/v3.1/send", json=data)
+            body = response.json()
+            statuses = body.get("Messages") or []
         except Exception as e:
-            print(f"ERROR: Failed to send email: {str(e)}")
-            return False
+            print(f"ERROR: Failed to send email batch: {str(e)}")
+            return [{"to_email": email["to_email"], "success": False, "error": str(e)} for email in emails]
+        
+        # Mailjet reports a status per message, in request order, even when
+        # the request as a whole is answered with 400
+        results = []
+        for index, email in enumerate(emails):
+            status = statuses[index] if index < len(statuses) else {}
+            success = status.get("Status") == "success"
+            error = None
+            if not success:
+                errors = status.get("Errors") or [{}]
+                error = errors[0].get("ErrorMessage") or body.get("ErrorMessage") or f"HTTP {response.status_code}"
+            results.append({"to_email": email["to_email"], "success": success, "error": error})
+        return results
+
+    async def send_email_batch(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send many emails, packing up to 50 per Mailjet request
+        
+        Each email is a dict with to_email, subject, content and optionally
+        from_name. Returns one {to_email, success, error} result per email,
+        in the same order.
+        """
+        if not self.mailjet_configured:
+            print("ERROR: Mailjet not configured")
+            return [{"to_email": email["to_email"], "success": False, "error": "Mailjet not configured"} for email in emails]
+        
+        chunks = [emails[i:i + MAILJET_MAX_BATCH] for i in range(0, len(emails), MAILJET_MAX_BATCH)]
+        chunk_results = await asyncio.gather(*[self._send_email_chunk(chunk) for chunk in chunks])
+        return [result for results in chunk_results for result in results]
+
+    async def send_email(self, to_email: str, subject: str, content: str, from_name: str = "CareOps"):
+        """Send an email using Mailjet"""
+        results = await self.send_email_batch([{
+            "to_email": to_email,
+            "subject": subject,
+            "content": content,
+            "from_name": from_name
+        }])
+        return results[0]["success"]
 
     async def send_sms(self, to_phone: str, content: str, from_name: str = "CareOps"):
         """Send an SMS using Vonage"""
@@ -66,7 +120,7 @@ class CommunicationService:
             
         try:
             # Vonage requires numbers in E.164 format
-            response = self.vonage_client.sms.send_message({
+            response = await asyncio.to_thread(self.vonage_client.sms.send_message, {
                 "from": from_name,
                 "to": to_phone.replace('+', '').replace(' ', ''),
                 "text": content,
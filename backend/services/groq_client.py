@@ -0,0 +1,33 @@
+import httpx
+from groq import AsyncGroq
+from config import get_settings
+from typing import Optional
+
+settings = get_settings()
+
+# One pooled async client per process, shared by every Groq caller
+_client: Optional[AsyncGroq] = None
+
+def get_groq_client() -> AsyncGroq:
+    """Return the shared AsyncGroq client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=httpx.Timeout(settings.GROQ_TIMEOUT_SECONDS, connect=5.0),
+            max_retries=settings.GROQ_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS
+                )
+            )
+        )
+    return _client
+
+async def close_groq_client() -> None:
+    """Close the pooled connections on shutdown"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
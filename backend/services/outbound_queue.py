@@ -0,0 +1,157 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from config import get_settings
+from services.communication import communication_service
+
+settings = get_settings()
+
+class OutboundQueue:
+    """Durable email/SMS delivery queue backed by the outbound_messages table
+
+    Request handlers only enqueue. A dispatcher task in each worker process
+    claims due jobs, sends them with per-provider concurrency limits and
+    retries failures with exponential backoff.
+    """
+
+    def __init__(self):
+        self.supabase = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._limits = {
+            "email": asyncio.Semaphore(settings.OUTBOUND_EMAIL_CONCURRENCY),
+            "sms": asyncio.Semaphore(settings.OUTBOUND_SMS_CONCURRENCY)
+        }
+
+    async def enqueue(
+        self,
+        supabase,
+        workspace_id: str,
+        message_id: Optional[str],
+        channel: str,
+        recipient: str,
+        content: str,
+        subject: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Persist a delivery job and nudge the local dispatcher"""
+        result = await supabase.table("outbound_messages").insert({
+            "workspace_id": str(workspace_id),
+            "message_id": str(message_id) if message_id else None,
+            "channel": channel,
+            "recipient": recipient,
+            "subject": subject,
+            "content": content,
+            "max_attempts": settings.OUTBOUND_MAX_ATTEMPTS
+        }).execute()
+        self._wakeup.set()
+        return result.data[0]
+
+    async def start(self, supabase) -> None:
+        """Start the dispatcher for this process"""
+        if self._task is None:
+            self.supabase = supabase
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the dispatcher. Claimed jobs are retried once their lease expires."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                jobs = await self._claim()
+            except Exception as e:
+                print(f"ERROR: Outbound queue claim failed: {str(e)}")
+                jobs = []
+
+            if jobs:
+                # Claimed emails go out as Mailjet batches, SMS one by one
+                emails = [job for job in jobs if job["channel"] == "email"]
+                others = [job for job in jobs if job["channel"] != "email"]
+                await asyncio.gather(
+                    self._deliver_emails(emails),
+                    *[self._deliver(job) for job in others]
+                )
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOUND_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        result = await self.supabase.rpc("claim_outbound_messages", {
+            "p_limit": settings.OUTBOUND_BATCH_SIZE,
+            "p_lease_seconds": settings.OUTBOUND_LEASE_SECONDS
+        }).execute()
+        return result.data or []
+
+    async def _send_sms(self, job: Dict[str, Any]) -> bool:
+        async with self._limits["sms"]:
+            return await communication_service.send_sms(
+                to_phone=job["recipient"],
+                content=job["content"]
+            )
+
+    def _retry_at(self, attempts: int) -> datetime:
+        """Exponential backoff with jitter, capped at OUTBOUND_RETRY_MAX_SECONDS"""
+        delay = min(
+            settings.OUTBOUND_RETRY_BASE_SECONDS * (2 ** (attempts - 1)),
+            settings.OUTBOUND_RETRY_MAX_SECONDS
+        )
+        return datetime.now(timezone.utc) + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def _deliver_emails(self, jobs: List[Dict[str, Any]]) -> None:
+        if not jobs:
+            return
+        async with self._limits["email"]:
+            results = await communication_service.send_email_batch([
+                {
+                    "to_email": job["recipient"],
+                    "subject": job["subject"] or "Message from CareOps",
+                    "content": job["content"]
+                }
+                for job in jobs
+            ])
+        await asyncio.gather(*[
+            self._finish(job, result["success"], result["error"])
+            for job, result in zip(jobs, results)
+        ])
+
+    async def _deliver(self, job: Dict[str, Any]) -> None:
+        error = None
+        try:
+            sent = await self._send_sms(job)
+            if not sent:
+                error = f"{job['channel']} provider rejected the message"
+        except Exception as e:
+            sent = False
+            error = str(e)
+        await self._finish(job, sent, error)
+
+    async def _finish(self, job: Dict[str, Any], sent: bool, error: Optional[str]) -> None:
+        retry_at = None
+        if not sent and job["attempts"] < job["max_attempts"]:
+            retry_at = self._retry_at(job["attempts"]).isoformat()
+
+        try:
+            await self.supabase.rpc("finish_outbound_message", {
+                "p_id": job["id"],
+                "p_sent": sent,
+                "p_error": error,
+                "p_retry_at": retry_at
+            }).execute()
+        except Exception as e:
+            # The lease expires and the job is claimed again
+            print(f"ERROR: Failed to record outbound message {job['id']}: {str(e)}")
+
+# Singleton instance
+outbound_queue = OutboundQueue()
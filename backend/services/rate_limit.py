@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Tuple
+
+class TokenBucketLimiter:
+    """Per-key token buckets held in process memory
+
+    Each key may burst up to `capacity` calls, then gets `refill_per_second`
+    more. Idle buckets are forgotten once more than `max_keys` are tracked;
+    a forgotten bucket comes back full, which only ever errs on the side of
+    allowing a call.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, max_keys: int = 10000):
+        if refill_per_second <= 0:
+            raise ValueError("refill_per_second must be positive")
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def acquire(self, key: Hashable) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / self.refill_per_second
+        return allowed, retry_after
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import socket
+from typing import Any, Dict, List, Optional
+from config import get_settings
+from services.cache import invalidate_dashboard
+
+settings = get_settings()
+
+class Scheduler:
+    """Periodic sweep for booking reminders and overdue form submissions
+
+    Each pass leases a batch of workspaces (claim_sweep_workspaces) and sweeps
+    them in one set-based call (sweep_workspaces). Leases partition the work,
+    so every worker process can run a scheduler without double-sending. Each
+    pass also purges idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS.
+    """
+
+    def __init__(self):
+        self.supabase = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, supabase) -> None:
+        """Start the sweep loop for this process"""
+        if self._task is None:
+            self.supabase = supabase
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the sweep loop. Leased workspaces are picked up once the lease expires."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"ERROR: Scheduler sweep failed: {str(e)}")
+            await asyncio.sleep(settings.SCHEDULER_INTERVAL_SECONDS)
+
+    async def sweep(self) -> Dict[str, int]:
+        """Sweep workspace batches until none are due"""
+        totals = {"workspaces": 0, "overdue_forms": 0, "reminders": 0}
+        totals["idempotency_keys"] = await self._purge_idempotency_keys()
+        while True:
+            workspace_ids = await self._claim()
+            if not workspace_ids:
+                return totals
+            result = await self._sweep(workspace_ids)
+            totals["workspaces"] += len(result["workspace_ids"])
+            totals["overdue_forms"] += result["overdue_forms"]
+            totals["reminders"] += result["reminders"]
+            if result["overdue_forms"] or result["reminders"]:
+                for workspace_id in result["workspace_ids"]:
+                    invalidate_dashboard(workspace_id)
+
+    async def _purge_idempotency_keys(self) -> int:
+        purged = 0
+        while True:
+            result = await self.supabase.rpc("purge_idempotency_keys", {
+                "p_max_age_hours": settings.IDEMPOTENCY_KEY_TTL_HOURS,
+                "p_limit": settings.IDEMPOTENCY_PURGE_BATCH
+            }).execute()
+            deleted = result.data or 0
+            purged += deleted
+            if deleted < settings.IDEMPOTENCY_PURGE_BATCH:
+                return purged
+
+    async def _claim(self) -> List[str]:
+        result = await self.supabase.rpc("claim_sweep_workspaces", {
+            "p_worker_id": self.worker_id,
+            "p_limit": settings.SCHEDULER_WORKSPACE_BATCH,
+            "p_lease_seconds": settings.SCHEDULER_LEASE_SECONDS,
+            "p_interval_seconds": int(settings.SCHEDULER_INTERVAL_SECONDS)
+        }).execute()
+        return result.data or []
+
+    async def _sweep(self, workspace_ids: List[str]) -> Dict[str, Any]:
+        result = await self.supabase.rpc("sweep_workspaces", {
+            "p_worker_id": self.worker_id,
+            "p_workspace_ids": workspace_ids,
+            "p_reminder_lead_minutes": settings.REMINDER_LEAD_MINUTES,
+            "p_form_overdue_hours": settings.FORM_OVERDUE_HOURS,
+            "p_max_attempts": settings.OUTBOUND_MAX_ATTEMPTS
+        }).execute()
+        return result.data
+
+# Singleton instance
+scheduler = Scheduler()
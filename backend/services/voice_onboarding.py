@@ -1,31 +1,115 @@
-from groq import Groq
 from config import get_settings
+from services.cache import DiskStore, TieredCache, TTLCache
+from services.groq_client import get_groq_client
+import asyncio
+import hashlib
 import json
-from typing import Dict, Any
+import os
+import wave
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
 
 settings = get_settings()
-client = Groq(api_key=settings.GROQ_API_KEY)
+
+TRANSCRIPTION_MODEL = "whisper-large-v3"
+EXTRACTION_MODEL = "llama-3.3-70b-versatile"
+EXTRACTION_CONFIDENCE = 0.85  # Could be enhanced with actual confidence scoring
+# Bump when the extraction prompts change so cached results are not reused
+PROMPT_VERSION = 1
+
+def _voice_cache(kind: str) -> TieredCache:
+    """Memory LRU for one result kind, backed by VOICE_CACHE_DIR when set"""
+    memory = TTLCache(
+        f"voice_{kind}",
+        maxsize=settings.VOICE_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.VOICE_CACHE_TTL_SECONDS
+    )
+    disk = None
+    if settings.VOICE_CACHE_DIR:
+        disk = DiskStore(
+            f"voice_{kind}_disk",
+            os.path.join(settings.VOICE_CACHE_DIR, kind),
+            max_bytes=settings.VOICE_CACHE_DISK_MAX_BYTES,
+            ttl_seconds=settings.VOICE_CACHE_TTL_SECONDS
+        )
+    return TieredCache(memory, disk)
+
+# Transcripts keyed by audio content hash, extractions by (transcript, step, prompt version)
+transcript_cache = _voice_cache("transcripts")
+extraction_cache = _voice_cache("extractions")
+
+def content_hash(audio_file: BinaryIO) -> str:
+    """SHA-256 of a recording, read in chunks. The file is rewound."""
+    digest = hashlib.sha256()
+    audio_file.seek(0)
+    for chunk in iter(lambda: audio_file.read(1024 * 1024), b""):
+        digest.update(chunk)
+    audio_file.seek(0)
+    return digest.hexdigest()
+
+def extraction_key(transcript: str, step: str) -> str:
+    transcript_hash = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+    return f"{EXTRACTION_MODEL}:v{PROMPT_VERSION}:{step}:{transcript_hash}"
+
+def parse_extraction(response_text: str) -> Any:
+    """Parse the model's JSON answer, tolerating a ```json fence"""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    return json.loads(response_text.strip())
+
+def audio_duration(audio_file: BinaryIO) -> Optional[float]:
+    """Length in seconds of a WAV recording, read from its header
+    
+    Returns None for other containers (e.g. the browser's webm/opus),
+    which can't be measured without a decoder. The file is rewound.
+    """
+    try:
+        with wave.open(audio_file, "rb") as recording:
+            return recording.getnframes() / float(recording.getframerate())
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+    finally:
+        audio_file.seek(0)
 
 class VoiceOnboardingService:
-    """Service for handling voice-based onboarding using Groq AI"""
+    """Service for handling voice-based onboarding using Groq AI
+    
+    Calls go through the shared AsyncGroq client, so a long transcription
+    waits on the network without blocking the event loop.
+    """
     
-    def __init__(self):
-        self.client = client
+    @property
+    def client(self):
+        return get_groq_client()
     
     async def transcribe_audio(self, audio_file) -> str:
-        """Transcribe audio to text using Groq Whisper"""
+        """Transcribe audio to text using Groq Whisper
+        
+        audio_file is a (filename, file) pair. Retrying the same recording
+        is served from the transcript cache.
+        """
+        key = f"{TRANSCRIPTION_MODEL}:" + await asyncio.to_thread(content_hash, audio_file[1])
+        cached = await transcript_cache.get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            transcription = self.client.audio.transcriptions.create(
+            transcription = await self.client.audio.transcriptions.create(
                 file=audio_file,
-                model="whisper-large-v3",
-                response_format="text"
+                model=TRANSCRIPTION_MODEL,
+                response_format="text",
+                timeout=settings.GROQ_TRANSCRIPTION_TIMEOUT_SECONDS
             )
-            return transcription
         except Exception as e:
             raise Exception(f"Transcription failed: {str(e)}")
+        
+        await transcript_cache.set(key, transcription)
+        return transcription
     
-    async def extract_onboarding_data(self, transcript: str, step: str) -> Dict[str, Any]:
-        """Extract structured data from transcript based on onboarding step"""
+    def _extraction_messages(self, transcript: str, step: str) -> List[Dict[str, str]]:
+        """Chat messages asking the model for the step's fields as JSON"""
         
         prompts = {
             "workspace": """
@@ -77,41 +161,47 @@ class VoiceOnboardingService:
         
         prompt = prompts.get(step, prompts["general"])
         
+        return [
+            {
+                "role": "system",
+                "content": f"""You are an AI assistant helping with business onboarding. 
+                Extract structured information from user speech. 
+                {prompt}
+                Be precise and only extract information that is clearly stated.
+                Always return valid JSON only, no additional text."""
+            },
+            {
+                "role": "user",
+                "content": transcript
+            }
+        ]
+    
+    async def extract_onboarding_data(self, transcript: str, step: str) -> Dict[str, Any]:
+        """Extract structured data from transcript based on onboarding step"""
+        
+        key = extraction_key(transcript, step)
+        extracted_data = await extraction_cache.get(key)
+        if extracted_data is not None:
+            return {
+                "extracted_data": extracted_data,
+                "confidence": EXTRACTION_CONFIDENCE,
+                "transcript": transcript
+            }
+        
         try:
-            completion = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""You are an AI assistant helping with business onboarding. 
-                        Extract structured information from user speech. 
-                        {prompt}
-                        Be precise and only extract information that is clearly stated.
-                        Always return valid JSON only, no additional text."""
-                    },
-                    {
-                        "role": "user",
-                        "content": transcript
-                    }
-                ],
+            completion = await self.client.chat.completions.create(
+                model=EXTRACTION_MODEL,
+                messages=self._extraction_messages(transcript, step),
                 temperature=0.1,
                 max_tokens=1000
             )
             
-            response_text = completion.choices[0].message.content.strip()
-            
-            # Clean up response to ensure it's valid JSON
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
-            
-            extracted_data = json.loads(response_text)
+            extracted_data = parse_extraction(completion.choices[0].message.content)
+            await extraction_cache.set(key, extracted_data)
             
             return {
                 "extracted_data": extracted_data,
-                "confidence": 0.85,  # Could be enhanced with actual confidence scoring
+                "confidence": EXTRACTION_CONFIDENCE,
                 "transcript": transcript
             }
             
@@ -120,6 +210,56 @@ class VoiceOnboardingService:
         except Exception as e:
             raise Exception(f"Data extraction failed: {str(e)}")
     
+    async def stream_onboarding_data(self, transcript: str, step: str) -> AsyncIterator[Dict[str, Any]]:
+        """Like extract_onboarding_data, but yield tokens as the model produces them
+        
+        Yields {"type": "token", "content": ...} events followed by one
+        {"type": "result", ...} event carrying the parsed data.
+        """
+        
+        key = extraction_key(transcript, step)
+        extracted_data = await extraction_cache.get(key)
+        if extracted_data is not None:
+            yield {
+                "type": "result",
+                "extracted_data": extracted_data,
+                "confidence": EXTRACTION_CONFIDENCE,
+                "transcript": transcript
+            }
+            return
+        
+        chunks = []
+        try:
+            stream = await self.client.chat.completions.create(
+                model=EXTRACTION_MODEL,
+                messages=self._extraction_messages(transcript, step),
+                temperature=0.1,
+                max_tokens=1000,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    chunks.append(content)
+                    yield {"type": "token", "content": content}
+        except Exception as e:
+            raise Exception(f"Data extraction failed: {str(e)}")
+        
+        try:
+            extracted_data = parse_extraction("".join(chunks))
+        except json.JSONDecodeError as e:
+            raise Exception(f"Failed to parse AI response as JSON: {str(e)}")
+        await extraction_cache.set(key, extracted_data)
+        
+        yield {
+            "type": "result",
+            "extracted_data": extracted_data,
+            "confidence": EXTRACTION_CONFIDENCE,
+            "transcript": transcript
+        }
+    
     async def process_voice_input(self, audio_file, step: str = "general") -> Dict[str, Any]:
         """Complete pipeline: transcribe audio and extract data"""
         
@@ -0,0 +1,58 @@
+-- Migration 001: composite and partial indexes for the routers' hot queries
+--
+-- Migrations in this folder are applied in filename order on databases
+-- created from an older schema.sql (fresh installs already include them).
+-- CREATE INDEX CONCURRENTLY can't run inside a transaction, so apply with
+-- psql in autocommit mode rather than the Supabase SQL editor:
+--   psql "$DATABASE_URL" -f database/migrations/001_composite_indexes.sql
+-- Every statement is idempotent, so a failed run can simply be repeated.
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Bookings list, dashboard stats and reminders: workspace + date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_workspace_scheduled
+    ON bookings(workspace_id, scheduled_at);
+
+-- Availability: bookings of one service inside the requested window
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_service_scheduled
+    ON bookings(service_type_id, scheduled_at);
+
+-- Conversation thread in order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_conversation_created
+    ON messages(conversation_id, created_at);
+
+-- Mark-read only ever touches unread customer messages
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_unread_customer
+    ON messages(conversation_id)
+    WHERE is_read = FALSE AND sender_type = 'customer';
+
+-- Inbox keyset pagination: ORDER BY last_message_at DESC, id DESC (NULLS FIRST)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_inbox
+    ON conversations(workspace_id, status, last_message_at DESC, id DESC);
+
+-- Weekly availability windows of a service
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_availability_slots_service_day
+    ON availability_slots(service_type_id, day_of_week);
+
+-- Dashboard: latest unread alerts
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_unread_recent
+    ON alerts(workspace_id, created_at DESC)
+    WHERE is_read = FALSE;
+
+-- contacts(workspace_id, email) gets the unique idx_contacts_workspace_email
+-- in 007, once duplicate contacts have been merged.
+
+-- Indexes whose columns lead one of the composites above
+DROP INDEX CONCURRENTLY IF EXISTS idx_bookings_workspace;
+DROP INDEX CONCURRENTLY IF EXISTS idx_messages_conversation;
+DROP INDEX CONCURRENTLY IF EXISTS idx_contacts_workspace;
+DROP INDEX CONCURRENTLY IF EXISTS idx_alerts_workspace;
+
+-- Every bookings query also filters by workspace or service
+DROP INDEX CONCURRENTLY IF EXISTS idx_bookings_scheduled;
+
+INSERT INTO schema_migrations (version) VALUES ('001_composite_indexes')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,129 @@
+-- Migration 002: workspace_id on form_submissions
+--
+-- The dashboard filtered submissions through an embedded form_templates
+-- filter, which PostgREST can't push into the base table: every tenant's
+-- submissions were read. workspace_id is now copied from the template by a
+-- trigger and indexed with status.
+--   psql "$DATABASE_URL" -f database/migrations/002_form_submissions_workspace.sql
+
+ALTER TABLE form_submissions
+    ADD COLUMN IF NOT EXISTS workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE;
+
+CREATE OR REPLACE FUNCTION set_form_submission_workspace()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT workspace_id INTO NEW.workspace_id
+    FROM form_templates
+    WHERE id = NEW.form_template_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Trigger first, so rows inserted during the backfill are covered too
+DROP TRIGGER IF EXISTS form_submissions_workspace ON form_submissions;
+CREATE TRIGGER form_submissions_workspace BEFORE INSERT OR UPDATE OF form_template_id ON form_submissions
+    FOR EACH ROW EXECUTE FUNCTION set_form_submission_workspace();
+
+UPDATE form_submissions fs
+SET workspace_id = ft.workspace_id
+FROM form_templates ft
+WHERE ft.id = fs.form_template_id
+  AND fs.workspace_id IS DISTINCT FROM ft.workspace_id;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_workspace_status
+    ON form_submissions(workspace_id, status, created_at);
+
+-- Replaced by the workspace index (the sweep now filters on workspace_id)
+DROP INDEX CONCURRENTLY IF EXISTS idx_form_submissions_pending;
+
+CREATE OR REPLACE FUNCTION dashboard_form_stats(p_workspace_id UUID)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(status, total), '{}'::jsonb)
+    FROM (
+        SELECT status, COUNT(*) AS total
+        FROM form_submissions
+        WHERE workspace_id = p_workspace_id
+        GROUP BY status
+    ) by_status;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION sweep_workspaces(
+    p_worker_id TEXT,
+    p_workspace_ids UUID[],
+    p_reminder_lead_minutes INTEGER,
+    p_form_overdue_hours INTEGER,
+    p_max_attempts INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_workspace_ids UUID[];
+    v_overdue INTEGER;
+    v_reminders INTEGER;
+BEGIN
+    SELECT COALESCE(array_agg(workspace_id), '{}') INTO v_workspace_ids
+    FROM scheduler_sweeps
+    WHERE workspace_id = ANY(p_workspace_ids)
+      AND locked_by = p_worker_id
+      AND locked_until >= NOW();
+    
+    UPDATE form_submissions fs
+    SET status = 'overdue'
+    WHERE fs.workspace_id = ANY(v_workspace_ids)
+      AND fs.status = 'pending'
+      AND (
+          EXISTS (
+              SELECT 1 FROM bookings b
+              WHERE b.id = fs.booking_id AND b.scheduled_at < NOW()
+          )
+          OR (fs.booking_id IS NULL AND fs.created_at < NOW() - make_interval(hours => p_form_overdue_hours))
+      );
+    GET DIAGNOSTICS v_overdue = ROW_COUNT;
+    
+    WITH due AS (
+        SELECT b.id
+        FROM bookings b
+        WHERE b.workspace_id = ANY(v_workspace_ids)
+          AND b.reminder_sent_at IS NULL
+          AND b.status IN ('pending', 'confirmed')
+          AND b.scheduled_at >= NOW()
+          AND b.scheduled_at < NOW() + make_interval(mins => p_reminder_lead_minutes)
+        FOR UPDATE SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE bookings b
+        SET reminder_sent_at = NOW()
+        FROM due
+        WHERE b.id = due.id
+        RETURNING b.workspace_id, b.contact_id, b.service_type_id, b.scheduled_at
+    )
+    INSERT INTO outbound_messages (workspace_id, channel, recipient, subject, content, max_attempts)
+    SELECT
+        c.workspace_id,
+        CASE WHEN ct.email IS NOT NULL THEN 'email' ELSE 'sms' END,
+        COALESCE(ct.email, ct.phone),
+        'Reminder: ' || st.name || ' with ' || w.name,
+        'Hi ' || ct.name || ', this is a reminder of your ' || st.name || ' appointment on '
+            || to_char(c.scheduled_at AT TIME ZONE COALESCE(w.timezone, 'UTC'), 'FMDay, FMMonth FMDD at HH24:MI')
+            || COALESCE(' at ' || st.location, '') || '.',
+        p_max_attempts
+    FROM claimed c
+    JOIN contacts ct ON ct.id = c.contact_id
+    JOIN service_types st ON st.id = c.service_type_id
+    JOIN workspaces w ON w.id = c.workspace_id
+    WHERE COALESCE(ct.email, ct.phone) IS NOT NULL;
+    GET DIAGNOSTICS v_reminders = ROW_COUNT;
+    
+    UPDATE scheduler_sweeps
+    SET last_swept_at = NOW(), locked_by = NULL, locked_until = NULL
+    WHERE workspace_id = ANY(v_workspace_ids);
+    
+    RETURN jsonb_build_object(
+        'workspace_ids', to_jsonb(v_workspace_ids),
+        'overdue_forms', v_overdue,
+        'reminders', v_reminders
+    );
+END;
+$$ language 'plpgsql';
+
+INSERT INTO schema_migrations (version) VALUES ('002_form_submissions_workspace')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,388 @@
+-- Migration 003: daily_workspace_metrics rollup
+--
+-- Adds the per-(workspace, day) rollup, the triggers that keep it current
+-- and the dashboard functions that read it. Every existing workspace is
+-- queued in daily_metrics_backfill; the dashboard keeps reading the raw
+-- tables for a workspace until its backfill has run:
+--   psql "$DATABASE_URL" -f database/migrations/003_daily_workspace_metrics.sql
+--   cd backend && python backfill_metrics.py
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS daily_workspace_metrics (
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    bookings_pending INTEGER NOT NULL DEFAULT 0,
+    bookings_confirmed INTEGER NOT NULL DEFAULT 0,
+    bookings_completed INTEGER NOT NULL DEFAULT 0,
+    bookings_no_show INTEGER NOT NULL DEFAULT 0,
+    bookings_cancelled INTEGER NOT NULL DEFAULT 0,
+    bookings_created INTEGER NOT NULL DEFAULT 0,
+    messages_received INTEGER NOT NULL DEFAULT 0,
+    messages_sent INTEGER NOT NULL DEFAULT 0,
+    forms_pending INTEGER NOT NULL DEFAULT 0,
+    forms_completed INTEGER NOT NULL DEFAULT 0,
+    forms_overdue INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (workspace_id, day)
+);
+
+-- Workspaces with activity from before the rollup triggers existed. Readers
+-- use the raw tables for these until backfill_daily_metrics has run.
+CREATE TABLE IF NOT EXISTS daily_metrics_backfill (
+    workspace_id UUID PRIMARY KEY REFERENCES workspaces(id) ON DELETE CASCADE,
+    queued_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Days are UTC, matching the date-range filters the routers send
+CREATE OR REPLACE FUNCTION metric_day(p_at TIMESTAMP WITH TIME ZONE)
+RETURNS DATE AS $$
+    SELECT (p_at AT TIME ZONE 'UTC')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION apply_metric_deltas(
+    p_workspace_ids UUID[],
+    p_days DATE[],
+    p_metrics TEXT[],
+    p_deltas BIGINT[]
+)
+RETURNS VOID AS $$
+    INSERT INTO daily_workspace_metrics AS m (
+        workspace_id, day,
+        bookings_pending, bookings_confirmed, bookings_completed, bookings_no_show, bookings_cancelled,
+        bookings_created, messages_received, messages_sent,
+        forms_pending, forms_completed, forms_overdue
+    )
+    SELECT
+        d.workspace_id, d.day,
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_pending'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_confirmed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_completed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_no_show'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_cancelled'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_created'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'messages_received'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'messages_sent'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_pending'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_completed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_overdue'), 0)
+    FROM (
+        -- Old and new row images of an unchanged metric cancel out here
+        SELECT workspace_id, day, metric, SUM(delta) AS delta
+        FROM unnest(p_workspace_ids, p_days, p_metrics, p_deltas) AS u(workspace_id, day, metric, delta)
+        WHERE day IS NOT NULL
+        GROUP BY workspace_id, day, metric
+        HAVING SUM(delta) <> 0
+    ) d
+    -- Skips workspaces being deleted by the cascade that fired the trigger
+    JOIN workspaces w ON w.id = d.workspace_id
+    GROUP BY d.workspace_id, d.day
+    -- Concurrent writers lock rollup rows in the same order
+    ORDER BY d.workspace_id, d.day
+    ON CONFLICT (workspace_id, day) DO UPDATE
+    SET bookings_pending = m.bookings_pending + EXCLUDED.bookings_pending,
+        bookings_confirmed = m.bookings_confirmed + EXCLUDED.bookings_confirmed,
+        bookings_completed = m.bookings_completed + EXCLUDED.bookings_completed,
+        bookings_no_show = m.bookings_no_show + EXCLUDED.bookings_no_show,
+        bookings_cancelled = m.bookings_cancelled + EXCLUDED.bookings_cancelled,
+        bookings_created = m.bookings_created + EXCLUDED.bookings_created,
+        messages_received = m.messages_received + EXCLUDED.messages_received,
+        messages_sent = m.messages_sent + EXCLUDED.messages_sent,
+        forms_pending = m.forms_pending + EXCLUDED.forms_pending,
+        forms_completed = m.forms_completed + EXCLUDED.forms_completed,
+        forms_overdue = m.forms_overdue + EXCLUDED.forms_overdue,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION track_booking_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT b.workspace_id, m.day, m.metric, COUNT(*) AS total
+            FROM new_rows b
+            CROSS JOIN LATERAL (VALUES
+                (metric_day(b.scheduled_at), 'bookings_' || b.status),
+                (metric_day(b.created_at), 'bookings_created')
+            ) AS m(day, metric)
+            GROUP BY b.workspace_id, m.day, m.metric
+        ) d;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT ids || array_agg(workspace_id), days || array_agg(day),
+               metrics || array_agg(metric), deltas || array_agg(-total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT b.workspace_id, m.day, m.metric, COUNT(*) AS total
+            FROM old_rows b
+            CROSS JOIN LATERAL (VALUES
+                (metric_day(b.scheduled_at), 'bookings_' || b.status),
+                (metric_day(b.created_at), 'bookings_created')
+            ) AS m(day, metric)
+            GROUP BY b.workspace_id, m.day, m.metric
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Messages count when they arrive; marking them read doesn't change the day's activity
+CREATE OR REPLACE FUNCTION track_message_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+    INTO ids, days, metrics, deltas
+    FROM (
+        SELECT c.workspace_id, metric_day(m.created_at) AS day,
+               CASE WHEN m.sender_type = 'customer' THEN 'messages_received' ELSE 'messages_sent' END AS metric,
+               COUNT(*) AS total
+        FROM new_rows m
+        JOIN conversations c ON c.id = m.conversation_id
+        GROUP BY 1, 2, 3
+    ) d;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION track_form_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT workspace_id, metric_day(created_at) AS day, 'forms_' || status AS metric, COUNT(*) AS total
+            FROM new_rows
+            GROUP BY 1, 2, 3
+        ) d;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT ids || array_agg(workspace_id), days || array_agg(day),
+               metrics || array_agg(metric), deltas || array_agg(-total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT workspace_id, metric_day(created_at) AS day, 'forms_' || status AS metric, COUNT(*) AS total
+            FROM old_rows
+            GROUP BY 1, 2, 3
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bookings_metrics_insert ON bookings;
+DROP TRIGGER IF EXISTS bookings_metrics_update ON bookings;
+DROP TRIGGER IF EXISTS bookings_metrics_delete ON bookings;
+DROP TRIGGER IF EXISTS messages_metrics_insert ON messages;
+DROP TRIGGER IF EXISTS form_submissions_metrics_insert ON form_submissions;
+DROP TRIGGER IF EXISTS form_submissions_metrics_update ON form_submissions;
+DROP TRIGGER IF EXISTS form_submissions_metrics_delete ON form_submissions;
+CREATE TRIGGER bookings_metrics_insert AFTER INSERT ON bookings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER bookings_metrics_update AFTER UPDATE ON bookings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER bookings_metrics_delete AFTER DELETE ON bookings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER messages_metrics_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_message_metrics();
+CREATE TRIGGER form_submissions_metrics_insert AFTER INSERT ON form_submissions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+CREATE TRIGGER form_submissions_metrics_update AFTER UPDATE ON form_submissions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+CREATE TRIGGER form_submissions_metrics_delete AFTER DELETE ON form_submissions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+
+-- Rebuild the rollup for up to p_limit queued workspaces from the raw tables.
+-- Writes to the source tables wait for the batch, so no trigger delta can
+-- land between the recount and its insert; keep batches small on busy
+-- databases. Returns how many workspaces were processed (0 once done).
+CREATE OR REPLACE FUNCTION backfill_daily_metrics(p_limit INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_workspace_ids UUID[];
+BEGIN
+    SELECT array_agg(workspace_id) INTO v_workspace_ids
+    FROM (
+        SELECT workspace_id
+        FROM daily_metrics_backfill
+        ORDER BY workspace_id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) batch;
+    
+    IF v_workspace_ids IS NULL THEN
+        RETURN 0;
+    END IF;
+    
+    LOCK TABLE bookings, messages, form_submissions IN SHARE MODE;
+    
+    DELETE FROM daily_workspace_metrics WHERE workspace_id = ANY(v_workspace_ids);
+    
+    INSERT INTO daily_workspace_metrics (
+        workspace_id, day,
+        bookings_pending, bookings_confirmed, bookings_completed, bookings_no_show, bookings_cancelled,
+        bookings_created, messages_received, messages_sent,
+        forms_pending, forms_completed, forms_overdue
+    )
+    SELECT
+        workspace_id, day,
+        COUNT(*) FILTER (WHERE metric = 'bookings_pending'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_confirmed'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_completed'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_no_show'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_cancelled'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_created'),
+        COUNT(*) FILTER (WHERE metric = 'messages_received'),
+        COUNT(*) FILTER (WHERE metric = 'messages_sent'),
+        COUNT(*) FILTER (WHERE metric = 'forms_pending'),
+        COUNT(*) FILTER (WHERE metric = 'forms_completed'),
+        COUNT(*) FILTER (WHERE metric = 'forms_overdue')
+    FROM (
+        SELECT workspace_id, metric_day(scheduled_at) AS day, 'bookings_' || status AS metric
+        FROM bookings
+        WHERE workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT workspace_id, metric_day(created_at), 'bookings_created'
+        FROM bookings
+        WHERE workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT c.workspace_id, metric_day(m.created_at),
+               CASE WHEN m.sender_type = 'customer' THEN 'messages_received' ELSE 'messages_sent' END
+        FROM messages m
+        JOIN conversations c ON c.id = m.conversation_id
+        WHERE c.workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT workspace_id, metric_day(created_at), 'forms_' || status
+        FROM form_submissions
+        WHERE workspace_id = ANY(v_workspace_ids)
+    ) activity
+    WHERE day IS NOT NULL
+    GROUP BY workspace_id, day;
+    
+    DELETE FROM daily_metrics_backfill WHERE workspace_id = ANY(v_workspace_ids);
+    
+    RETURN cardinality(v_workspace_ids);
+END;
+$$ language 'plpgsql';
+
+-- Bookings for a day grouped by status, plus the 7-day upcoming count.
+-- Served from daily_workspace_metrics unless the workspace still awaits its backfill.
+CREATE OR REPLACE FUNCTION dashboard_booking_stats(p_workspace_id UUID, p_day DATE)
+RETURNS JSONB AS $$
+    SELECT CASE WHEN EXISTS (
+        SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id
+    ) THEN jsonb_build_object(
+        'today_by_status', COALESCE((
+            SELECT jsonb_object_agg(status, total)
+            FROM (
+                SELECT status, COUNT(*) AS total
+                FROM bookings
+                WHERE workspace_id = p_workspace_id
+                  AND scheduled_at >= p_day
+                  AND scheduled_at < p_day + 1
+                GROUP BY status
+            ) by_status
+        ), '{}'::jsonb),
+        'upcoming_count', (
+            SELECT COUNT(*)
+            FROM bookings
+            WHERE workspace_id = p_workspace_id
+              AND scheduled_at >= p_day
+              AND scheduled_at < p_day + 8
+        )
+    ) ELSE jsonb_build_object(
+        'today_by_status', COALESCE((
+            SELECT jsonb_object_agg(by_status.status, by_status.total)
+            FROM daily_workspace_metrics m
+            CROSS JOIN LATERAL (VALUES
+                ('pending', m.bookings_pending),
+                ('confirmed', m.bookings_confirmed),
+                ('completed', m.bookings_completed),
+                ('no_show', m.bookings_no_show),
+                ('cancelled', m.bookings_cancelled)
+            ) AS by_status(status, total)
+            WHERE m.workspace_id = p_workspace_id
+              AND m.day = p_day
+              AND by_status.total > 0
+        ), '{}'::jsonb),
+        'upcoming_count', (
+            SELECT COALESCE(SUM(
+                bookings_pending + bookings_confirmed + bookings_completed
+                + bookings_no_show + bookings_cancelled
+            ), 0)
+            FROM daily_workspace_metrics
+            WHERE workspace_id = p_workspace_id
+              AND day >= p_day
+              AND day < p_day + 8
+        )
+    ) END;
+$$ LANGUAGE sql STABLE;
+
+-- Bookings made in [p_from, p_to), from the rollup once it is complete
+CREATE OR REPLACE FUNCTION dashboard_bookings_created(p_workspace_id UUID, p_from DATE, p_to DATE)
+RETURNS BIGINT AS $$
+    SELECT CASE WHEN EXISTS (
+        SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id
+    ) THEN (
+        SELECT COUNT(*)
+        FROM bookings
+        WHERE workspace_id = p_workspace_id
+          AND created_at >= p_from
+          AND created_at < p_to
+    ) ELSE (
+        SELECT COALESCE(SUM(bookings_created), 0)
+        FROM daily_workspace_metrics
+        WHERE workspace_id = p_workspace_id
+          AND day >= p_from
+          AND day < p_to
+    ) END;
+$$ LANGUAGE sql STABLE;
+
+-- Queue history from before the triggers, once; re-running must not requeue
+INSERT INTO daily_metrics_backfill (workspace_id)
+SELECT id FROM workspaces
+WHERE NOT EXISTS (
+    SELECT 1 FROM schema_migrations WHERE version = '003_daily_workspace_metrics'
+)
+ON CONFLICT (workspace_id) DO NOTHING;
+
+INSERT INTO schema_migrations (version) VALUES ('003_daily_workspace_metrics')
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,51 @@
+-- Migration 004: booking_calendar for the bookings calendar view
+--
+-- Reads daily_workspace_metrics (migration 003), falling back to bookings
+-- for workspaces that are still queued for the rollup backfill.
+--   psql "$DATABASE_URL" -f database/migrations/004_booking_calendar.sql
+
+-- Per-day booking counts by status in [p_from, p_to) for calendar views;
+-- days without bookings are omitted
+CREATE OR REPLACE FUNCTION booking_calendar(p_workspace_id UUID, p_from DATE, p_to DATE)
+RETURNS JSONB AS $$
+    WITH by_day AS (
+        SELECT day,
+               bookings_pending AS pending,
+               bookings_confirmed AS confirmed,
+               bookings_completed AS completed,
+               bookings_no_show AS no_show,
+               bookings_cancelled AS cancelled
+        FROM daily_workspace_metrics
+        WHERE workspace_id = p_workspace_id
+          AND day >= p_from
+          AND day < p_to
+          AND NOT EXISTS (SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id)
+        UNION ALL
+        SELECT metric_day(scheduled_at),
+               COUNT(*) FILTER (WHERE status = 'pending'),
+               COUNT(*) FILTER (WHERE status = 'confirmed'),
+               COUNT(*) FILTER (WHERE status = 'completed'),
+               COUNT(*) FILTER (WHERE status = 'no_show'),
+               COUNT(*) FILTER (WHERE status = 'cancelled')
+        FROM bookings
+        WHERE workspace_id = p_workspace_id
+          AND scheduled_at >= p_from
+          AND scheduled_at < p_to
+          AND EXISTS (SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id)
+        GROUP BY 1
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'date', day,
+        'total', pending + confirmed + completed + no_show + cancelled,
+        'pending', pending,
+        'confirmed', confirmed,
+        'completed', completed,
+        'no_show', no_show,
+        'cancelled', cancelled
+    ) ORDER BY day), '[]'::jsonb)
+    FROM by_day
+    WHERE pending + confirmed + completed + no_show + cancelled > 0;
+$$ LANGUAGE sql STABLE;
+
+INSERT INTO schema_migrations (version) VALUES ('004_booking_calendar')
+ON CONFLICT (version) DO NOTHING;
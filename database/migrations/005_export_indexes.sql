@@ -0,0 +1,14 @@
+-- Migration 005: keyset indexes for the streaming exports
+--
+-- Exports page contacts, and the conversations whose messages they
+-- export, in id order within a workspace.
+--   psql "$DATABASE_URL" -f database/migrations/005_export_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contacts_workspace_id
+    ON contacts(workspace_id, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_workspace_id
+    ON conversations(workspace_id, id);
+
+INSERT INTO schema_migrations (version) VALUES ('005_export_indexes')
+ON CONFLICT (version) DO NOTHING;
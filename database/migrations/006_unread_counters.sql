@@ -0,0 +1,155 @@
+-- Migration 006: unread counters on conversations and workspaces
+--
+-- Adds conversations.unread_count / workspaces.unread_count, the triggers
+-- that maintain them, and dashboard_lead_stats which reads the workspace
+-- counter. Writes to messages wait while the counters are recounted, so
+-- no trigger delta can land between the recount and the trigger taking over.
+--   psql "$DATABASE_URL" -f database/migrations/006_unread_counters.sql
+
+BEGIN;
+
+ALTER TABLE workspaces ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+
+LOCK TABLE messages IN SHARE MODE;
+
+CREATE OR REPLACE FUNCTION apply_unread_deltas(p_conversation_ids UUID[], p_deltas BIGINT[])
+RETURNS VOID AS $$
+    WITH deltas AS (
+        SELECT conversation_id, delta
+        FROM unnest(p_conversation_ids, p_deltas) AS d(conversation_id, delta)
+        WHERE delta <> 0
+    ), touched AS (
+        UPDATE conversations c
+        SET unread_count = GREATEST(c.unread_count + d.delta, 0)
+        FROM deltas d
+        WHERE c.id = d.conversation_id
+        RETURNING c.workspace_id, d.delta
+    )
+    UPDATE workspaces w
+    SET unread_count = GREATEST(w.unread_count + t.delta, 0)
+    FROM (SELECT workspace_id, SUM(delta) AS delta FROM touched GROUP BY workspace_id) t
+    WHERE w.id = t.workspace_id;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION track_unread_messages()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, COUNT(*) AS delta
+            FROM new_rows
+            WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            GROUP BY conversation_id
+        ) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, -COUNT(*) AS delta
+            FROM old_rows
+            WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            GROUP BY conversation_id
+        ) d;
+    ELSE
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, SUM(sign) AS delta
+            FROM (
+                SELECT conversation_id, 1 AS sign
+                FROM new_rows
+                WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+                UNION ALL
+                SELECT conversation_id, -1 AS sign
+                FROM old_rows
+                WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            ) changes
+            GROUP BY conversation_id
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_unread_deltas(ids, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS messages_unread_insert ON messages;
+CREATE TRIGGER messages_unread_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+DROP TRIGGER IF EXISTS messages_unread_update ON messages;
+CREATE TRIGGER messages_unread_update AFTER UPDATE ON messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+DROP TRIGGER IF EXISTS messages_unread_delete ON messages;
+CREATE TRIGGER messages_unread_delete AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+
+-- Messages removed by a conversation (or contact) delete cascade are deleted
+-- after their conversation row is gone, so apply_unread_deltas can't find the
+-- workspace any more; release the conversation's count before it goes.
+CREATE OR REPLACE FUNCTION release_conversation_unread()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.unread_count > 0 THEN
+        UPDATE workspaces
+        SET unread_count = GREATEST(unread_count - OLD.unread_count, 0)
+        WHERE id = OLD.workspace_id;
+    END IF;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS conversations_unread_delete ON conversations;
+CREATE TRIGGER conversations_unread_delete BEFORE DELETE ON conversations
+    FOR EACH ROW EXECUTE FUNCTION release_conversation_unread();
+
+-- Recount from the messages; a re-run only touches counters that drifted
+UPDATE conversations c
+SET unread_count = COALESCE(u.total, 0)
+FROM conversations c2
+LEFT JOIN (
+    SELECT conversation_id, COUNT(*) AS total
+    FROM messages
+    WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+    GROUP BY conversation_id
+) u ON u.conversation_id = c2.id
+WHERE c.id = c2.id
+  AND c.unread_count <> COALESCE(u.total, 0);
+
+UPDATE workspaces w
+SET unread_count = COALESCE(t.total, 0)
+FROM workspaces w2
+LEFT JOIN (
+    SELECT workspace_id, SUM(unread_count) AS total
+    FROM conversations
+    GROUP BY workspace_id
+) t ON t.workspace_id = w2.id
+WHERE w.id = w2.id
+  AND w.unread_count <> COALESCE(t.total, 0);
+
+-- Conversation counts and unread customer messages for a workspace
+CREATE OR REPLACE FUNCTION dashboard_lead_stats(p_workspace_id UUID)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total_conversations', COUNT(*),
+        'active_conversations', COUNT(*) FILTER (WHERE c.status = 'active'),
+        'new_inquiries_24h', COUNT(*) FILTER (WHERE c.created_at > NOW() - INTERVAL '24 hours'),
+        'unread_messages', (
+            SELECT unread_count FROM workspaces WHERE id = p_workspace_id
+        )
+    )
+    FROM conversations c
+    WHERE c.workspace_id = p_workspace_id;
+$$ LANGUAGE sql STABLE;
+
+INSERT INTO schema_migrations (version) VALUES ('006_unread_counters')
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
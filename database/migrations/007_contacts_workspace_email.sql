@@ -0,0 +1,179 @@
+-- Migration 007: unique contacts(workspace_id, email) for public-form upserts
+--
+-- create_public_booking and submit_contact_form upsert contacts with
+-- ON CONFLICT (workspace_id, email), which needs this unique index. Older
+-- databases can hold duplicate contacts for the same address, so they are
+-- merged first: the oldest contact survives, the others' bookings and form
+-- submissions move to it, and their conversations fold into one thread.
+-- The merge runs in a transaction; the index is then built CONCURRENTLY, so
+-- apply with psql in autocommit mode:
+--   psql "$DATABASE_URL" -f database/migrations/007_contacts_workspace_email.sql
+-- If a duplicate is inserted between the merge and the build, the build
+-- fails and leaves an INVALID index; drop it and run the file again.
+
+BEGIN;
+
+-- Keep new contacts out while the duplicates are merged
+LOCK TABLE contacts IN SHARE ROW EXCLUSIVE MODE;
+
+-- Every contact of a duplicated (workspace_id, email) with its survivor
+CREATE TEMP TABLE contact_merge ON COMMIT DROP AS
+SELECT id AS contact_id,
+       first_value(id) OVER (PARTITION BY workspace_id, email ORDER BY created_at, id) AS survivor_id
+FROM contacts
+WHERE email IS NOT NULL;
+
+DELETE FROM contact_merge m
+WHERE NOT EXISTS (
+    SELECT 1 FROM contact_merge d
+    WHERE d.survivor_id = m.survivor_id AND d.contact_id <> d.survivor_id
+);
+
+-- One conversation per survivor: its own if it has one, else the oldest
+CREATE TEMP TABLE conversation_merge ON COMMIT DROP AS
+SELECT c.id AS conversation_id,
+       first_value(c.id) OVER (
+           PARTITION BY m.survivor_id
+           ORDER BY c.contact_id = m.survivor_id DESC, c.created_at, c.id
+       ) AS target_id,
+       m.survivor_id
+FROM conversations c
+JOIN contact_merge m ON m.contact_id = c.contact_id;
+
+-- Moving messages carries their unread counts through messages_unread_update
+UPDATE messages msg
+SET conversation_id = cm.target_id
+FROM conversation_merge cm
+WHERE msg.conversation_id = cm.conversation_id
+  AND cm.conversation_id <> cm.target_id;
+
+UPDATE conversations c
+SET last_message_at = merged.last_message_at,
+    status = merged.status
+FROM (
+    SELECT cm.target_id,
+           MAX(c2.last_message_at) AS last_message_at,
+           CASE WHEN bool_or(c2.status = 'active') THEN 'active' ELSE 'archived' END AS status
+    FROM conversation_merge cm
+    JOIN conversations c2 ON c2.id = cm.conversation_id
+    GROUP BY cm.target_id
+) merged
+WHERE c.id = merged.target_id;
+
+DELETE FROM conversations c
+USING conversation_merge cm
+WHERE c.id = cm.conversation_id
+  AND cm.conversation_id <> cm.target_id;
+
+UPDATE conversations c
+SET contact_id = cm.survivor_id
+FROM conversation_merge cm
+WHERE c.id = cm.target_id
+  AND c.contact_id <> cm.survivor_id;
+
+UPDATE bookings b
+SET contact_id = m.survivor_id
+FROM contact_merge m
+WHERE b.contact_id = m.contact_id
+  AND m.contact_id <> m.survivor_id;
+
+UPDATE form_submissions fs
+SET contact_id = m.survivor_id
+FROM contact_merge m
+WHERE fs.contact_id = m.contact_id
+  AND m.contact_id <> m.survivor_id;
+
+-- Keep a phone number when only a newer duplicate had one
+UPDATE contacts s
+SET phone = latest.phone
+FROM (
+    SELECT DISTINCT ON (m.survivor_id) m.survivor_id, c.phone
+    FROM contact_merge m
+    JOIN contacts c ON c.id = m.contact_id
+    WHERE c.phone IS NOT NULL
+    ORDER BY m.survivor_id, c.created_at DESC, c.id DESC
+) latest
+WHERE s.id = latest.survivor_id
+  AND s.phone IS NULL;
+
+DELETE FROM contacts c
+USING contact_merge m
+WHERE c.id = m.contact_id
+  AND m.contact_id <> m.survivor_id;
+
+COMMIT;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_contacts_workspace_email
+    ON contacts(workspace_id, email);
+
+-- Upsert the contact, ensure its conversation and insert the booking in one
+-- transaction. Bookings for a service are serialized with an advisory lock so
+-- the overlap check cannot race a concurrent submission.
+CREATE OR REPLACE FUNCTION create_public_booking(
+    p_workspace_id UUID,
+    p_service_type_id UUID,
+    p_scheduled_at TIMESTAMP WITH TIME ZONE,
+    p_notes TEXT,
+    p_contact_name TEXT,
+    p_contact_email TEXT,
+    p_contact_phone TEXT,
+    p_contact_metadata JSONB
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_duration INTEGER;
+    v_contact_id UUID;
+    v_booking bookings;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM workspaces WHERE id = p_workspace_id AND is_active) THEN
+        RAISE EXCEPTION 'workspace_unavailable';
+    END IF;
+    
+    SELECT duration_minutes INTO v_duration
+    FROM service_types
+    WHERE id = p_service_type_id AND workspace_id = p_workspace_id AND is_active;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'service_unavailable';
+    END IF;
+    
+    PERFORM pg_advisory_xact_lock(hashtextextended(p_service_type_id::text, 0));
+    
+    IF EXISTS (
+        SELECT 1
+        FROM bookings b
+        JOIN service_types st ON st.id = b.service_type_id
+        WHERE b.service_type_id = p_service_type_id
+          AND b.status <> 'cancelled'
+          AND b.scheduled_at > p_scheduled_at - INTERVAL '1 day'
+          AND b.scheduled_at < p_scheduled_at + make_interval(mins => v_duration)
+          AND b.scheduled_at + make_interval(mins => st.duration_minutes) > p_scheduled_at
+    ) THEN
+        RAISE EXCEPTION 'slot_unavailable';
+    END IF;
+    
+    IF p_contact_email IS NOT NULL THEN
+        -- No-op update on conflict so RETURNING yields the existing contact
+        INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+        VALUES (p_workspace_id, p_contact_name, p_contact_email, p_contact_phone, COALESCE(p_contact_metadata, '{}'))
+        ON CONFLICT (workspace_id, email) DO UPDATE SET email = EXCLUDED.email
+        RETURNING id INTO v_contact_id;
+    ELSE
+        INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+        VALUES (p_workspace_id, p_contact_name, NULL, p_contact_phone, COALESCE(p_contact_metadata, '{}'))
+        RETURNING id INTO v_contact_id;
+    END IF;
+    
+    INSERT INTO conversations (workspace_id, contact_id, status)
+    VALUES (p_workspace_id, v_contact_id, 'active')
+    ON CONFLICT (contact_id) DO NOTHING;
+    
+    INSERT INTO bookings (workspace_id, contact_id, service_type_id, scheduled_at, status, notes)
+    VALUES (p_workspace_id, v_contact_id, p_service_type_id, p_scheduled_at, 'pending', p_notes)
+    RETURNING * INTO v_booking;
+    
+    RETURN to_jsonb(v_booking);
+END;
+$$ language 'plpgsql';
+
+INSERT INTO schema_migrations (version) VALUES ('007_contacts_workspace_email')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,117 @@
+-- Migration 008: transactional public contact form
+--
+-- Adds idempotency_keys, submit_contact_form (contact, conversation, message
+-- and alert in one transaction; archived conversations are reopened) and
+-- purge_idempotency_keys, which the scheduler uses to expire old keys.
+-- Needs 007's unique contacts(workspace_id, email) index for the upsert.
+--   psql "$DATABASE_URL" -f database/migrations/008_contact_form.sql
+
+BEGIN;
+
+-- Idempotency keys for public write endpoints (client retries replay the stored
+-- response). The scheduler deletes keys older than IDEMPOTENCY_KEY_TTL_HOURS.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    key VARCHAR(255) NOT NULL,
+    response JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (workspace_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at);
+
+-- Ingest a public contact form submission in one transaction: contact upsert,
+-- conversation, message, last_message_at and alert. An archived conversation
+-- is reopened (status back to 'active') so the new message shows in the inbox.
+-- A repeated idempotency key returns the first submission's result.
+CREATE OR REPLACE FUNCTION submit_contact_form(
+    p_workspace_id UUID,
+    p_name TEXT,
+    p_email TEXT,
+    p_phone TEXT,
+    p_message TEXT,
+    p_idempotency_key TEXT
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_contact_id UUID;
+    v_conversation_id UUID;
+    v_message_id UUID;
+    v_response JSONB;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM workspaces WHERE id = p_workspace_id AND is_active) THEN
+        RAISE EXCEPTION 'workspace_unavailable';
+    END IF;
+    
+    IF p_idempotency_key IS NOT NULL THEN
+        INSERT INTO idempotency_keys (workspace_id, key)
+        VALUES (p_workspace_id, p_idempotency_key)
+        ON CONFLICT DO NOTHING;
+        IF NOT FOUND THEN
+            SELECT response INTO v_response
+            FROM idempotency_keys
+            WHERE workspace_id = p_workspace_id AND key = p_idempotency_key;
+            RETURN v_response || '{"duplicate": true}'::jsonb;
+        END IF;
+    END IF;
+    
+    INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+    VALUES (p_workspace_id, p_name, p_email, p_phone, '{"source": "public_contact_form"}')
+    ON CONFLICT (workspace_id, email) DO UPDATE SET email = EXCLUDED.email
+    RETURNING id INTO v_contact_id;
+    
+    INSERT INTO conversations (workspace_id, contact_id, status, last_message_at)
+    VALUES (p_workspace_id, v_contact_id, 'active', NOW())
+    ON CONFLICT (contact_id) DO UPDATE SET status = 'active', last_message_at = NOW()
+    RETURNING id INTO v_conversation_id;
+    
+    INSERT INTO messages (conversation_id, sender_type, channel, content, metadata)
+    VALUES (v_conversation_id, 'customer', 'email', p_message, '{}')
+    RETURNING id INTO v_message_id;
+    
+    INSERT INTO alerts (workspace_id, type, title, message, severity, is_read)
+    VALUES (
+        p_workspace_id,
+        'contact_message',
+        'New Contact Message',
+        p_name || ' sent a message: ' || LEFT(p_message, 50) || '...',
+        'info',
+        FALSE
+    );
+    
+    v_response := jsonb_build_object(
+        'conversation_id', v_conversation_id,
+        'message_id', v_message_id,
+        'duplicate', FALSE
+    );
+    
+    IF p_idempotency_key IS NOT NULL THEN
+        UPDATE idempotency_keys SET response = v_response
+        WHERE workspace_id = p_workspace_id AND key = p_idempotency_key;
+    END IF;
+    
+    RETURN v_response;
+END;
+$$ language 'plpgsql';
+
+-- Delete up to p_limit idempotency keys older than p_max_age_hours; the
+-- scheduler calls it until a batch comes back short.
+CREATE OR REPLACE FUNCTION purge_idempotency_keys(p_max_age_hours INTEGER, p_limit INTEGER)
+RETURNS INTEGER AS $$
+    WITH expired AS (
+        DELETE FROM idempotency_keys
+        WHERE (workspace_id, key) IN (
+            SELECT workspace_id, key
+            FROM idempotency_keys
+            WHERE created_at < NOW() - make_interval(hours => p_max_age_hours)
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM expired;
+$$ LANGUAGE sql;
+
+INSERT INTO schema_migrations (version) VALUES ('008_contact_form')
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
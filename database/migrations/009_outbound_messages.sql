@@ -0,0 +1,93 @@
+-- Migration 009: durable outbound message queue
+--
+-- Adds outbound_messages and the claim/finish functions the dispatcher calls.
+-- Email and SMS sends are queued here instead of being sent inline.
+--   psql "$DATABASE_URL" -f database/migrations/009_outbound_messages.sql
+
+BEGIN;
+
+-- Outbound Messages (durable delivery queue for email/SMS)
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    message_id UUID REFERENCES messages(id) ON DELETE CASCADE,
+    channel VARCHAR(50) NOT NULL CHECK (channel IN ('email', 'sms')),
+    recipient VARCHAR(255) NOT NULL,
+    subject TEXT,
+    content TEXT NOT NULL,
+    status VARCHAR(50) DEFAULT 'queued' CHECK (status IN ('queued', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_due
+    ON outbound_messages(next_attempt_at)
+    WHERE status IN ('queued', 'sending');
+
+DROP TRIGGER IF EXISTS update_outbound_messages_updated_at ON outbound_messages;
+CREATE TRIGGER update_outbound_messages_updated_at BEFORE UPDATE ON outbound_messages FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Claim due jobs for this worker. SKIP LOCKED lets several workers poll the
+-- same table, and jobs whose lease expired (crashed worker) are picked up again.
+CREATE OR REPLACE FUNCTION claim_outbound_messages(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF outbound_messages AS $$
+    UPDATE outbound_messages o
+    SET status = 'sending',
+        attempts = o.attempts + 1,
+        locked_until = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE o.id IN (
+        SELECT id
+        FROM outbound_messages
+        WHERE (status = 'queued' AND next_attempt_at <= NOW())
+           OR (status = 'sending' AND locked_until < NOW())
+        ORDER BY next_attempt_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.*;
+$$ LANGUAGE sql;
+
+-- Record a delivery attempt and mirror its status onto messages.metadata.
+-- A NULL retry time on failure marks the job as permanently failed.
+CREATE OR REPLACE FUNCTION finish_outbound_message(
+    p_id UUID,
+    p_sent BOOLEAN,
+    p_error TEXT,
+    p_retry_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS VOID AS $$
+    WITH job AS (
+        UPDATE outbound_messages
+        SET status = CASE
+                WHEN p_sent THEN 'sent'
+                WHEN p_retry_at IS NULL THEN 'failed'
+                ELSE 'queued'
+            END,
+            next_attempt_at = COALESCE(p_retry_at, next_attempt_at),
+            locked_until = NULL,
+            last_error = p_error
+        WHERE id = p_id
+        RETURNING message_id, status, attempts, last_error
+    )
+    UPDATE messages m
+    SET metadata = COALESCE(m.metadata, '{}'::jsonb) || jsonb_build_object(
+        'delivery', jsonb_build_object(
+            'status', job.status,
+            'attempts', job.attempts,
+            'error', job.last_error,
+            'updated_at', NOW()
+        )
+    )
+    FROM job
+    WHERE m.id = job.message_id;
+$$ LANGUAGE sql;
+
+INSERT INTO schema_migrations (version) VALUES ('009_outbound_messages')
+ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
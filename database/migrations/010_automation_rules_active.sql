@@ -0,0 +1,11 @@
+-- Migration 010: active automation rules by workspace and event type
+--
+-- The automation workers load a workspace's active rules to compile them.
+--   psql "$DATABASE_URL" -f database/migrations/010_automation_rules_active.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_automation_rules_active
+    ON automation_rules(workspace_id, event_type)
+    WHERE is_active;
+
+INSERT INTO schema_migrations (version) VALUES ('010_automation_rules_active')
+ON CONFLICT (version) DO NOTHING;
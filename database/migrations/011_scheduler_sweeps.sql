@@ -0,0 +1,160 @@
+-- Migration 011: scheduled sweep for booking reminders and overdue forms
+--
+-- Adds bookings.reminder_sent_at, the scheduler_sweeps lease table and the
+-- claim_sweep_workspaces / sweep_workspaces functions the scheduler calls.
+-- Reminders are recorded in the contact's conversation and queued in
+-- outbound_messages (009). Upcoming bookings inside REMINDER_LEAD_MINUTES get
+-- their reminder on the first sweep. The indexes are built CONCURRENTLY
+-- after the transaction, so apply with psql in autocommit mode:
+--   psql "$DATABASE_URL" -f database/migrations/011_scheduler_sweeps.sql
+
+BEGIN;
+
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMP WITH TIME ZONE;
+
+-- Scheduler sweep leases, one row per workspace, so several workers can share the sweep
+CREATE TABLE IF NOT EXISTS scheduler_sweeps (
+    workspace_id UUID PRIMARY KEY REFERENCES workspaces(id) ON DELETE CASCADE,
+    locked_by VARCHAR(255),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_swept_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Lease up to p_limit workspaces that haven't been swept for p_interval_seconds.
+-- The conditional upsert makes concurrent workers claim disjoint workspaces;
+-- a crashed worker's lease simply expires.
+CREATE OR REPLACE FUNCTION claim_sweep_workspaces(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_interval_seconds INTEGER
+)
+RETURNS SETOF UUID AS $$
+    INSERT INTO scheduler_sweeps AS s (workspace_id, locked_by, locked_until)
+    SELECT w.id, p_worker_id, NOW() + make_interval(secs => p_lease_seconds)
+    FROM workspaces w
+    LEFT JOIN scheduler_sweeps prev ON prev.workspace_id = w.id
+    WHERE w.is_active
+      AND (prev.locked_until IS NULL OR prev.locked_until < NOW())
+      AND (prev.last_swept_at IS NULL OR prev.last_swept_at < NOW() - make_interval(secs => p_interval_seconds))
+    ORDER BY prev.last_swept_at NULLS FIRST
+    LIMIT p_limit
+    ON CONFLICT (workspace_id) DO UPDATE
+    SET locked_by = EXCLUDED.locked_by,
+        locked_until = EXCLUDED.locked_until
+    WHERE s.locked_until IS NULL OR s.locked_until < NOW()
+    RETURNING s.workspace_id;
+$$ LANGUAGE sql;
+
+-- Sweep leased workspaces in bulk: pending forms whose appointment has passed
+-- (or that are older than p_form_overdue_hours without one) become overdue,
+-- and bookings starting within p_reminder_lead_minutes get one reminder each,
+-- recorded in the contact's conversation and queued in outbound_messages
+-- (linked by message_id). Only workspaces still leased to p_worker_id are
+-- touched, and reminder_sent_at is claimed with SKIP LOCKED, so nothing is sent twice.
+CREATE OR REPLACE FUNCTION sweep_workspaces(
+    p_worker_id TEXT,
+    p_workspace_ids UUID[],
+    p_reminder_lead_minutes INTEGER,
+    p_form_overdue_hours INTEGER,
+    p_max_attempts INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_workspace_ids UUID[];
+    v_overdue INTEGER;
+    v_reminders INTEGER;
+BEGIN
+    SELECT COALESCE(array_agg(workspace_id), '{}') INTO v_workspace_ids
+    FROM scheduler_sweeps
+    WHERE workspace_id = ANY(p_workspace_ids)
+      AND locked_by = p_worker_id
+      AND locked_until >= NOW();
+    
+    UPDATE form_submissions fs
+    SET status = 'overdue'
+    WHERE fs.workspace_id = ANY(v_workspace_ids)
+      AND fs.status = 'pending'
+      AND (
+          EXISTS (
+              SELECT 1 FROM bookings b
+              WHERE b.id = fs.booking_id AND b.scheduled_at < NOW()
+          )
+          OR (fs.booking_id IS NULL AND fs.created_at < NOW() - make_interval(hours => p_form_overdue_hours))
+      );
+    GET DIAGNOSTICS v_overdue = ROW_COUNT;
+    
+    WITH due AS (
+        SELECT b.id
+        FROM bookings b
+        WHERE b.workspace_id = ANY(v_workspace_ids)
+          AND b.reminder_sent_at IS NULL
+          AND b.status IN ('pending', 'confirmed')
+          AND b.scheduled_at >= NOW()
+          AND b.scheduled_at < NOW() + make_interval(mins => p_reminder_lead_minutes)
+        FOR UPDATE SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE bookings b
+        SET reminder_sent_at = NOW()
+        FROM due
+        WHERE b.id = due.id
+        RETURNING b.workspace_id, b.contact_id, b.service_type_id, b.scheduled_at
+    ),
+    reminders AS (
+        SELECT
+            uuid_generate_v4() AS message_id,
+            conv.id AS conversation_id,
+            c.workspace_id,
+            CASE WHEN ct.email IS NOT NULL THEN 'email' ELSE 'sms' END AS channel,
+            COALESCE(ct.email, ct.phone) AS recipient,
+            'Reminder: ' || st.name || ' with ' || w.name AS subject,
+            'Hi ' || ct.name || ', this is a reminder of your ' || st.name || ' appointment on '
+                || to_char(c.scheduled_at AT TIME ZONE COALESCE(w.timezone, 'UTC'), 'FMDay, FMMonth FMDD at HH24:MI')
+                || COALESCE(' at ' || st.location, '') || '.' AS content
+        FROM claimed c
+        JOIN contacts ct ON ct.id = c.contact_id
+        JOIN service_types st ON st.id = c.service_type_id
+        JOIN workspaces w ON w.id = c.workspace_id
+        LEFT JOIN conversations conv ON conv.contact_id = c.contact_id
+        WHERE COALESCE(ct.email, ct.phone) IS NOT NULL
+    ),
+    -- The reminder shows in the contact's thread like any other system message
+    logged AS (
+        INSERT INTO messages (id, conversation_id, sender_type, channel, content, is_read, metadata)
+        SELECT message_id, conversation_id, 'system', channel, content, TRUE,
+               '{"delivery": {"status": "queued"}, "reminder": true}'::jsonb
+        FROM reminders
+        WHERE conversation_id IS NOT NULL
+        RETURNING id
+    )
+    INSERT INTO outbound_messages (workspace_id, message_id, channel, recipient, subject, content, max_attempts)
+    SELECT r.workspace_id, logged.id, r.channel, r.recipient, r.subject, r.content, p_max_attempts
+    FROM reminders r
+    LEFT JOIN logged ON logged.id = r.message_id;
+    GET DIAGNOSTICS v_reminders = ROW_COUNT;
+    
+    UPDATE scheduler_sweeps
+    SET last_swept_at = NOW(), locked_by = NULL, locked_until = NULL
+    WHERE workspace_id = ANY(v_workspace_ids);
+    
+    RETURN jsonb_build_object(
+        'workspace_ids', to_jsonb(v_workspace_ids),
+        'overdue_forms', v_overdue,
+        'reminders', v_reminders
+    );
+END;
+$$ language 'plpgsql';
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_reminder_due
+    ON bookings(workspace_id, scheduled_at)
+    WHERE reminder_sent_at IS NULL AND status IN ('pending', 'confirmed');
+
+-- Form templates of a workspace
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_templates_workspace
+    ON form_templates(workspace_id);
+
+INSERT INTO schema_migrations (version) VALUES ('011_scheduler_sweeps')
+ON CONFLICT (version) DO NOTHING;
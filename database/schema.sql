@@ -16,6 +16,7 @@ CREATE TABLE workspaces (
     timezone VARCHAR(100) DEFAULT 'UTC',
     contact_email VARCHAR(255) NOT NULL,
     is_active BOOLEAN DEFAULT FALSE,
+    unread_count INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -74,6 +75,7 @@ CREATE TABLE conversations (
     contact_id UUID REFERENCES contacts(id) ON DELETE CASCADE,
     status VARCHAR(50) DEFAULT 'active' CHECK (status IN ('active', 'archived')),
     last_message_at TIMESTAMP WITH TIME ZONE,
+    unread_count INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     UNIQUE(contact_id)
@@ -92,6 +94,25 @@ CREATE TABLE messages (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Outbound Messages (durable delivery queue for email/SMS)
+CREATE TABLE outbound_messages (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    message_id UUID REFERENCES messages(id) ON DELETE CASCADE,
+    channel VARCHAR(50) NOT NULL CHECK (channel IN ('email', 'sms')),
+    recipient VARCHAR(255) NOT NULL,
+    subject TEXT,
+    content TEXT NOT NULL,
+    status VARCHAR(50) DEFAULT 'queued' CHECK (status IN ('queued', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- ============================================
 -- BOOKING TABLES
 -- ============================================
@@ -128,6 +149,7 @@ CREATE TABLE bookings (
     scheduled_at TIMESTAMP WITH TIME ZONE NOT NULL,
     status VARCHAR(50) DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'completed', 'no_show', 'cancelled')),
     notes TEXT,
+    reminder_sent_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -153,6 +175,7 @@ CREATE TABLE form_templates (
 -- Form Submissions
 CREATE TABLE form_submissions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,  -- copied from the template by trigger
     form_template_id UUID REFERENCES form_templates(id) ON DELETE CASCADE,
     booking_id UUID REFERENCES bookings(id) ON DELETE CASCADE,
     contact_id UUID REFERENCES contacts(id) ON DELETE CASCADE,
@@ -219,6 +242,63 @@ CREATE TABLE alerts (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Idempotency keys for public write endpoints (client retries replay the stored
+-- response). The scheduler deletes keys older than IDEMPOTENCY_KEY_TTL_HOURS.
+CREATE TABLE idempotency_keys (
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    key VARCHAR(255) NOT NULL,
+    response JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (workspace_id, key)
+);
+
+-- Scheduler sweep leases, one row per workspace, so several workers can share the sweep
+CREATE TABLE scheduler_sweeps (
+    workspace_id UUID PRIMARY KEY REFERENCES workspaces(id) ON DELETE CASCADE,
+    locked_by VARCHAR(255),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_swept_at TIMESTAMP WITH TIME ZONE
+);
+
+-- ============================================
+-- REPORTING TABLES
+-- ============================================
+
+-- Activity per workspace and UTC day, kept current by statement-level
+-- triggers on bookings, messages and form_submissions. Bookings count on
+-- their scheduled day by status (plus bookings_created on the day they were
+-- made); messages and form submissions count on the day they were created.
+CREATE TABLE daily_workspace_metrics (
+    workspace_id UUID REFERENCES workspaces(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    bookings_pending INTEGER NOT NULL DEFAULT 0,
+    bookings_confirmed INTEGER NOT NULL DEFAULT 0,
+    bookings_completed INTEGER NOT NULL DEFAULT 0,
+    bookings_no_show INTEGER NOT NULL DEFAULT 0,
+    bookings_cancelled INTEGER NOT NULL DEFAULT 0,
+    bookings_created INTEGER NOT NULL DEFAULT 0,
+    messages_received INTEGER NOT NULL DEFAULT 0,
+    messages_sent INTEGER NOT NULL DEFAULT 0,
+    forms_pending INTEGER NOT NULL DEFAULT 0,
+    forms_completed INTEGER NOT NULL DEFAULT 0,
+    forms_overdue INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (workspace_id, day)
+);
+
+-- Workspaces with activity from before the rollup triggers existed. Readers
+-- use the raw tables for these until backfill_daily_metrics has run.
+CREATE TABLE daily_metrics_backfill (
+    workspace_id UUID PRIMARY KEY REFERENCES workspaces(id) ON DELETE CASCADE,
+    queued_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Applied files from database/migrations
+CREATE TABLE schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- ============================================
 -- AUDIT & LOGS
 -- ============================================
@@ -239,19 +319,33 @@ CREATE TABLE activity_logs (
 -- INDEXES
 -- ============================================
 
+-- Composite and partial indexes follow the routers' filters and sort orders.
+-- Existing databases get index changes from database/migrations.
+
 CREATE INDEX idx_users_workspace ON users(workspace_id);
 CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_contacts_workspace ON contacts(workspace_id);
 CREATE INDEX idx_contacts_email ON contacts(email);
+CREATE UNIQUE INDEX idx_contacts_workspace_email ON contacts(workspace_id, email);
+CREATE INDEX idx_contacts_workspace_id ON contacts(workspace_id, id);
 CREATE INDEX idx_conversations_contact ON conversations(contact_id);
-CREATE INDEX idx_messages_conversation ON messages(conversation_id);
-CREATE INDEX idx_bookings_workspace ON bookings(workspace_id);
+CREATE INDEX idx_conversations_workspace_id ON conversations(workspace_id, id);
+CREATE INDEX idx_conversations_inbox ON conversations(workspace_id, status, last_message_at DESC, id DESC);
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at);
+CREATE INDEX idx_messages_unread_customer ON messages(conversation_id) WHERE is_read = FALSE AND sender_type = 'customer';
+CREATE INDEX idx_availability_slots_service_day ON availability_slots(service_type_id, day_of_week);
+CREATE INDEX idx_bookings_workspace_scheduled ON bookings(workspace_id, scheduled_at);
+CREATE INDEX idx_bookings_service_scheduled ON bookings(service_type_id, scheduled_at);
 CREATE INDEX idx_bookings_contact ON bookings(contact_id);
-CREATE INDEX idx_bookings_scheduled ON bookings(scheduled_at);
 CREATE INDEX idx_form_submissions_booking ON form_submissions(booking_id);
-CREATE INDEX idx_alerts_workspace ON alerts(workspace_id);
+CREATE INDEX idx_form_submissions_workspace_status ON form_submissions(workspace_id, status, created_at);
+CREATE INDEX idx_form_templates_workspace ON form_templates(workspace_id);
+CREATE INDEX idx_bookings_reminder_due ON bookings(workspace_id, scheduled_at) WHERE reminder_sent_at IS NULL AND status IN ('pending', 'confirmed');
 CREATE INDEX idx_alerts_unread ON alerts(workspace_id, is_read);
+CREATE INDEX idx_alerts_unread_recent ON alerts(workspace_id, created_at DESC) WHERE is_read = FALSE;
+CREATE INDEX idx_automation_rules_active ON automation_rules(workspace_id, event_type) WHERE is_active;
 CREATE INDEX idx_activity_logs_workspace ON activity_logs(workspace_id);
+CREATE INDEX idx_outbound_messages_due ON outbound_messages(next_attempt_at) WHERE status IN ('queued', 'sending');
+CREATE INDEX idx_idempotency_keys_created ON idempotency_keys(created_at);
 
 -- ============================================
 -- FUNCTIONS & TRIGGERS
@@ -274,3 +368,904 @@ CREATE TRIGGER update_conversations_updated_at BEFORE UPDATE ON conversations FO
 CREATE TRIGGER update_bookings_updated_at BEFORE UPDATE ON bookings FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_service_types_updated_at BEFORE UPDATE ON service_types FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_inventory_items_updated_at BEFORE UPDATE ON inventory_items FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_outbound_messages_updated_at BEFORE UPDATE ON outbound_messages FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- form_submissions.workspace_id always follows its template, so tenant
+-- filters apply to form_submissions itself instead of an embedded join
+CREATE OR REPLACE FUNCTION set_form_submission_workspace()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT workspace_id INTO NEW.workspace_id
+    FROM form_templates
+    WHERE id = NEW.form_template_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER form_submissions_workspace BEFORE INSERT OR UPDATE OF form_template_id ON form_submissions
+    FOR EACH ROW EXECUTE FUNCTION set_form_submission_workspace();
+
+-- Metric days are UTC, matching the date-range filters the routers send
+CREATE OR REPLACE FUNCTION metric_day(p_at TIMESTAMP WITH TIME ZONE)
+RETURNS DATE AS $$
+    SELECT (p_at AT TIME ZONE 'UTC')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================
+-- DASHBOARD AGGREGATES (called via RPC)
+-- ============================================
+-- Counts are computed server-side so the dashboard payload stays constant
+-- no matter how many rows a workspace accumulates.
+
+-- Bookings for a day grouped by status, plus the 7-day upcoming count.
+-- Served from daily_workspace_metrics unless the workspace still awaits its backfill.
+CREATE OR REPLACE FUNCTION dashboard_booking_stats(p_workspace_id UUID, p_day DATE)
+RETURNS JSONB AS $$
+    SELECT CASE WHEN EXISTS (
+        SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id
+    ) THEN jsonb_build_object(
+        'today_by_status', COALESCE((
+            SELECT jsonb_object_agg(status, total)
+            FROM (
+                SELECT status, COUNT(*) AS total
+                FROM bookings
+                WHERE workspace_id = p_workspace_id
+                  AND scheduled_at >= p_day
+                  AND scheduled_at < p_day + 1
+                GROUP BY status
+            ) by_status
+        ), '{}'::jsonb),
+        'upcoming_count', (
+            SELECT COUNT(*)
+            FROM bookings
+            WHERE workspace_id = p_workspace_id
+              AND scheduled_at >= p_day
+              AND scheduled_at < p_day + 8
+        )
+    ) ELSE jsonb_build_object(
+        'today_by_status', COALESCE((
+            SELECT jsonb_object_agg(by_status.status, by_status.total)
+            FROM daily_workspace_metrics m
+            CROSS JOIN LATERAL (VALUES
+                ('pending', m.bookings_pending),
+                ('confirmed', m.bookings_confirmed),
+                ('completed', m.bookings_completed),
+                ('no_show', m.bookings_no_show),
+                ('cancelled', m.bookings_cancelled)
+            ) AS by_status(status, total)
+            WHERE m.workspace_id = p_workspace_id
+              AND m.day = p_day
+              AND by_status.total > 0
+        ), '{}'::jsonb),
+        'upcoming_count', (
+            SELECT COALESCE(SUM(
+                bookings_pending + bookings_confirmed + bookings_completed
+                + bookings_no_show + bookings_cancelled
+            ), 0)
+            FROM daily_workspace_metrics
+            WHERE workspace_id = p_workspace_id
+              AND day >= p_day
+              AND day < p_day + 8
+        )
+    ) END;
+$$ LANGUAGE sql STABLE;
+
+-- Bookings made in [p_from, p_to), from the rollup once it is complete
+CREATE OR REPLACE FUNCTION dashboard_bookings_created(p_workspace_id UUID, p_from DATE, p_to DATE)
+RETURNS BIGINT AS $$
+    SELECT CASE WHEN EXISTS (
+        SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id
+    ) THEN (
+        SELECT COUNT(*)
+        FROM bookings
+        WHERE workspace_id = p_workspace_id
+          AND created_at >= p_from
+          AND created_at < p_to
+    ) ELSE (
+        SELECT COALESCE(SUM(bookings_created), 0)
+        FROM daily_workspace_metrics
+        WHERE workspace_id = p_workspace_id
+          AND day >= p_from
+          AND day < p_to
+    ) END;
+$$ LANGUAGE sql STABLE;
+
+-- Per-day booking counts by status in [p_from, p_to) for calendar views;
+-- days without bookings are omitted
+CREATE OR REPLACE FUNCTION booking_calendar(p_workspace_id UUID, p_from DATE, p_to DATE)
+RETURNS JSONB AS $$
+    WITH by_day AS (
+        SELECT day,
+               bookings_pending AS pending,
+               bookings_confirmed AS confirmed,
+               bookings_completed AS completed,
+               bookings_no_show AS no_show,
+               bookings_cancelled AS cancelled
+        FROM daily_workspace_metrics
+        WHERE workspace_id = p_workspace_id
+          AND day >= p_from
+          AND day < p_to
+          AND NOT EXISTS (SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id)
+        UNION ALL
+        SELECT metric_day(scheduled_at),
+               COUNT(*) FILTER (WHERE status = 'pending'),
+               COUNT(*) FILTER (WHERE status = 'confirmed'),
+               COUNT(*) FILTER (WHERE status = 'completed'),
+               COUNT(*) FILTER (WHERE status = 'no_show'),
+               COUNT(*) FILTER (WHERE status = 'cancelled')
+        FROM bookings
+        WHERE workspace_id = p_workspace_id
+          AND scheduled_at >= p_from
+          AND scheduled_at < p_to
+          AND EXISTS (SELECT 1 FROM daily_metrics_backfill WHERE workspace_id = p_workspace_id)
+        GROUP BY 1
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'date', day,
+        'total', pending + confirmed + completed + no_show + cancelled,
+        'pending', pending,
+        'confirmed', confirmed,
+        'completed', completed,
+        'no_show', no_show,
+        'cancelled', cancelled
+    ) ORDER BY day), '[]'::jsonb)
+    FROM by_day
+    WHERE pending + confirmed + completed + no_show + cancelled > 0;
+$$ LANGUAGE sql STABLE;
+
+-- Conversation counts and unread customer messages for a workspace
+CREATE OR REPLACE FUNCTION dashboard_lead_stats(p_workspace_id UUID)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total_conversations', COUNT(*),
+        'active_conversations', COUNT(*) FILTER (WHERE c.status = 'active'),
+        'new_inquiries_24h', COUNT(*) FILTER (WHERE c.created_at > NOW() - INTERVAL '24 hours'),
+        'unread_messages', (
+            SELECT unread_count FROM workspaces WHERE id = p_workspace_id
+        )
+    )
+    FROM conversations c
+    WHERE c.workspace_id = p_workspace_id;
+$$ LANGUAGE sql STABLE;
+
+-- Form submissions grouped by status for a workspace
+CREATE OR REPLACE FUNCTION dashboard_form_stats(p_workspace_id UUID)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(status, total), '{}'::jsonb)
+    FROM (
+        SELECT status, COUNT(*) AS total
+        FROM form_submissions
+        WHERE workspace_id = p_workspace_id
+        GROUP BY status
+    ) by_status;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- UNREAD COUNTERS
+-- ============================================
+-- conversations.unread_count and workspaces.unread_count track unread
+-- customer messages so inbox badges are a single-row read. Statement-level
+-- triggers aggregate per conversation, so bulk mark-read touches each
+-- counter once.
+
+CREATE OR REPLACE FUNCTION apply_unread_deltas(p_conversation_ids UUID[], p_deltas BIGINT[])
+RETURNS VOID AS $$
+    WITH deltas AS (
+        SELECT conversation_id, delta
+        FROM unnest(p_conversation_ids, p_deltas) AS d(conversation_id, delta)
+        WHERE delta <> 0
+    ), touched AS (
+        UPDATE conversations c
+        SET unread_count = GREATEST(c.unread_count + d.delta, 0)
+        FROM deltas d
+        WHERE c.id = d.conversation_id
+        RETURNING c.workspace_id, d.delta
+    )
+    UPDATE workspaces w
+    SET unread_count = GREATEST(w.unread_count + t.delta, 0)
+    FROM (SELECT workspace_id, SUM(delta) AS delta FROM touched GROUP BY workspace_id) t
+    WHERE w.id = t.workspace_id;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION track_unread_messages()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, COUNT(*) AS delta
+            FROM new_rows
+            WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            GROUP BY conversation_id
+        ) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, -COUNT(*) AS delta
+            FROM old_rows
+            WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            GROUP BY conversation_id
+        ) d;
+    ELSE
+        SELECT array_agg(conversation_id), array_agg(delta) INTO ids, deltas
+        FROM (
+            SELECT conversation_id, SUM(sign) AS delta
+            FROM (
+                SELECT conversation_id, 1 AS sign
+                FROM new_rows
+                WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+                UNION ALL
+                SELECT conversation_id, -1 AS sign
+                FROM old_rows
+                WHERE sender_type = 'customer' AND NOT COALESCE(is_read, FALSE)
+            ) changes
+            GROUP BY conversation_id
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_unread_deltas(ids, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER messages_unread_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+CREATE TRIGGER messages_unread_update AFTER UPDATE ON messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+CREATE TRIGGER messages_unread_delete AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_unread_messages();
+
+-- Messages removed by a conversation (or contact) delete cascade are deleted
+-- after their conversation row is gone, so apply_unread_deltas can't find the
+-- workspace any more; release the conversation's count before it goes.
+CREATE OR REPLACE FUNCTION release_conversation_unread()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.unread_count > 0 THEN
+        UPDATE workspaces
+        SET unread_count = GREATEST(unread_count - OLD.unread_count, 0)
+        WHERE id = OLD.workspace_id;
+    END IF;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER conversations_unread_delete BEFORE DELETE ON conversations
+    FOR EACH ROW EXECUTE FUNCTION release_conversation_unread();
+
+-- ============================================
+-- DAILY METRICS ROLLUP
+-- ============================================
+-- Statement-level triggers fold each write into per-(workspace, day, metric)
+-- deltas and apply them in one upsert, so a bulk update (like the
+-- scheduler's overdue sweep) touches each rollup row once.
+
+CREATE OR REPLACE FUNCTION apply_metric_deltas(
+    p_workspace_ids UUID[],
+    p_days DATE[],
+    p_metrics TEXT[],
+    p_deltas BIGINT[]
+)
+RETURNS VOID AS $$
+    INSERT INTO daily_workspace_metrics AS m (
+        workspace_id, day,
+        bookings_pending, bookings_confirmed, bookings_completed, bookings_no_show, bookings_cancelled,
+        bookings_created, messages_received, messages_sent,
+        forms_pending, forms_completed, forms_overdue
+    )
+    SELECT
+        d.workspace_id, d.day,
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_pending'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_confirmed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_completed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_no_show'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_cancelled'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'bookings_created'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'messages_received'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'messages_sent'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_pending'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_completed'), 0),
+        COALESCE(SUM(d.delta) FILTER (WHERE d.metric = 'forms_overdue'), 0)
+    FROM (
+        -- Old and new row images of an unchanged metric cancel out here
+        SELECT workspace_id, day, metric, SUM(delta) AS delta
+        FROM unnest(p_workspace_ids, p_days, p_metrics, p_deltas) AS u(workspace_id, day, metric, delta)
+        WHERE day IS NOT NULL
+        GROUP BY workspace_id, day, metric
+        HAVING SUM(delta) <> 0
+    ) d
+    -- Skips workspaces being deleted by the cascade that fired the trigger
+    JOIN workspaces w ON w.id = d.workspace_id
+    GROUP BY d.workspace_id, d.day
+    -- Concurrent writers lock rollup rows in the same order
+    ORDER BY d.workspace_id, d.day
+    ON CONFLICT (workspace_id, day) DO UPDATE
+    SET bookings_pending = m.bookings_pending + EXCLUDED.bookings_pending,
+        bookings_confirmed = m.bookings_confirmed + EXCLUDED.bookings_confirmed,
+        bookings_completed = m.bookings_completed + EXCLUDED.bookings_completed,
+        bookings_no_show = m.bookings_no_show + EXCLUDED.bookings_no_show,
+        bookings_cancelled = m.bookings_cancelled + EXCLUDED.bookings_cancelled,
+        bookings_created = m.bookings_created + EXCLUDED.bookings_created,
+        messages_received = m.messages_received + EXCLUDED.messages_received,
+        messages_sent = m.messages_sent + EXCLUDED.messages_sent,
+        forms_pending = m.forms_pending + EXCLUDED.forms_pending,
+        forms_completed = m.forms_completed + EXCLUDED.forms_completed,
+        forms_overdue = m.forms_overdue + EXCLUDED.forms_overdue,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION track_booking_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT b.workspace_id, m.day, m.metric, COUNT(*) AS total
+            FROM new_rows b
+            CROSS JOIN LATERAL (VALUES
+                (metric_day(b.scheduled_at), 'bookings_' || b.status),
+                (metric_day(b.created_at), 'bookings_created')
+            ) AS m(day, metric)
+            GROUP BY b.workspace_id, m.day, m.metric
+        ) d;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT ids || array_agg(workspace_id), days || array_agg(day),
+               metrics || array_agg(metric), deltas || array_agg(-total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT b.workspace_id, m.day, m.metric, COUNT(*) AS total
+            FROM old_rows b
+            CROSS JOIN LATERAL (VALUES
+                (metric_day(b.scheduled_at), 'bookings_' || b.status),
+                (metric_day(b.created_at), 'bookings_created')
+            ) AS m(day, metric)
+            GROUP BY b.workspace_id, m.day, m.metric
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Messages count when they arrive; marking them read doesn't change the day's activity
+CREATE OR REPLACE FUNCTION track_message_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+    INTO ids, days, metrics, deltas
+    FROM (
+        SELECT c.workspace_id, metric_day(m.created_at) AS day,
+               CASE WHEN m.sender_type = 'customer' THEN 'messages_received' ELSE 'messages_sent' END AS metric,
+               COUNT(*) AS total
+        FROM new_rows m
+        JOIN conversations c ON c.id = m.conversation_id
+        GROUP BY 1, 2, 3
+    ) d;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION track_form_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids UUID[];
+    days DATE[];
+    metrics TEXT[];
+    deltas BIGINT[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(workspace_id), array_agg(day), array_agg(metric), array_agg(total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT workspace_id, metric_day(created_at) AS day, 'forms_' || status AS metric, COUNT(*) AS total
+            FROM new_rows
+            GROUP BY 1, 2, 3
+        ) d;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT ids || array_agg(workspace_id), days || array_agg(day),
+               metrics || array_agg(metric), deltas || array_agg(-total)
+        INTO ids, days, metrics, deltas
+        FROM (
+            SELECT workspace_id, metric_day(created_at) AS day, 'forms_' || status AS metric, COUNT(*) AS total
+            FROM old_rows
+            GROUP BY 1, 2, 3
+        ) d;
+    END IF;
+    
+    IF ids IS NOT NULL THEN
+        PERFORM apply_metric_deltas(ids, days, metrics, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bookings_metrics_insert AFTER INSERT ON bookings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER bookings_metrics_update AFTER UPDATE ON bookings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER bookings_metrics_delete AFTER DELETE ON bookings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_booking_metrics();
+CREATE TRIGGER messages_metrics_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_message_metrics();
+CREATE TRIGGER form_submissions_metrics_insert AFTER INSERT ON form_submissions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+CREATE TRIGGER form_submissions_metrics_update AFTER UPDATE ON form_submissions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+CREATE TRIGGER form_submissions_metrics_delete AFTER DELETE ON form_submissions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_form_metrics();
+
+-- Rebuild the rollup for up to p_limit queued workspaces from the raw tables.
+-- Writes to the source tables wait for the batch, so no trigger delta can
+-- land between the recount and its insert; keep batches small on busy
+-- databases. Returns how many workspaces were processed (0 once done).
+CREATE OR REPLACE FUNCTION backfill_daily_metrics(p_limit INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_workspace_ids UUID[];
+BEGIN
+    SELECT array_agg(workspace_id) INTO v_workspace_ids
+    FROM (
+        SELECT workspace_id
+        FROM daily_metrics_backfill
+        ORDER BY workspace_id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) batch;
+    
+    IF v_workspace_ids IS NULL THEN
+        RETURN 0;
+    END IF;
+    
+    LOCK TABLE bookings, messages, form_submissions IN SHARE MODE;
+    
+    DELETE FROM daily_workspace_metrics WHERE workspace_id = ANY(v_workspace_ids);
+    
+    INSERT INTO daily_workspace_metrics (
+        workspace_id, day,
+        bookings_pending, bookings_confirmed, bookings_completed, bookings_no_show, bookings_cancelled,
+        bookings_created, messages_received, messages_sent,
+        forms_pending, forms_completed, forms_overdue
+    )
+    SELECT
+        workspace_id, day,
+        COUNT(*) FILTER (WHERE metric = 'bookings_pending'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_confirmed'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_completed'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_no_show'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_cancelled'),
+        COUNT(*) FILTER (WHERE metric = 'bookings_created'),
+        COUNT(*) FILTER (WHERE metric = 'messages_received'),
+        COUNT(*) FILTER (WHERE metric = 'messages_sent'),
+        COUNT(*) FILTER (WHERE metric = 'forms_pending'),
+        COUNT(*) FILTER (WHERE metric = 'forms_completed'),
+        COUNT(*) FILTER (WHERE metric = 'forms_overdue')
+    FROM (
+        SELECT workspace_id, metric_day(scheduled_at) AS day, 'bookings_' || status AS metric
+        FROM bookings
+        WHERE workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT workspace_id, metric_day(created_at), 'bookings_created'
+        FROM bookings
+        WHERE workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT c.workspace_id, metric_day(m.created_at),
+               CASE WHEN m.sender_type = 'customer' THEN 'messages_received' ELSE 'messages_sent' END
+        FROM messages m
+        JOIN conversations c ON c.id = m.conversation_id
+        WHERE c.workspace_id = ANY(v_workspace_ids)
+        UNION ALL
+        SELECT workspace_id, metric_day(created_at), 'forms_' || status
+        FROM form_submissions
+        WHERE workspace_id = ANY(v_workspace_ids)
+    ) activity
+    WHERE day IS NOT NULL
+    GROUP BY workspace_id, day;
+    
+    DELETE FROM daily_metrics_backfill WHERE workspace_id = ANY(v_workspace_ids);
+    
+    RETURN cardinality(v_workspace_ids);
+END;
+$$ language 'plpgsql';
+
+-- ============================================
+-- PUBLIC WRITE PATHS (called via RPC)
+-- ============================================
+
+-- Upsert the contact, ensure its conversation and insert the booking in one
+-- transaction. Bookings for a service are serialized with an advisory lock so
+-- the overlap check cannot race a concurrent submission.
+CREATE OR REPLACE FUNCTION create_public_booking(
+    p_workspace_id UUID,
+    p_service_type_id UUID,
+    p_scheduled_at TIMESTAMP WITH TIME ZONE,
+    p_notes TEXT,
+    p_contact_name TEXT,
+    p_contact_email TEXT,
+    p_contact_phone TEXT,
+    p_contact_metadata JSONB
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_duration INTEGER;
+    v_contact_id UUID;
+    v_booking bookings;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM workspaces WHERE id = p_workspace_id AND is_active) THEN
+        RAISE EXCEPTION 'workspace_unavailable';
+    END IF;
+    
+    SELECT duration_minutes INTO v_duration
+    FROM service_types
+    WHERE id = p_service_type_id AND workspace_id = p_workspace_id AND is_active;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'service_unavailable';
+    END IF;
+    
+    PERFORM pg_advisory_xact_lock(hashtextextended(p_service_type_id::text, 0));
+    
+    IF EXISTS (
+        SELECT 1
+        FROM bookings b
+        JOIN service_types st ON st.id = b.service_type_id
+        WHERE b.service_type_id = p_service_type_id
+          AND b.status <> 'cancelled'
+          AND b.scheduled_at > p_scheduled_at - INTERVAL '1 day'
+          AND b.scheduled_at < p_scheduled_at + make_interval(mins => v_duration)
+          AND b.scheduled_at + make_interval(mins => st.duration_minutes) > p_scheduled_at
+    ) THEN
+        RAISE EXCEPTION 'slot_unavailable';
+    END IF;
+    
+    IF p_contact_email IS NOT NULL THEN
+        -- No-op update on conflict so RETURNING yields the existing contact
+        INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+        VALUES (p_workspace_id, p_contact_name, p_contact_email, p_contact_phone, COALESCE(p_contact_metadata, '{}'))
+        ON CONFLICT (workspace_id, email) DO UPDATE SET email = EXCLUDED.email
+        RETURNING id INTO v_contact_id;
+    ELSE
+        INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+        VALUES (p_workspace_id, p_contact_name, NULL, p_contact_phone, COALESCE(p_contact_metadata, '{}'))
+        RETURNING id INTO v_contact_id;
+    END IF;
+    
+    INSERT INTO conversations (workspace_id, contact_id, status)
+    VALUES (p_workspace_id, v_contact_id, 'active')
+    ON CONFLICT (contact_id) DO NOTHING;
+    
+    INSERT INTO bookings (workspace_id, contact_id, service_type_id, scheduled_at, status, notes)
+    VALUES (p_workspace_id, v_contact_id, p_service_type_id, p_scheduled_at, 'pending', p_notes)
+    RETURNING * INTO v_booking;
+    
+    RETURN to_jsonb(v_booking);
+END;
+$$ language 'plpgsql';
+
+-- Ingest a public contact form submission in one transaction: contact upsert,
+-- conversation, message, last_message_at and alert. An archived conversation
+-- is reopened (status back to 'active') so the new message shows in the inbox.
+-- A repeated idempotency key returns the first submission's result.
+CREATE OR REPLACE FUNCTION submit_contact_form(
+    p_workspace_id UUID,
+    p_name TEXT,
+    p_email TEXT,
+    p_phone TEXT,
+    p_message TEXT,
+    p_idempotency_key TEXT
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_contact_id UUID;
+    v_conversation_id UUID;
+    v_message_id UUID;
+    v_response JSONB;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM workspaces WHERE id = p_workspace_id AND is_active) THEN
+        RAISE EXCEPTION 'workspace_unavailable';
+    END IF;
+    
+    IF p_idempotency_key IS NOT NULL THEN
+        INSERT INTO idempotency_keys (workspace_id, key)
+        VALUES (p_workspace_id, p_idempotency_key)
+        ON CONFLICT DO NOTHING;
+        IF NOT FOUND THEN
+            SELECT response INTO v_response
+            FROM idempotency_keys
+            WHERE workspace_id = p_workspace_id AND key = p_idempotency_key;
+            RETURN v_response || '{"duplicate": true}'::jsonb;
+        END IF;
+    END IF;
+    
+    INSERT INTO contacts (workspace_id, name, email, phone, metadata)
+    VALUES (p_workspace_id, p_name, p_email, p_phone, '{"source": "public_contact_form"}')
+    ON CONFLICT (workspace_id, email) DO UPDATE SET email = EXCLUDED.email
+    RETURNING id INTO v_contact_id;
+    
+    INSERT INTO conversations (workspace_id, contact_id, status, last_message_at)
+    VALUES (p_workspace_id, v_contact_id, 'active', NOW())
+    ON CONFLICT (contact_id) DO UPDATE SET status = 'active', last_message_at = NOW()
+    RETURNING id INTO v_conversation_id;
+    
+    INSERT INTO messages (conversation_id, sender_type, channel, content, metadata)
+    VALUES (v_conversation_id, 'customer', 'email', p_message, '{}')
+    RETURNING id INTO v_message_id;
+    
+    INSERT INTO alerts (workspace_id, type, title, message, severity, is_read)
+    VALUES (
+        p_workspace_id,
+        'contact_message',
+        'New Contact Message',
+        p_name || ' sent a message: ' || LEFT(p_message, 50) || '...',
+        'info',
+        FALSE
+    );
+    
+    v_response := jsonb_build_object(
+        'conversation_id', v_conversation_id,
+        'message_id', v_message_id,
+        'duplicate', FALSE
+    );
+    
+    IF p_idempotency_key IS NOT NULL THEN
+        UPDATE idempotency_keys SET response = v_response
+        WHERE workspace_id = p_workspace_id AND key = p_idempotency_key;
+    END IF;
+    
+    RETURN v_response;
+END;
+$$ language 'plpgsql';
+
+-- Delete up to p_limit idempotency keys older than p_max_age_hours; the
+-- scheduler calls it until a batch comes back short.
+CREATE OR REPLACE FUNCTION purge_idempotency_keys(p_max_age_hours INTEGER, p_limit INTEGER)
+RETURNS INTEGER AS $$
+    WITH expired AS (
+        DELETE FROM idempotency_keys
+        WHERE (workspace_id, key) IN (
+            SELECT workspace_id, key
+            FROM idempotency_keys
+            WHERE created_at < NOW() - make_interval(hours => p_max_age_hours)
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM expired;
+$$ LANGUAGE sql;
+
+-- ============================================
+-- OUTBOUND QUEUE (called via RPC)
+-- ============================================
+
+-- Claim due jobs for this worker. SKIP LOCKED lets several workers poll the
+-- same table, and jobs whose lease expired (crashed worker) are picked up again.
+CREATE OR REPLACE FUNCTION claim_outbound_messages(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF outbound_messages AS $$
+    UPDATE outbound_messages o
+    SET status = 'sending',
+        attempts = o.attempts + 1,
+        locked_until = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE o.id IN (
+        SELECT id
+        FROM outbound_messages
+        WHERE (status = 'queued' AND next_attempt_at <= NOW())
+           OR (status = 'sending' AND locked_until < NOW())
+        ORDER BY next_attempt_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.*;
+$$ LANGUAGE sql;
+
+-- Record a delivery attempt and mirror its status onto messages.metadata.
+-- A NULL retry time on failure marks the job as permanently failed.
+CREATE OR REPLACE FUNCTION finish_outbound_message(
+    p_id UUID,
+    p_sent BOOLEAN,
+    p_error TEXT,
+    p_retry_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS VOID AS $$
+    WITH job AS (
+        UPDATE outbound_messages
+        SET status = CASE
+                WHEN p_sent THEN 'sent'
+                WHEN p_retry_at IS NULL THEN 'failed'
+                ELSE 'queued'
+            END,
+            next_attempt_at = COALESCE(p_retry_at, next_attempt_at),
+            locked_until = NULL,
+            last_error = p_error
+        WHERE id = p_id
+        RETURNING message_id, status, attempts, last_error
+    )
+    UPDATE messages m
+    SET metadata = COALESCE(m.metadata, '{}'::jsonb) || jsonb_build_object(
+        'delivery', jsonb_build_object(
+            'status', job.status,
+            'attempts', job.attempts,
+            'error', job.last_error,
+            'updated_at', NOW()
+        )
+    )
+    FROM job
+    WHERE m.id = job.message_id;
+$$ LANGUAGE sql;
+
+-- ============================================
+-- SCHEDULER (called via RPC)
+-- ============================================
+
+-- Lease up to p_limit workspaces that haven't been swept for p_interval_seconds.
+-- The conditional upsert makes concurrent workers claim disjoint workspaces;
+-- a crashed worker's lease simply expires.
+CREATE OR REPLACE FUNCTION claim_sweep_workspaces(
+    p_worker_id TEXT,
+    p_limit INTEGER,
+    p_lease_seconds INTEGER,
+    p_interval_seconds INTEGER
+)
+RETURNS SETOF UUID AS $$
+    INSERT INTO scheduler_sweeps AS s (workspace_id, locked_by, locked_until)
+    SELECT w.id, p_worker_id, NOW() + make_interval(secs => p_lease_seconds)
+    FROM workspaces w
+    LEFT JOIN scheduler_sweeps prev ON prev.workspace_id = w.id
+    WHERE w.is_active
+      AND (prev.locked_until IS NULL OR prev.locked_until < NOW())
+      AND (prev.last_swept_at IS NULL OR prev.last_swept_at < NOW() - make_interval(secs => p_interval_seconds))
+    ORDER BY prev.last_swept_at NULLS FIRST
+    LIMIT p_limit
+    ON CONFLICT (workspace_id) DO UPDATE
+    SET locked_by = EXCLUDED.locked_by,
+        locked_until = EXCLUDED.locked_until
+    WHERE s.locked_until IS NULL OR s.locked_until < NOW()
+    RETURNING s.workspace_id;
+$$ LANGUAGE sql;
+
+-- Sweep leased workspaces in bulk: pending forms whose appointment has passed
+-- (or that are older than p_form_overdue_hours without one) become overdue,
+-- and bookings starting within p_reminder_lead_minutes get one reminder each,
+-- recorded in the contact's conversation and queued in outbound_messages
+-- (linked by message_id). Only workspaces still leased to p_worker_id are
+-- touched, and reminder_sent_at is claimed with SKIP LOCKED, so nothing is sent twice.
+CREATE OR REPLACE FUNCTION sweep_workspaces(
+    p_worker_id TEXT,
+    p_workspace_ids UUID[],
+    p_reminder_lead_minutes INTEGER,
+    p_form_overdue_hours INTEGER,
+    p_max_attempts INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_workspace_ids UUID[];
+    v_overdue INTEGER;
+    v_reminders INTEGER;
+BEGIN
+    SELECT COALESCE(array_agg(workspace_id), '{}') INTO v_workspace_ids
+    FROM scheduler_sweeps
+    WHERE workspace_id = ANY(p_workspace_ids)
+      AND locked_by = p_worker_id
+      AND locked_until >= NOW();
+    
+    UPDATE form_submissions fs
+    SET status = 'overdue'
+    WHERE fs.workspace_id = ANY(v_workspace_ids)
+      AND fs.status = 'pending'
+      AND (
+          EXISTS (
+              SELECT 1 FROM bookings b
+              WHERE b.id = fs.booking_id AND b.scheduled_at < NOW()
+          )
+          OR (fs.booking_id IS NULL AND fs.created_at < NOW() - make_interval(hours => p_form_overdue_hours))
+      );
+    GET DIAGNOSTICS v_overdue = ROW_COUNT;
+    
+    WITH due AS (
+        SELECT b.id
+        FROM bookings b
+        WHERE b.workspace_id = ANY(v_workspace_ids)
+          AND b.reminder_sent_at IS NULL
+          AND b.status IN ('pending', 'confirmed')
+          AND b.scheduled_at >= NOW()
+          AND b.scheduled_at < NOW() + make_interval(mins => p_reminder_lead_minutes)
+        FOR UPDATE SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE bookings b
+        SET reminder_sent_at = NOW()
+        FROM due
+        WHERE b.id = due.id
+        RETURNING b.workspace_id, b.contact_id, b.service_type_id, b.scheduled_at
+    ),
+    reminders AS (
+        SELECT
+            uuid_generate_v4() AS message_id,
+            conv.id AS conversation_id,
+            c.workspace_id,
+            CASE WHEN ct.email IS NOT NULL THEN 'email' ELSE 'sms' END AS channel,
+            COALESCE(ct.email, ct.phone) AS recipient,
+            'Reminder: ' || st.name || ' with ' || w.name AS subject,
+            'Hi ' || ct.name || ', this is a reminder of your ' || st.name || ' appointment on '
+                || to_char(c.scheduled_at AT TIME ZONE COALESCE(w.timezone, 'UTC'), 'FMDay, FMMonth FMDD at HH24:MI')
+                || COALESCE(' at ' || st.location, '') || '.' AS content
+        FROM claimed c
+        JOIN contacts ct ON ct.id = c.contact_id
+        JOIN service_types st ON st.id = c.service_type_id
+        JOIN workspaces w ON w.id = c.workspace_id
+        LEFT JOIN conversations conv ON conv.contact_id = c.contact_id
+        WHERE COALESCE(ct.email, ct.phone) IS NOT NULL
+    ),
+    -- The reminder shows in the contact's thread like any other system message
+    logged AS (
+        INSERT INTO messages (id, conversation_id, sender_type, channel, content, is_read, metadata)
+        SELECT message_id, conversation_id, 'system', channel, content, TRUE,
+               '{"delivery": {"status": "queued"}, "reminder": true}'::jsonb
+        FROM reminders
+        WHERE conversation_id IS NOT NULL
+        RETURNING id
+    )
+    INSERT INTO outbound_messages (workspace_id, message_id, channel, recipient, subject, content, max_attempts)
+    SELECT r.workspace_id, logged.id, r.channel, r.recipient, r.subject, r.content, p_max_attempts
+    FROM reminders r
+    LEFT JOIN logged ON logged.id = r.message_id;
+    GET DIAGNOSTICS v_reminders = ROW_COUNT;
+    
+    UPDATE scheduler_sweeps
+    SET last_swept_at = NOW(), locked_by = NULL, locked_until = NULL
+    WHERE workspace_id = ANY(v_workspace_ids);
+    
+    RETURN jsonb_build_object(
+        'workspace_ids', to_jsonb(v_workspace_ids),
+        'overdue_forms', v_overdue,
+        'reminders', v_reminders
+    );
+END;
+$$ language 'plpgsql';
+
+-- Fresh installs already contain every migration
+INSERT INTO schema_migrations (version) VALUES
+    ('001_composite_indexes'),
+    ('002_form_submissions_workspace'),
+    ('003_daily_workspace_metrics'),
+    ('004_booking_calendar'),
+    ('005_export_indexes'),
+    ('006_unread_counters'),
+    ('007_contacts_workspace_email'),
+    ('008_contact_form'),
+    ('009_outbound_messages'),
+    ('010_automation_rules_active'),
+    ('011_scheduler_sweeps');
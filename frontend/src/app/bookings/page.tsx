@@ -14,7 +14,7 @@ import {
     ChevronLeftIcon,
     ChevronRightIcon
 } from '@heroicons/react/24/outline';
-import { format, startOfDay, addDays } from 'date-fns';
+import { format, startOfDay, endOfDay, addDays } from 'date-fns';
 
 export default function BookingsPage() {
     const { user, isAuthenticated } = useAuthStore();
@@ -22,19 +22,23 @@ export default function BookingsPage() {
     const [loading, setLoading] = useState(true);
     const [filter, setFilter] = useState('all');
     const [selectedDate, setSelectedDate] = useState(new Date());
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
 
     useEffect(() => {
         loadBookings();
     }, [isAuthenticated, filter, selectedDate]);
 
-    const loadBookings = async () => {
+    const loadBookings = async (cursor?: string) => {
         try {
             setLoading(true);
             const res = await bookingsApi.list({
-                status: filter === 'all' ? undefined : filter,
-                from_date: format(startOfDay(selectedDate), "yyyy-MM-dd'T'HH:mm:ss")
+                status_filter: filter === 'all' ? undefined : filter,
+                from_date: format(startOfDay(selectedDate), "yyyy-MM-dd'T'HH:mm:ss"),
+                to_date: format(endOfDay(selectedDate), "yyyy-MM-dd'T'HH:mm:ss"),
+                cursor
             });
-            setBookings(res.data);
+            setBookings(cursor ? [...bookings, ...res.data] : res.data);
+            setNextCursor(res.headers['x-next-cursor'] || null);
         } catch (e) {
             console.error('Failed to load bookings');
         } finally {
@@ -172,6 +176,11 @@ export default function BookingsPage() {
                             </div>
                         ))
                     )}
+                    {nextCursor && !loading && (
+                        <div className="flex justify-center pt-4">
+                            <button onClick={() => loadBookings(nextCursor)} className="btn btn-secondary text-sm">Load more</button>
+                        </div>
+                    )}
                 </div>
             </main>
         </div>
@@ -59,8 +59,10 @@ export default function DashboardPage() {
         try {
             const response = await dashboardApi.getAnalysis(selectedDate);
             setAnalysis(response.data.analysis);
-        } catch (error) {
-            setAnalysis("Failed to generate analysis. Please try again later.");
+        } catch (error: any) {
+            setAnalysis(error.response?.status === 429
+                ? error.response.data.detail
+                : "Failed to generate analysis. Please try again later.");
         } finally {
             setLoadingAnalysis(false);
         }
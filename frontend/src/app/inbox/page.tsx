@@ -21,6 +21,8 @@ export default function InboxPage() {
     const [messages, setMessages] = useState<any[]>([]);
     const [newMessage, setNewMessage] = useState('');
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [messagesLoading, setMessagesLoading] = useState(false);
     const [replyChannel, setReplyChannel] = useState('email');
     const messagesEndRef = useRef<HTMLDivElement>(null);
@@ -43,18 +45,21 @@ export default function InboxPage() {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     };
 
-    const loadConversations = async () => {
+    const loadConversations = async (cursor?: string) => {
+        // Keep the list on screen while older pages load
+        const setBusy = cursor ? setLoadingMore : setLoading;
         try {
-            setLoading(true);
-            const res = await inboxApi.getConversations();
-            setConversations(res.data);
+            setBusy(true);
+            const res = await inboxApi.getConversations('active', cursor);
+            setConversations(cursor ? [...conversations, ...res.data] : res.data);
+            setNextCursor(res.headers['x-next-cursor'] || null);
             if (res.data.length > 0 && !selectedConversation) {
                 setSelectedConversation(res.data[0]);
             }
         } catch (e) {
             console.error('Failed to load conversations');
         } finally {
-            setLoading(false);
+            setBusy(false);
         }
     };
 
@@ -131,6 +136,17 @@ export default function InboxPage() {
                                 </div>
                             ))
                         )}
+                        {nextCursor && (
+                            <div className="flex justify-center p-4">
+                                <button
+                                    onClick={() => loadConversations(nextCursor)}
+                                    disabled={loadingMore}
+                                    className="btn btn-secondary text-sm"
+                                >
+                                    {loadingMore ? 'Loading...' : 'Load more'}
+                                </button>
+                            </div>
+                        )}
                     </div>
 
                     {/* Chat Window */}
@@ -17,6 +17,9 @@ import {
     StopIcon
 } from '@heroicons/react/24/outline';
 
+// Matches the backend's VOICE_MAX_DURATION_SECONDS
+const MAX_RECORDING_SECONDS = 300;
+
 const STEPS = [
     { id: 1, name: 'Workspace', icon: BuildingOfficeIcon },
     { id: 2, name: 'Integrations', icon: ChatBubbleBottomCenterTextIcon },
@@ -35,8 +38,10 @@ export default function OnboardingPage() {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
     const [isRecording, setIsRecording] = useState(false);
+    const [voicePreview, setVoicePreview] = useState('');
     const [mediaRecorder, setMediaRecorder] = useState<MediaRecorder | null>(null);
     const audioChunks = useRef<Blob[]>([]);
+    const recordingStartedAt = useRef(0);
 
     // Form States
     const [workspaceData, setWorkspaceData] = useState({
@@ -118,12 +123,23 @@ export default function OnboardingPage() {
 
             recorder.onstop = async () => {
                 const audioBlob = new Blob(audioChunks.current, { type: 'audio/webm' });
-                await handleVoiceUpload(audioBlob);
+                const durationSeconds = (Date.now() - recordingStartedAt.current) / 1000;
+                await handleVoiceUpload(audioBlob, durationSeconds);
             };
 
             recorder.start();
+            recordingStartedAt.current = Date.now();
             setMediaRecorder(recorder);
             setIsRecording(true);
+
+            // Stop at the server's limit instead of uploading a recording it would reject
+            setTimeout(() => {
+                if (recorder.state === 'recording') {
+                    recorder.stop();
+                    setIsRecording(false);
+                    stream.getTracks().forEach(track => track.stop());
+                }
+            }, MAX_RECORDING_SECONDS * 1000);
         } catch (err) {
             setError('Could not access microphone');
         }
@@ -137,7 +153,7 @@ export default function OnboardingPage() {
         }
     };
 
-    const handleVoiceUpload = async (blob: Blob) => {
+    const handleVoiceUpload = async (blob: Blob, durationSeconds: number) => {
         setLoading(true);
         setError('');
         const stepNames = ['workspace', 'integrations', 'contact_form', 'service_type', 'post_booking_forms', 'inventory', 'staff', 'activate'];
@@ -147,9 +163,17 @@ export default function OnboardingPage() {
             const formData = new FormData();
             formData.append('audio', blob, 'onboarding.webm');
             formData.append('step', currentStepName);
-
-            const response = await onboardingApi.voiceTranscribe(formData);
-            const { extracted_data } = response.data;
+            formData.append('duration_seconds', String(Math.min(durationSeconds, MAX_RECORDING_SECONDS)));
+
+            let extracted_data: any = null;
+            setVoicePreview('');
+            await onboardingApi.voiceTranscribeStream(formData, (event) => {
+                if (event.type === 'transcript') setVoicePreview(`"${event.text}"\n\n`);
+                if (event.type === 'token') setVoicePreview((preview) => preview + event.content);
+                if (event.type === 'result') extracted_data = event.extracted_data;
+                if (event.type === 'error') throw new Error(event.detail);
+            });
+            if (!extracted_data) throw new Error('No data extracted');
 
             // Map extracted data to form states
             if (currentStep === 1) setWorkspaceData({ ...workspaceData, ...extracted_data });
@@ -248,6 +272,10 @@ export default function OnboardingPage() {
                             </button>
                         </div>
 
+                        {voicePreview && <pre className="bg-blue-50 text-blue-800 p-4 rounded-lg mb-6 border border-blue-100 text-sm whitespace-pre-wrap">
+                            {voicePreview}
+                        </pre>}
+
                         {error && <div className="bg-red-50 text-red-700 p-4 rounded-lg mb-6 border border-red-100">
                             {typeof error === 'object' ? JSON.stringify(error) : error}
                         </div>}
@@ -60,6 +60,31 @@ export const onboarding = {
     voiceTranscribe: (formData: FormData) => apiClient.post('/api/onboarding/voice/transcribe', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
     }),
+    // Streams NDJSON events (transcript, token, result, error) as they arrive
+    voiceTranscribeStream: async (formData: FormData, onEvent: (event: any) => void) => {
+        const token = localStorage.getItem('token');
+        const response = await fetch(`${API_URL}/api/onboarding/voice/transcribe/stream`, {
+            method: 'POST',
+            body: formData,
+            headers: token ? { Authorization: `Bearer ${token}` } : {},
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Voice processing failed (${response.status})`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() || '';
+            lines.filter(Boolean).forEach((line) => onEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) onEvent(JSON.parse(buffer));
+    },
 };
 
 // Dashboard
@@ -73,6 +98,8 @@ export const dashboard = {
 // Bookings
 export const bookings = {
     list: (params?: any) => apiClient.get('/api/bookings/', { params }),
+    calendar: (fromDate: string, toDate: string) =>
+        apiClient.get('/api/bookings/calendar', { params: { from_date: fromDate, to_date: toDate } }),
     get: (id: string) => apiClient.get(`/api/bookings/${id}`),
     updateStatus: (id: string, status: string) => apiClient.patch(`/api/bookings/${id}/status`, null, { params: { new_status: status } }),
     getAvailableSlots: (serviceTypeId: string, date: string, workspaceId: string) =>
@@ -85,7 +112,8 @@ export const bookings = {
 
 // Inbox
 export const inbox = {
-    getConversations: (status = 'active') => apiClient.get(`/api/inbox/conversations?status_filter=${status}`),
+    getConversations: (status = 'active', cursor?: string, limit?: number) =>
+        apiClient.get('/api/inbox/conversations', { params: { status_filter: status, cursor, limit } }),
     getMessages: (conversationId: string) => apiClient.get(`/api/inbox/conversations/${conversationId}/messages`),
     sendMessage: (conversationId: string, data: { content: string, channel: string }) =>
         apiClient.post(`/api/inbox/conversations/${conversationId}/messages`, null, {